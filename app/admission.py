@@ -0,0 +1,196 @@
+# app/admission.py
+"""
+Admission control: bounded concurrency per route class with fast load shedding.
+
+Requests are classified as
+  upstream  routes that proxy other services (reservations, free slots, context)
+  write     any other non-GET/HEAD/OPTIONS request
+  read      everything else
+and each class has its own concurrency limit and bounded wait queue. A request
+that finds the queue full, or waits longer than ADMISSION_QUEUE_TIMEOUT (or its
+remaining deadline), is answered immediately with 503 + Retry-After instead of
+piling onto the threadpool and DB pool. By default the class limits add up to
+the DB pool size (default_limits), so admitted requests do not queue for a
+connection. Health, metrics and the change feed (long-lived by design) are
+never limited.
+"""
+import asyncio
+import json
+import os
+import re
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app import database, metrics
+from app.request_context import remaining
+from app.schemas import Problem
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+ADMISSION_CONTROL_ENABLED = _get_bool("ADMISSION_CONTROL_ENABLED", True)
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+# max queued per class; the concurrency limits are derived from the DB pool
+_QUEUES = {"read": 64, "write": 32, "upstream": 32}
+# share of the pool for writes and for upstream routes (which hold their DB
+# session while waiting on the upstream); reads get the rest
+_POOL_SHARES = {"write": 0.2, "upstream": 0.2}
+# limits when the pool has no upper bound (DB_MAX_OVERFLOW < 0)
+_UNBOUNDED_LIMITS = {"read": 32, "write": 8, "upstream": 16}
+
+_UPSTREAM = re.compile(r"^/employees/(reservations|free-slots|[^/]+/(reservations|context))/?$")
+_EXEMPT = ("/health", "/ready", "/metrics", "/changes", "/docs", "/openapi.json", "/redoc")
+
+SHED = metrics.Counter(
+    "http_requests_shed_total", "Requests rejected by admission control.", ("route_class", "reason"),
+)
+IN_FLIGHT = metrics.Gauge(
+    "admission_in_flight", "Admitted requests currently running.", ("route_class",),
+)
+QUEUED = metrics.Gauge(
+    "admission_queued", "Requests waiting for admission.", ("route_class",),
+)
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Class of a request, or None when it is exempt."""
+    if path.startswith(_EXEMPT):
+        return None
+    if _UPSTREAM.match(path):
+        return "upstream"
+    if method not in ("GET", "HEAD", "OPTIONS"):
+        return "write"
+    return "read"
+
+
+class Limiter:
+    """Counting semaphore with a bounded FIFO queue (event-loop only, no locking)."""
+
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self, timeout: float) -> Optional[str]:
+        """None when admitted, otherwise the shed reason."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue or timeout <= 0:
+            return "queue_full" if timeout > 0 else "no_budget"
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        QUEUED.inc((self.name,))
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return None  # the releasing request handed its slot over
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.release()  # admitted just as we were cancelled
+            raise
+        finally:
+            QUEUED.dec((self.name,))
+            try:
+                self._waiters.remove(fut)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+
+def pool_capacity() -> Optional[int]:
+    """Connections the primary's pool hands out at most (None: unbounded overflow)."""
+    if database.DB_MAX_OVERFLOW < 0:
+        return None
+    return database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW
+
+
+def default_limits() -> Dict[str, int]:
+    """
+    Concurrency limits that together fit the pool, so an admitted request does
+    not wait DB_POOL_TIMEOUT for a connection; every class gets at least one slot.
+    """
+    capacity = pool_capacity()
+    if capacity is None:
+        return dict(_UNBOUNDED_LIMITS)
+    limits = {name: max(1, int(capacity * share)) for name, share in _POOL_SHARES.items()}
+    limits["read"] = max(1, capacity - sum(limits.values()))
+    return limits
+
+
+def _limiters() -> Dict[str, Limiter]:
+    defaults, capacity = default_limits(), pool_capacity()
+    out = {}
+    for name, queue in _QUEUES.items():
+        limit = int(os.getenv(f"ADMISSION_{name.upper()}_LIMIT") or defaults[name])
+        out[name] = Limiter(
+            name,
+            limit if capacity is None else min(limit, capacity),  # more could only queue on the pool
+            int(os.getenv(f"ADMISSION_{name.upper()}_QUEUE") or queue),
+        )
+    return out
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware; must sit inside DeadlineMiddleware to see the request budget."""
+
+    def __init__(self, app, limiters: Optional[Dict[str, Limiter]] = None):
+        self.app = app
+        self.limiters = limiters or _limiters()
+
+    async def __call__(self, scope, receive, send):
+        cls = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if cls is None:
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiters[cls]
+        rem = remaining()
+        timeout = ADMISSION_QUEUE_TIMEOUT if rem is None else min(ADMISSION_QUEUE_TIMEOUT, rem)
+        reason = await limiter.acquire(timeout)
+        if reason is not None:
+            SHED.inc((cls, reason))
+            await _shed(scope, send)
+            return
+        IN_FLIGHT.inc((cls,))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            IN_FLIGHT.dec((cls,))
+            limiter.release()
+
+
+async def _shed(scope, send) -> None:
+    problem = Problem(
+        title="Service Unavailable",
+        status=503,
+        detail="server is saturated, retry later",
+        instance=scope["path"],
+    )
+    body = json.dumps(problem.model_dump()).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,193 @@
+# app/aggregates.py
+"""
+Incrementally maintained dashboard counters.
+
+Rows of `aggregate_counters` hold, per (dimension, key):
+  company / location   active headcount (home location)
+  service              active employees with the skill
+  location_minutes     weekly available minutes of active employees at a location
+                       (a slot without location counts at the employee's home location)
+
+Every crud write computes the employee's contribution before and after the
+change and applies the difference in the same transaction, so a dashboard
+read is a scan of the (small) counter table instead of the employee tables.
+Employees without a company / location / slot location are not counted there.
+
+Counter writes are single upserts (INSERT ... ON DUPLICATE KEY UPDATE on MySQL,
+ON CONFLICT DO UPDATE on SQLite / PostgreSQL), so two writes creating the same
+counter row concurrently both add their delta and neither fails. reconcile()
+recomputes everything from the tables and corrects drift (e.g. rows changed
+outside the service); it runs every AGGREGATES_RECONCILE_INTERVAL seconds and
+once at startup if the table is empty.
+"""
+import asyncio
+import logging
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import database, models
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_RECONCILE_INTERVAL = float(os.getenv("AGGREGATES_RECONCILE_INTERVAL", "3600"))
+
+Key = Tuple[str, int]
+
+
+def _minutes(slot: Any) -> int:
+    f, t = slot.time_from, slot.time_to
+    return max(0, (t.hour * 60 + t.minute) - (f.hour * 60 + f.minute))
+
+
+def slot_minutes(slots: Iterable[Any], home_location_id: Optional[int]) -> Counter:
+    out = Counter()
+    for s in slots:
+        loc = s.location_id if s.location_id is not None else home_location_id
+        if loc is not None:
+            out[("location_minutes", loc)] += _minutes(s)
+    return out
+
+
+def contribution(active: bool, company_id: Optional[int], location_id: Optional[int],
+                 service_ids: Iterable[int] = (), slots: Iterable[Any] = ()) -> Counter:
+    """What one employee adds to the counters."""
+    out = Counter()
+    if not active:
+        return out
+    if company_id is not None:
+        out[("company", company_id)] += 1
+    if location_id is not None:
+        out[("location", location_id)] += 1
+    for sid in service_ids:
+        out[("service", sid)] += 1
+    out.update(slot_minutes(slots, location_id))
+    return out
+
+
+def diff(before: Counter, after: Counter) -> Dict[Key, int]:
+    return {k: after.get(k, 0) - before.get(k, 0) for k in before.keys() | after.keys()
+            if after.get(k, 0) != before.get(k, 0)}
+
+
+_UPSERT_DIALECTS = {"mysql": mysql, "mariadb": mysql, "sqlite": sqlite, "postgresql": postgresql}
+
+
+def upsert_statement(dialect_name: str, dimension: str, key: int, delta: int):
+    """INSERT adding `delta` to an existing counter row, or None when the backend has no upsert."""
+    table = models.AggregateCounter.__table__
+    dialect = _UPSERT_DIALECTS.get(dialect_name)
+    values = {"dimension": dimension, "key": key, "value": delta}
+    if dialect is None:
+        return None
+    stmt = dialect.insert(table).values(**values)
+    if dialect is mysql:
+        return stmt.on_duplicate_key_update(value=table.c.value + stmt.inserted.value)
+    return stmt.on_conflict_do_update(index_elements=[table.c.dimension, table.c.key],
+                                      set_={"value": table.c.value + stmt.excluded.value})
+
+
+def _upsert(db: Session, dimension: str, key: int, delta: int) -> None:
+    stmt = upsert_statement(db.get_bind().dialect.name, dimension, key, delta)
+    if stmt is not None:
+        db.execute(stmt)
+        return
+    # generic fallback: update, else insert in a savepoint and retry the update if we lost the race
+    table = models.AggregateCounter.__table__
+    bump = update(table).where(table.c.dimension == dimension, table.c.key == key) \
+        .values(value=table.c.value + delta)
+    if db.execute(bump).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(table.insert().values(dimension=dimension, key=key, value=delta))
+    except IntegrityError:
+        db.execute(bump)
+
+
+def apply(db: Session, deltas: Dict[Key, int]) -> None:
+    """Add deltas to the counters inside the caller's transaction (never fails on a concurrent insert)."""
+    for (dimension, key), delta in sorted(deltas.items()):  # fixed order: no lock-order deadlocks
+        if delta:
+            _upsert(db, dimension, key, delta)
+
+
+def snapshot(db: Session) -> Dict[str, Dict[int, int]]:
+    out: Dict[str, Dict[int, int]] = {"company": {}, "location": {}, "service": {}, "location_minutes": {}}
+    for dimension, key, value in db.query(models.AggregateCounter.dimension, models.AggregateCounter.key,
+                                          models.AggregateCounter.value):
+        if value:
+            out.setdefault(dimension, {})[key] = value
+    return out
+
+
+def merge(snapshots: Iterable[Dict[str, Dict[int, int]]]) -> Dict[str, Dict[int, int]]:
+    """Sum per-shard snapshots."""
+    out: Dict[str, Dict[int, int]] = {"company": {}, "location": {}, "service": {}, "location_minutes": {}}
+    for snap in snapshots:
+        for dimension, values in snap.items():
+            into = out.setdefault(dimension, {})
+            for key, value in values.items():
+                into[key] = into.get(key, 0) + value
+    return out
+
+
+# ─── Reconciliation ───────────────────────────────────────────────────────────
+
+def compute(db: Session) -> Counter:
+    """The counters recomputed from the tables."""
+    E, A, K = models.Employee, models.AvailabilitySlot, models.EmployeeSkill
+    out = Counter()
+    for company_id, location_id in db.query(E.company_id, E.location_id).filter(E.active == True):
+        out.update(contribution(True, company_id, location_id))
+    for (sid,) in db.query(K.service_id).join(E, E.id == K.employee_id).filter(E.active == True):
+        out[("service", sid)] += 1
+    rows = db.query(A.time_from, A.time_to, A.location_id, E.location_id.label("home")) \
+        .join(E, E.id == A.employee_id).filter(E.active == True)
+    for r in rows:
+        loc = r.location_id if r.location_id is not None else r.home
+        if loc is not None:
+            out[("location_minutes", loc)] += _minutes(r)
+    return out
+
+
+def reconcile(session_factory=None) -> int:
+    """Bring the counter table in line with the tables; returns how many counters were off."""
+    db = (session_factory or database.SessionLocal)()
+    try:
+        truth = compute(db)
+        current = Counter({(d, k): v for d, k, v in db.query(models.AggregateCounter.dimension,
+                                                             models.AggregateCounter.key,
+                                                             models.AggregateCounter.value)})
+        deltas = diff(current, truth)
+        apply(db, deltas)
+        db.commit()
+        if deltas:
+            logger.warning("aggregate counters corrected: %d drifted", len(deltas))
+        return len(deltas)
+    finally:
+        db.close()
+
+
+def is_empty() -> bool:
+    db = database.SessionLocal()
+    try:
+        return db.query(models.AggregateCounter.key).first() is None
+    finally:
+        db.close()
+
+
+async def run_reconciliation() -> None:
+    """Background task: periodic reconcile() of the primary and every shard."""
+    while True:
+        await asyncio.sleep(AGGREGATES_RECONCILE_INTERVAL)
+        for factory in [None] + [s.SessionLocal for s in database.shards.values()]:
+            try:
+                await asyncio.to_thread(reconcile, factory)
+            except Exception:
+                logger.exception("aggregate reconciliation failed; retrying next round")
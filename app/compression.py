@@ -0,0 +1,138 @@
+# app/compression.py
+"""
+Negotiated response compression (brotli or gzip) as pure ASGI middleware.
+
+Only complete, single-message bodies of a compressible content type and at
+least COMPRESSION_MIN_SIZE bytes are compressed; streamed responses and
+already-encoded bodies pass through untouched. The response start is held
+until the first body chunk shows which case applies, except for
+text/event-stream, which is forwarded at once: an SSE stream may send nothing
+for a long time, and the client must get its headers without waiting.
+Bodies above COMPRESSION_THREAD_THRESHOLD are compressed in a worker thread
+(zlib and brotli release the GIL) so large listings do not stall the event loop.
+
+Brotli is used when the `brotli` package is installed and the client prefers
+it; otherwise gzip.
+"""
+import asyncio
+import gzip
+import os
+from typing import List, Optional, Tuple
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+COMPRESSION_ENABLED = _get_bool("COMPRESSION_ENABLED", True)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_THREAD_THRESHOLD = int(os.getenv("COMPRESSION_THREAD_THRESHOLD", str(64 * 1024)))
+
+_COMPRESSIBLE = (b"application/json", b"application/problem+json", b"text/", b"application/yaml")
+_STREAMING = (b"text/event-stream",)
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding value (q=0 excludes), br before gzip on ties."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        offered[name.strip().lower()] = q
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = offered.get(coding, offered.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope.get("headers", []), b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1")) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                ctype = _header(headers, b"content-type") or b""
+                if (_header(headers, b"content-encoding") is not None or not ctype.startswith(_COMPRESSIBLE)
+                        or ctype.startswith(_STREAMING)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # held until we know the body
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # streamed or small: send as is
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            if len(body) >= COMPRESSION_THREAD_THRESHOLD:
+                data = await asyncio.to_thread(compress, body, encoding)
+            else:
+                data = compress(body, encoding)
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(data)).encode()),
+            ]
+            vary = _header(headers, b"vary")
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary.lower():
+                headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": data})
+
+        await self.app(scope, receive, send_wrapper)
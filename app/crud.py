@@ -1,55 +1,262 @@
-from sqlalchemy.orm import Session
-from typing import List
-from app import models, schemas
+from datetime import date, datetime
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Tuple
+from app import aggregates, database, models, outbox, schemas, sharding
+
+_EMPLOYEE_FIELDS = ("idp_id", "first_name", "last_name", "gender", "birth_date", "id_picture",
+                    "active", "company_id", "location_id")
+
+def _same(current, value) -> bool:
+    # birth_date is stored as DATETIME but arrives as a date
+    if isinstance(current, datetime) and type(value) is date:
+        return current.date() == value
+    return current == value
 
 # Employee
 def get_employee(db: Session, employee_id: int):
     return db.query(models.Employee).filter(models.Employee.id == employee_id).first()
 
-def get_employees(db: Session, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.Employee)
-        .filter(models.Employee.active == True)
-        .offset(skip)
-        .limit(limit)
+def get_active_employee_ids(db: Session, employee_ids) -> set:
+    rows = (
+        db.query(models.Employee.id)
+        .filter(models.Employee.id.in_(list(employee_ids)), models.Employee.active == True)
         .all()
     )
+    return {r[0] for r in rows}
+
+def _employee_page(db: Session, after_id: Optional[int], limit: int):
+    q = db.query(models.Employee).filter(models.Employee.active == True)
+    if after_id is not None:
+        q = q.filter(models.Employee.id > after_id)
+    return q.order_by(models.Employee.id).limit(limit)
+
+def get_employees(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Active employees by id; `after_id` is the keyset cursor (last id of the previous page)."""
+    if sharding.enabled():
+        # scatter: each shard returns its first skip + limit rows, merged by id
+        pages = sharding.gather(lambda sdb: _employee_page(sdb, after_id, skip + limit).options(
+            selectinload(models.Employee.availability), selectinload(models.Employee.skills)).all())
+        return sharding.merge_pages(pages, skip, limit, key=lambda e: e.id)
+    return _employee_page(db, after_id, limit).offset(skip).all()
+
+def match_employee_ids(db: Session, service_id=None, company_id=None, location_id=None,
+                       day=None, time_from=None, time_to=None, limit: int = 100) -> List[int]:
+    """
+    Active employees matching every given filter (same semantics as the roster snapshot):
+    location = home location or any slot there; a day/time window needs one slot covering it
+    (at `location_id` when given, a slot without location counting as the home location).
+    """
+    E, A, K = models.Employee, models.AvailabilitySlot, models.EmployeeSkill
+    q = db.query(E.id).filter(E.active == True)
+    if service_id is not None:
+        q = q.filter(db.query(K).filter(K.employee_id == E.id, K.service_id == service_id).exists())
+    if company_id is not None:
+        q = q.filter(E.company_id == company_id)
+    if day is not None or time_from is not None or time_to is not None:
+        slot = db.query(A).filter(A.employee_id == E.id)
+        if day is not None:
+            d = int(day) % 7 or 7
+            slot = slot.filter(A.day_of_week.in_((d, 0) if d == 7 else (d,)))
+        if time_from is not None:
+            slot = slot.filter(A.time_from <= time_from)
+        if time_to is not None:
+            slot = slot.filter(A.time_to >= time_to)
+        if location_id is not None:
+            slot = slot.filter(or_(A.location_id == location_id,
+                                   (A.location_id == None) & (E.location_id == location_id)))
+        q = q.filter(slot.exists())
+    elif location_id is not None:
+        q = q.filter(or_(E.location_id == location_id,
+                         db.query(A).filter(A.employee_id == E.id, A.location_id == location_id).exists()))
+    return [r[0] for r in q.order_by(E.id).limit(limit).all()]
+
+def coverage_employees(db: Session, company_id=None, service_id=None, location_id=None) -> List[Tuple[int, Optional[int]]]:
+    """(id, home location_id) of active employees in the team; a location matches home or any slot there."""
+    E, A, K = models.Employee, models.AvailabilitySlot, models.EmployeeSkill
+    q = db.query(E.id, E.location_id).filter(E.active == True)
+    if service_id is not None:
+        q = q.filter(db.query(K).filter(K.employee_id == E.id, K.service_id == service_id).exists())
+    if company_id is not None:
+        q = q.filter(E.company_id == company_id)
+    if location_id is not None:
+        q = q.filter(or_(E.location_id == location_id,
+                         db.query(A).filter(A.employee_id == E.id, A.location_id == location_id).exists()))
+    return [(r[0], r[1]) for r in q.order_by(E.id).all()]
+
+def skill_query(db: Session, all_of=(), any_of=(), none_of=(), company_id=None, location_id=None,
+                limit: int = 100):
+    """Active employees with all skills in all_of, any in any_of, none in none_of -> (ids, total)."""
+    E, K = models.Employee, models.EmployeeSkill
+    has = lambda cond: db.query(K).filter(K.employee_id == E.id, cond).exists()
+    q = db.query(E.id).filter(E.active == True)
+    for sid in all_of:
+        q = q.filter(has(K.service_id == sid))
+    if any_of:
+        q = q.filter(has(K.service_id.in_(list(any_of))))
+    if none_of:
+        q = q.filter(~has(K.service_id.in_(list(none_of))))
+    if company_id is not None:
+        q = q.filter(E.company_id == company_id)
+    if location_id is not None:
+        q = q.filter(E.location_id == location_id)
+    return [r[0] for r in q.order_by(E.id).limit(limit).all()], q.count()
+
+def search_employees(db: Session, words, company_id: Optional[int] = None, limit: int = 10):
+    """Active employees whose first or last name starts with every word (the index-less fallback)."""
+    E = models.Employee
+    q = db.query(E.id, E.first_name, E.last_name, E.company_id).filter(E.active == True)
+    for w in words:
+        q = q.filter(or_(func.lower(E.first_name).startswith(w, autoescape=True),
+                         func.lower(E.last_name).startswith(w, autoescape=True)))
+    if company_id is not None:
+        q = q.filter(E.company_id == company_id)
+    rows = q.order_by(E.last_name, E.first_name, E.id).limit(limit).all()
+    return [{"id": r[0], "first_name": r[1], "last_name": r[2], "company_id": r[3]} for r in rows]
+
+# Writes are single INSERT/UPDATE statements (RETURNING the row where the backend
+# supports it) and nothing is refreshed after commit; rows are returned as dicts.
+_COLUMNS = tuple(models.Employee.__table__.c)
+_COUNTED = ("active", "company_id", "location_id")
+
+def _state(row) -> tuple:
+    return tuple(row[f] for f in _COUNTED)
+
+def _recount(db: Session, employee_id: int, before: tuple, after: tuple) -> None:
+    """Move the employee's aggregate contribution from `before` to `after` (active, company, location)."""
+    if before == after:
+        return
+    skills, slots = [], []
+    if before[0] or after[0]:
+        skills = [s.service_id for s in get_skills(db, employee_id)]
+        slots = get_availability(db, employee_id)
+    aggregates.apply(db, aggregates.diff(aggregates.contribution(*before, skills, slots),
+                                         aggregates.contribution(*after, skills, slots)))
+
+def _update_row(db: Session, employee_id: int, values: dict, *where) -> Optional[dict]:
+    """UPDATE one employee and return the new row (None if no row matched)."""
+    E = models.Employee
+    stmt = (
+        update(E).where(E.id == employee_id, *where).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        row = db.execute(stmt.returning(*_COLUMNS)).first()
+        return dict(row._mapping) if row else None
+    if not db.execute(stmt).rowcount:
+        return None
+    return dict(db.execute(select(*_COLUMNS).where(E.id == employee_id)).one()._mapping)
 
-def create_employee(db: Session, emp: schemas.EmployeeCreate):
+def create_employee(db: Session, emp: schemas.EmployeeCreate) -> dict:
     # pydantic v2: model_dump()
-    db_emp = models.Employee(**emp.model_dump())
-    db.add(db_emp)
+    values = {"active": True, **emp.model_dump()}
+    if sharding.enabled():
+        # the row goes to the company's shard under a globally allocated id
+        shard = sharding.shard_for_company(values["company_id"])
+        values["id"] = sharding.allocate_employee_id(shard)
+        sdb = database.shards[shard].SessionLocal()
+        try:
+            return _insert_employee(sdb, values)
+        finally:
+            sdb.close()
+    return _insert_employee(db, values)
+
+def _insert_employee(db: Session, values: dict) -> dict:
+    stmt = insert(models.Employee).values(**values)
+    if db.get_bind().dialect.insert_returning:
+        row = dict(db.execute(stmt.returning(*_COLUMNS)).one()._mapping)
+    else:
+        row = {"id": db.execute(stmt).inserted_primary_key[0], **values}
+    outbox.record(db, "employee.created", row["id"], {f: values.get(f, row[f]) for f in _EMPLOYEE_FIELDS})
+    aggregates.apply(db, aggregates.contribution(*_state(row)))
     db.commit()
-    db.refresh(db_emp)
-    return db_emp
+    return row
 
-def update_employee(db: Session, employee_id: int, emp: schemas.EmployeeUpdate):
-    db_emp = get_employee(db, employee_id)
-    if not db_emp:
+def update_employee(db: Session, employee_id: int, emp: schemas.EmployeeUpdate) -> Optional[dict]:
+    """Full replace: only columns that actually change are written (and reported in the event)."""
+    E = models.Employee
+    row = db.execute(select(*_COLUMNS).where(E.id == employee_id).with_for_update()).first()
+    if row is None:
         return None
-    for field, value in emp.model_dump().items():
-        setattr(db_emp, field, value)
+    current = dict(row._mapping)
+    changed = {f: v for f, v in emp.model_dump().items() if not _same(current[f], v)}
+    if not changed:
+        return current
+    if "company_id" in changed and sharding.enabled():
+        sharding.check_move(employee_id, changed["company_id"])
+    db.execute(update(E).where(E.id == employee_id).values(**changed).execution_options(synchronize_session=False))
+    outbox.record(db, "employee.updated", employee_id, changed)
+    _recount(db, employee_id, _state(current), _state({**current, **changed}))
     db.commit()
-    db.refresh(db_emp)
-    return db_emp
+    return {**current, **changed}
 
-def soft_delete_employee(db: Session, employee_id: int):
-    db_emp = get_employee(db, employee_id)
-    if db_emp:
-        db_emp.active = False
-        db.commit()
-    return db_emp
+def patch_employee(db: Session, employee_id: int, fields: dict) -> Optional[dict]:
+    """
+    Partial update of the supplied fields in one UPDATE statement. The event lists
+    the fields written. The current row is read first only when active / company /
+    location change (the aggregate counters need the old values).
+    """
+    E = models.Employee
+    if "company_id" in fields and sharding.enabled():
+        sharding.check_move(employee_id, fields["company_id"])
+    if not fields:
+        row = db.execute(select(*_COLUMNS).where(E.id == employee_id)).first()
+        return dict(row._mapping) if row else None
+    before = None
+    if fields.keys() & set(_COUNTED):
+        before = db.execute(select(*(getattr(E, f) for f in _COUNTED)).where(E.id == employee_id).with_for_update()).first()
+        if before is None:
+            return None
+    row = _update_row(db, employee_id, fields)
+    if row is None:
+        db.rollback()
+        return None
+    outbox.record(db, "employee.updated", employee_id, fields)
+    if before is not None:
+        _recount(db, employee_id, tuple(before), _state(row))
+    db.commit()
+    return row
+
+def soft_delete_employee(db: Session, employee_id: int) -> bool:
+    """Deactivate in one UPDATE; returns False if the employee does not exist."""
+    E = models.Employee
+    row = _update_row(db, employee_id, {"active": False}, E.active == True)
+    if row is None:
+        db.rollback()
+        return db.query(E.id).filter(E.id == employee_id).first() is not None
+    outbox.record(db, "employee.deactivated", employee_id, {"active": False})
+    _recount(db, employee_id, (True, row["company_id"], row["location_id"]), _state(row))
+    db.commit()
+    return True
 
 # Availability
 def get_availability(db: Session, employee_id: int):
     return db.query(models.AvailabilitySlot).filter(models.AvailabilitySlot.employee_id == employee_id).all()
 
+def get_availability_for_employees(db: Session, employee_ids):
+    by_employee = {eid: [] for eid in employee_ids}
+    rows = db.query(models.AvailabilitySlot).filter(models.AvailabilitySlot.employee_id.in_(list(by_employee))).all()
+    for row in rows:
+        by_employee[row.employee_id].append(row)
+    return by_employee
+
+def _count_slots(db: Session, employee_id: int, slots, sign: int) -> None:
+    row = db.query(models.Employee.active, models.Employee.location_id).filter(models.Employee.id == employee_id).first()
+    if row and row.active:
+        aggregates.apply(db, {k: sign * v for k, v in aggregates.slot_minutes(slots, row.location_id).items()})
+
 def create_availability(db: Session, employee_id: int, slots: List[schemas.AvailabilitySlotCreate]):
     objs = []
     for slot in slots:
         obj = models.AvailabilitySlot(employee_id=employee_id, **slot.model_dump())
         db.add(obj)
         objs.append(obj)
+    db.flush()
+    outbox.record(db, "availability.created", employee_id, {"slots": [
+        {"id": o.id, "day_of_week": o.day_of_week, "time_from": o.time_from, "time_to": o.time_to,
+         "location_id": o.location_id} for o in objs
+    ]})
+    _count_slots(db, employee_id, objs, 1)
     db.commit()
     return objs
 
@@ -57,6 +264,8 @@ def delete_availability_slot(db: Session, slot_id: int):
     obj = db.query(models.AvailabilitySlot).filter(models.AvailabilitySlot.id == slot_id).first()
     if obj:
         db.delete(obj)
+        outbox.record(db, "availability.deleted", obj.employee_id, {"slot_id": slot_id})
+        _count_slots(db, obj.employee_id, [obj], -1)
         db.commit()
     return obj
 
@@ -65,8 +274,15 @@ def get_skills(db: Session, employee_id: int):
     return db.query(models.EmployeeSkill).filter(models.EmployeeSkill.employee_id == employee_id).all()
 
 def replace_skills(db: Session, employee_id: int, service_ids: List[int]):
+    row = db.query(models.Employee.active).filter(models.Employee.id == employee_id).first()
+    if row and row.active:
+        old, new = {s.service_id for s in get_skills(db, employee_id)}, set(service_ids)
+        deltas = {("service", sid): -1 for sid in old - new}
+        deltas.update({("service", sid): 1 for sid in new - old})
+        aggregates.apply(db, deltas)
     db.query(models.EmployeeSkill).filter(models.EmployeeSkill.employee_id == employee_id).delete()
     for sid in service_ids:
         db.add(models.EmployeeSkill(employee_id=employee_id, service_id=sid))
+    outbox.record(db, "skills.replaced", employee_id, {"service_ids": list(service_ids)})
     db.commit()
     return get_skills(db, employee_id)
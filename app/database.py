@@ -1,9 +1,259 @@
+import asyncio
+import itertools
 import os
-from sqlalchemy import create_engine
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Connection pool (QueuePool; ignored for SQLite which uses its own pool classes)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle below MySQL's wait_timeout so the server never drops a pooled connection first.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# >0: validate the pool from a background task every N seconds instead of
+# pinging on every checkout (pre-ping then defaults to off).
+DB_POOL_VALIDATION_INTERVAL = float(os.getenv("DB_POOL_VALIDATION_INTERVAL", "0"))
+DB_POOL_PRE_PING = _get_bool("DB_POOL_PRE_PING", DB_POOL_VALIDATION_INTERVAL <= 0)
+
+# Startup readiness wait (seconds). The first retry happens almost immediately
+# and the delay doubles up to DB_STARTUP_MAX_DELAY, so a pod notices the DB
+# coming up within that cap instead of a fixed multi-second sleep.
+DB_STARTUP_TIMEOUT = float(os.getenv("DB_STARTUP_TIMEOUT", "30"))
+DB_STARTUP_MAX_DELAY = float(os.getenv("DB_STARTUP_MAX_DELAY", "0.5"))
+
+
+def _engine_kwargs(url: Optional[str]) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url and not url.startswith("sqlite"):
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return kwargs
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
+
+# ─── Read replicas ────────────────────────────────────────────────────────────
+# Optional, comma-separated. Read-only handlers use them round-robin; a replica
+# that fails is skipped for DB_REPLICA_COOLDOWN seconds.
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+DB_REPLICA_COOLDOWN = float(os.getenv("DB_REPLICA_COOLDOWN", "10"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(url, **_engine_kwargs(url))
+        self.SessionLocal = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
+        self.down_until = 0.0
+
+    def healthy(self, now: Optional[float] = None) -> bool:
+        return self.down_until <= (time.monotonic() if now is None else now)
+
+
+replicas: List[Replica] = [Replica(u) for u in DATABASE_REPLICA_URLS]
+_replica_rr = itertools.count()
+
+
+def pick_replica() -> Optional[Replica]:
+    """Next healthy replica in round-robin order; None means read from the primary."""
+    n = len(replicas)
+    if not n:
+        return None
+    now = time.monotonic()
+    start = next(_replica_rr)
+    for i in range(n):
+        r = replicas[(start + i) % n]
+        if r.healthy(now):
+            return r
+    return None
+
+
+def mark_replica_down(replica: Replica) -> None:
+    replica.down_until = time.monotonic() + DB_REPLICA_COOLDOWN
+
+
+def ping(bind: Optional[Engine] = None) -> bool:
+    """Run a trivial statement; True iff the database answered."""
+    try:
+        with (bind or engine).connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+async def wait_for_db(timeout: float = DB_STARTUP_TIMEOUT) -> bool:
+    """
+    Wait until the database accepts connections, with exponential backoff.
+    The blocking connect runs in a worker thread so the event loop stays free.
+    Returns False if the database is still unreachable after `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        if await asyncio.to_thread(ping):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(delay, remaining))
+        delay = min(delay * 2, DB_STARTUP_MAX_DELAY)
+
+
+_pool_counters = {"timeouts": 0, "validation_failures": 0}
+
+
+def record_pool_timeout() -> None:
+    _pool_counters["timeouts"] += 1
+
+
+def pool_status(bind: Optional[Engine] = None) -> Dict[str, Any]:
+    """Point-in-time connection pool counters (only those the pool class supports)."""
+    pool = (bind or engine).pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            status[name] = fn()
+    if "size" in status and "overflow" in status and hasattr(pool, "_max_overflow"):
+        status["max_overflow"] = pool._max_overflow
+        status["saturated"] = (
+            status["checkedin"] == 0 and pool._max_overflow >= 0
+            and status["overflow"] >= pool._max_overflow
+        )
+    return status
+
+
+def pool_config() -> Dict[str, Any]:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pre_ping": DB_POOL_PRE_PING,
+        "validation_interval": DB_POOL_VALIDATION_INTERVAL,
+    }
+
+
+def pool_counters() -> Dict[str, int]:
+    return dict(_pool_counters)
+
+
+def validate_pool(bind: Optional[Engine] = None) -> bool:
+    """
+    Background replacement for per-checkout pre-ping: one probe per interval.
+    On failure the idle connections are discarded so the next checkouts
+    reconnect instead of failing on a dead socket.
+    """
+    target = bind or engine
+    if ping(target):
+        return True
+    _pool_counters["validation_failures"] += 1
+    target.dispose()
+    return False
+
+
+async def run_pool_validation(interval: float = DB_POOL_VALIDATION_INTERVAL) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(validate_pool)
+
+
+def check_replicas() -> None:
+    for r in replicas:
+        if ping(r.engine):
+            r.down_until = 0.0
+        else:
+            mark_replica_down(r)
+
+
+async def run_replica_health_checks(interval: float = DB_REPLICA_CHECK_INTERVAL) -> None:
+    while True:
+        await asyncio.to_thread(check_replicas)
+        await asyncio.sleep(interval)
+
+
+def replica_status() -> List[Dict[str, Any]]:
+    now = time.monotonic()
+    return [
+        {"replica": i, "healthy": r.healthy(now), **pool_status(r.engine)}
+        for i, r in enumerate(replicas)
+    ]
+
+
+# ─── Company-based sharding ───────────────────────────────────────────────────
+# Optional. DATABASE_SHARDS="a=mysql+pymysql://...,b=mysql+pymysql://..." gives
+# one engine per shard; SHARD_MAP="1=a,7=b" pins companies to shards (others
+# are hashed, employees without a company go to SHARD_DEFAULT). The primary
+# (DATABASE_URL) keeps the employee-id directory, see app.sharding.
+#
+# The hash is crc32(company) % number of shards, so adding or removing a shard
+# changes where an unmapped company's *new* employees go while its existing
+# ones stay put (the company ends up split, and moves between its employees'
+# shards are rejected). Before changing DATABASE_SHARDS, pin every company
+# that already has employees in SHARD_MAP to the shard it hashes to today.
+
+def _pairs(value: str) -> Dict[str, str]:
+    out = {}
+    for item in value.split(","):
+        if item.strip():
+            k, _, v = item.partition("=")
+            out[k.strip()] = v.strip()
+    return out
+
+
+class Shard:
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.url = url
+        self.engine = create_engine(url, **_engine_kwargs(url))
+        self.SessionLocal = sessionmaker(bind=self.engine, autoflush=False, autocommit=False)
+
+
+shards: Dict[str, Shard] = {}
+shard_map: Dict[int, str] = {}
+default_shard: Optional[str] = None
+
+
+def configure_shards(urls: Dict[str, str], company_map: Optional[Dict[int, str]] = None,
+                     default: Optional[str] = None) -> None:
+    """(Re)build the shard engines; an empty `urls` turns sharding off."""
+    global default_shard
+    company_map = company_map or {}
+    unknown = (set(company_map.values()) | ({default} if default else set())) - set(urls)
+    if unknown:
+        raise ValueError(f"shard map refers to unknown shards: {sorted(unknown)}")
+    for s in shards.values():
+        s.engine.dispose()
+    shards.clear()
+    shards.update({name: Shard(name, url) for name, url in urls.items()})
+    shard_map.clear()
+    shard_map.update(company_map)
+    default_shard = default or (next(iter(urls)) if urls else None)
+
+
+configure_shards(
+    _pairs(os.getenv("DATABASE_SHARDS", "")),
+    {int(k): v for k, v in _pairs(os.getenv("SHARD_MAP", "")).items()},
+    os.getenv("SHARD_DEFAULT") or None,
+)
@@ -0,0 +1,88 @@
+# app/deadline.py
+"""
+End-to-end request deadlines.
+
+Every request gets a time budget: `X-Request-Timeout-Ms` from the caller
+(capped at REQUEST_DEADLINE_MAX_MS) or REQUEST_DEADLINE_MS by default. The
+budget is enforced by:
+
+- upstream clients, whose per-call timeouts shrink to what is left (and which
+  forward the remainder as X-Request-Timeout-Ms), see resilience.deadline_hooks;
+- SQL statements: none is started once the budget is spent, and on MySQL each
+  SELECT carries a MAX_EXECUTION_TIME hint of the remaining milliseconds.
+
+An exhausted budget surfaces as DeadlineExceeded -> 504.
+"""
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.request_context import DeadlineExceeded, remaining, set_deadline
+
+REQUEST_DEADLINE_MS = int(os.getenv("REQUEST_DEADLINE_MS", "10000"))
+REQUEST_DEADLINE_MAX_MS = int(os.getenv("REQUEST_DEADLINE_MAX_MS", "30000"))
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+_header_key = DEADLINE_HEADER.lower().encode("latin-1")
+
+# MySQL error raised when MAX_EXECUTION_TIME interrupts a statement
+MYSQL_QUERY_TIMEOUT = 3024
+
+
+def _budget_ms(headers) -> int:
+    for k, v in headers:
+        if k == _header_key:
+            try:
+                asked = int(v)
+            except ValueError:
+                break
+            if asked > 0:
+                return min(asked, REQUEST_DEADLINE_MAX_MS)
+            break
+    return REQUEST_DEADLINE_MS
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware setting the request deadline (0 budget = no deadline)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            budget = _budget_ms(scope.get("headers", ()))
+            set_deadline(time.monotonic() + budget / 1000.0 if budget > 0 else None)
+        await self.app(scope, receive, send)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    rem = remaining()
+    if rem is None:
+        return statement, parameters
+    if rem <= 0:
+        raise DeadlineExceeded("request deadline exceeded before SQL statement")
+    if conn.dialect.name == "mysql" and statement[:6].upper() == "SELECT":
+        # keep the original text for per-shape statistics (instrumentation)
+        context._unhinted_statement = statement
+        statement = f"SELECT /*+ MAX_EXECUTION_TIME({max(1, int(rem * 1000))}) */" + statement[6:]
+    return statement, parameters
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    orig = getattr(exc, "orig", None)
+    args = getattr(orig, "args", ())
+    return bool(args) and args[0] == MYSQL_QUERY_TIMEOUT
+
+
+_installed = False
+
+
+def install() -> None:
+    """Attach the SQL deadline hook (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute, retval=True)
+    _installed = True
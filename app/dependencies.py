@@ -1,9 +1,92 @@
+import os
+import time
+from typing import Optional
+
+from app import database, metrics, sharding
 from app.database import SessionLocal
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.exc import OperationalError
+
+# Read-your-writes: after a write the client gets a `last_write` marker (cookie
+# and X-Last-Write header, epoch ms). Reads that present a marker younger than
+# this window are served by the primary so they never observe replication lag.
+DB_READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "2.0"))
+LAST_WRITE_COOKIE = "last_write"
+
+READ_ROUTING = metrics.Counter(
+    "db_read_routing_total", "Read-only requests by the database they were served from.", ("target",),
+)
+
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _shard_session(request: Request):
+    """With sharding, per-employee routes get a session on the employee's shard."""
+    if not sharding.enabled() or "employee_id" not in request.path_params:
+        return None
+    try:
+        employee_id = int(request.path_params["employee_id"])
+    except ValueError:
+        return None  # rejected by path validation
+    return sharding.session_for_employee(employee_id)
+
+
+def require_unsharded() -> None:
+    """
+    For routes that read across employees from the primary alone (or follow its
+    outbox, while shard writes record theirs on the shard): with sharding on
+    they would silently miss rows, so they answer 501 instead.
+    """
+    if sharding.enabled():
+        raise HTTPException(status_code=501, detail="Not available while DATABASE_SHARDS is configured")
+
+
+def get_db(request: Request, response: Response):
+    if request.method not in _SAFE_METHODS:
+        marker = str(int(time.time() * 1000))
+        response.headers["X-Last-Write"] = marker
+        response.set_cookie(LAST_WRITE_COOKIE, marker, max_age=int(DB_READ_YOUR_WRITES_WINDOW) + 1)
+    db = _shard_session(request) or SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _needs_primary(request: Request) -> bool:
+    if request.headers.get("x-consistency", "").lower() == "strong":
+        return True
+    marker: Optional[str] = request.headers.get("x-last-write") or request.cookies.get(LAST_WRITE_COOKIE)
+    if not marker:
+        return False
+    try:
+        return time.time() * 1000 - int(marker) < DB_READ_YOUR_WRITES_WINDOW * 1000
+    except ValueError:
+        return False
+
 
-def get_db():
-    db = SessionLocal()
+def get_read_db(request: Request):
+    """
+    Session for read-only handlers: the owning shard for per-employee routes
+    when sharding is on, else a healthy replica (round-robin) when replicas are
+    configured, otherwise — or for read-your-writes — the primary.
+    """
+    db = _shard_session(request)
+    if db is not None:
+        READ_ROUTING.inc(("shard",))
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    replica = None if _needs_primary(request) else database.pick_replica()
+    db = (replica.SessionLocal if replica else database.SessionLocal)()
+    READ_ROUTING.inc(("replica" if replica else "primary",))
     try:
         yield db
+    except OperationalError:
+        if replica is not None:
+            database.mark_replica_down(replica)
+        raise
     finally:
         db.close()
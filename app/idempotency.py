@@ -0,0 +1,247 @@
+# app/idempotency.py
+"""
+Idempotency keys for POST / PUT / PATCH.
+
+A write carrying `Idempotency-Key` first claims the key in the
+`idempotency_keys` table (primary key lookup + insert), together with a
+fingerprint of method, path, query and body. When the handler finishes, its
+response (status, content type, location, body) is stored on the row; 5xx
+responses release the key so the retry runs again.
+
+A retry with the same key is answered from the stored row after a single
+primary-key lookup, without running the handler or any Company / FaaS
+validation (`Idempotent-Replayed: true`). The same key with a different
+request is rejected with 422, and a retry arriving while the first attempt is
+still running gets 409 + Retry-After. Rows expire after IDEMPOTENCY_TTL_HOURS
+and are pruned by a background task.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from app import database, metrics, models
+from app.schemas import Problem
+
+logger = logging.getLogger(__name__)
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+IDEMPOTENCY_ENABLED = _get_bool("IDEMPOTENCY_ENABLED", True)
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+# a claim without a stored response older than this is considered abandoned
+IDEMPOTENCY_LOCK_TIMEOUT = float(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+IDEMPOTENCY_MAX_RESPONSE = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE", str(1024 * 1024)))
+IDEMPOTENCY_PRUNE_INTERVAL = float(os.getenv("IDEMPOTENCY_PRUNE_INTERVAL", "3600"))
+
+HEADER = b"idempotency-key"
+_METHODS = ("POST", "PUT", "PATCH")
+_STORED_HEADERS = (b"content-type", b"location")
+
+REQUESTS = metrics.Counter(
+    "idempotency_requests_total", "Writes carrying an Idempotency-Key, by outcome.", ("outcome",),
+)
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    h = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def _as_dict(row: models.IdempotencyKey) -> Dict[str, Any]:
+    return {
+        "fingerprint": row.fingerprint,
+        "status_code": row.status_code,
+        "headers": json.loads(row.headers) if row.headers else [],
+        "body": row.body or b"",
+    }
+
+
+def claim(key: str, fp: str) -> Optional[Dict[str, Any]]:
+    """Claim `key` for this request: None when claimed, otherwise the existing entry."""
+    db = database.SessionLocal()
+    try:
+        now = datetime.utcnow()
+        row = db.get(models.IdempotencyKey, key)
+        if row is not None:
+            expired = row.created_at < now - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+            abandoned = row.status_code is None and row.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+            if not (expired or abandoned):
+                return _as_dict(row)
+            db.delete(row)
+            db.flush()
+        db.add(models.IdempotencyKey(key=key, fingerprint=fp, created_at=now))
+        try:
+            db.commit()
+        except IntegrityError:  # a concurrent attempt claimed it first
+            db.rollback()
+            row = db.get(models.IdempotencyKey, key)
+            return _as_dict(row) if row is not None else claim(key, fp)
+        return None
+    finally:
+        db.close()
+
+
+def complete(key: str, status_code: int, headers: List[List[str]], body: bytes) -> None:
+    db = database.SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).update(
+            {"status_code": status_code, "headers": json.dumps(headers), "body": body},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def release(key: str) -> None:
+    db = database.SessionLocal()
+    try:
+        db.query(models.IdempotencyKey).filter(models.IdempotencyKey.key == key).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def prune(older_than: timedelta) -> int:
+    db = database.SessionLocal()
+    try:
+        n = (
+            db.query(models.IdempotencyKey)
+            .filter(models.IdempotencyKey.created_at < datetime.utcnow() - older_than)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+async def run_pruning() -> None:
+    """Background task: drop keys older than IDEMPOTENCY_TTL_HOURS."""
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_PRUNE_INTERVAL)
+        try:
+            await asyncio.to_thread(prune, timedelta(hours=IDEMPOTENCY_TTL_HOURS))
+        except Exception:
+            logger.exception("idempotency key pruning failed; retrying next round")
+
+
+async def _send_json(send, status: int, content: Dict[str, Any], extra=()) -> None:
+    body = json.dumps(content).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *extra],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _problem(status: int, title: str, path: str) -> Dict[str, Any]:
+    return Problem(title=title, status=status, instance=path).model_dump()
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware; keep it inside the compression middleware so stored bodies are unencoded."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in _METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = next((v for k, v in scope.get("headers", ()) if k == HEADER), None)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        key = key.decode("latin-1").strip()
+        if not key or len(key) > 255:
+            await _send_json(send, 400, _problem(400, "Idempotency-Key must be 1..255 characters", path))
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fp = fingerprint(scope["method"], path, scope.get("query_string", b""), body)
+
+        existing = await asyncio.to_thread(claim, key, fp)
+        if existing is not None:
+            if existing["fingerprint"] != fp:
+                REQUESTS.inc(("mismatch",))
+                await _send_json(send, 422, _problem(422, "Idempotency-Key was used for a different request", path))
+            elif existing["status_code"] is None:
+                REQUESTS.inc(("in_progress",))
+                await _send_json(send, 409, _problem(409, "A request with this Idempotency-Key is in progress", path),
+                                 [(b"retry-after", b"1")])
+            else:
+                REQUESTS.inc(("replayed",))
+                stored = existing["body"]
+                headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in existing["headers"]]
+                await send({
+                    "type": "http.response.start",
+                    "status": existing["status_code"],
+                    "headers": headers + [(b"content-length", str(len(stored)).encode()),
+                                          (b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": stored})
+            return
+
+        replayed_body = False
+
+        async def receive_once():
+            nonlocal replayed_body
+            if not replayed_body:
+                replayed_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        start: Dict[str, Any] = {}
+        out: List[bytes] = []
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if size <= IDEMPOTENCY_MAX_RESPONSE:
+                    out.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_once, send_wrapper)
+        except BaseException:
+            await asyncio.to_thread(release, key)
+            raise
+        status = start.get("status", 500)
+        if status >= 500 or size > IDEMPOTENCY_MAX_RESPONSE:
+            REQUESTS.inc(("not_stored",))
+            await asyncio.to_thread(release, key)
+            return
+        headers = [[k.decode("latin-1"), v.decode("latin-1")] for k, v in start.get("headers", ())
+                   if k.lower() in _STORED_HEADERS]
+        REQUESTS.inc(("stored",))
+        await asyncio.to_thread(complete, key, status, headers, b"".join(out))
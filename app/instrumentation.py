@@ -0,0 +1,119 @@
+# app/instrumentation.py
+"""
+SQL instrumentation: per-request query count and DB time, slow-query log,
+N+1 detection, and a `Server-Timing` response header.
+
+The engine hooks are attached to the Engine class, so every engine (including
+ones swapped in by tests) is covered. Per statement the cost is two
+perf_counter() calls and one dict increment.
+"""
+import logging
+import os
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+from app.request_context import begin_stats, current_stats
+
+logger = logging.getLogger("app.sql")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# The same statement shape executed this many times in one request is reported.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+DB_QUERIES_PER_REQUEST = metrics.Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("route",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+SLOW_QUERIES = metrics.Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+N_PLUS_ONE = metrics.Counter(
+    "db_n_plus_one_total", "Requests that repeated one statement shape N_PLUS_ONE_THRESHOLD times.",
+    ("route",),
+)
+
+_ws = re.compile(r"\s+")
+
+
+def _shorten(statement: str, limit: int = 1000) -> str:
+    # Only the statement text is logged; bound parameters are never included.
+    s = _ws.sub(" ", statement).strip()
+    return s if len(s) <= limit else s[:limit] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - getattr(context, "_query_start", time.perf_counter())
+    # the deadline hook may have added a per-request MAX_EXECUTION_TIME hint
+    statement = getattr(context, "_unhinted_statement", statement)
+
+    if elapsed * 1000.0 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.inc()
+        logger.warning("slow query (%.1f ms): %s [parameters redacted]", elapsed * 1000.0, _shorten(statement))
+
+    stats = current_stats()
+    if stats is None:
+        return
+    stats.db_time += elapsed
+    stats.db_queries += 1
+    n = stats.shapes.get(statement, 0) + 1
+    stats.shapes[statement] = n
+    if n == N_PLUS_ONE_THRESHOLD:
+        stats.flagged += 1
+        logger.warning("possible N+1: statement executed %d times in one request: %s", n, _shorten(statement, 300))
+
+
+_installed = False
+
+
+def install() -> None:
+    """Attach the engine hooks (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware that opens a RequestStats scope and reports it as
+    `Server-Timing: db;dur=..;desc="N queries", upstream;dur=.., total;dur=..`.
+    """
+
+    def __init__(self, app, header: bool = True):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = begin_stats()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if self.header and message["type"] == "http.response.start":
+                total = (time.perf_counter() - start) * 1000.0
+                value = (
+                    f'db;dur={stats.db_time * 1000.0:.2f};desc="{stats.db_queries} queries", '
+                    f"upstream;dur={stats.upstream_time * 1000.0:.2f}, total;dur={total:.2f}"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = metrics.route_template(scope)
+            if stats.db_queries:
+                DB_QUERIES_PER_REQUEST.observe((route,), stats.db_queries)
+            if stats.flagged:
+                N_PLUS_ONE.inc((route,))
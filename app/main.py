@@ -1,54 +1,156 @@
+import asyncio
+import logging
 import os
 import time
-from typing import Tuple
+from typing import Any, Dict, Tuple
 from dotenv import load_dotenv
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
-from sqlalchemy.exc import OperationalError
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
 
 # load .env
 load_dotenv()
 
-from app.database import engine, Base
+from app import database
+from app.database import Base
 from contextlib import asynccontextmanager
 import app.models  # noqa: ensure models are registered
 
 # routers
-from app.routers import employees, availability, skills
+from app.routers import employees, availability, skills, changes, internal
 from app.schemas import Problem
+from app import admission, aggregates, compression, deadline, idempotency, metrics, instrumentation, name_index, outbox, roster, skill_index
+from app.request_context import DeadlineExceeded
+from app.services.company_client import CompanyServiceClient
+from app.services.faas_client import FaaSClient
+from app.services import reservation_client, warmup
+
+logger = logging.getLogger(__name__)
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+STORAGE_PATH = os.getenv("STORAGE_PATH", "storage")
+
+# Schema creation is opt-in: production schemas are managed via schema.sql.
+DB_CREATE_ALL = _get_bool("DB_CREATE_ALL", False)
+# How long the lifespan blocks on the first DB check before serving traffic
+# (readiness keeps being resolved in the background after that).
+STARTUP_INLINE_WAIT = float(os.getenv("STARTUP_INLINE_WAIT", "1.0"))
+# Upstream probes are cached so frequent readiness probes do not hammer peers.
+READY_UPSTREAM_TTL = float(os.getenv("READY_UPSTREAM_TTL", "5.0"))
 
 OPENAPI_TAGS = [
     {"name": "employees", "description": "Employee CRUD."},
     {"name": "availability", "description": "Per-employee weekly availability slots."},
     {"name": "skills", "description": "Per-employee service skills."},
+    {"name": "changes", "description": "Change feed of employee data (long-poll and SSE)."},
     {"name": "health", "description": "Service health & readiness."},
+    {"name": "internal", "description": "Service-to-service hooks (not exposed through the gateway)."},
+    {"name": "metrics", "description": "Prometheus metrics."},
 ]
 
+def check_sharding_config() -> None:
+    """
+    The in-process indexes load from the primary and follow its outbox, so they
+    would never see employees written to shards: refuse that combination.
+    """
+    if not database.shards:
+        return
+    enabled = [name for name, on in (
+        ("ROSTER_SNAPSHOT_ENABLED", roster.ROSTER_SNAPSHOT_ENABLED),
+        ("SKILL_INDEX_ENABLED", skill_index.SKILL_INDEX_ENABLED),
+        ("NAME_SEARCH_ENABLED", name_index.NAME_SEARCH_ENABLED),
+    ) if on]
+    if enabled:
+        raise RuntimeError(f"DATABASE_SHARDS cannot be combined with {', '.join(enabled)}")
+
+async def _startup(app: FastAPI) -> None:
+    while not await database.wait_for_db():
+        logger.warning("database not reachable yet; still waiting")
+    if DB_CREATE_ALL:
+        await asyncio.to_thread(Base.metadata.create_all, bind=database.engine)
+        for shard in database.shards.values():
+            await asyncio.to_thread(Base.metadata.create_all, bind=shard.engine)
+    for factory in [None] + [s.SessionLocal for s in database.shards.values()]:
+        await asyncio.to_thread(outbox.ensure_sequence, factory)
+    try:
+        # first start with the counter table: fill it before serving dashboards
+        if await asyncio.to_thread(aggregates.is_empty):
+            await asyncio.to_thread(aggregates.reconcile)
+    except Exception:
+        logger.exception("initial aggregate reconciliation failed; the periodic job will retry")
+    if warmup.CACHE_WARMUP_ENABLED:
+        # not ready before the Company cache is warm (or the timeout passed; the
+        # warm-up thread then keeps going in the background)
+        app.state.warmup = "running"
+        try:
+            covered = await asyncio.wait_for(asyncio.to_thread(warmup.warm), warmup.CACHE_WARMUP_TIMEOUT)
+            app.state.warmup = "done"
+            logger.info("company cache warmed: %s", covered)
+        except asyncio.TimeoutError:
+            app.state.warmup = "timeout"
+            logger.warning("company cache warm-up still running after %ss; taking traffic", warmup.CACHE_WARMUP_TIMEOUT)
+        except Exception:
+            app.state.warmup = "failed"
+            logger.exception("company cache warm-up failed; lookups will fill the cache")
+    app.state.started = True
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup logic
-    for _ in range(10):
-        try:
-            with engine.connect():
-                break
-        except OperationalError:
-            time.sleep(2)
-    Base.metadata.create_all(bind=engine)
+    check_sharding_config()
+    # Startup logic: never block the event loop; /ready reports progress.
+    app.state.started = False
+    app.state.warmup = "disabled"
+    os.makedirs(STORAGE_PATH, exist_ok=True)
+    startup = asyncio.create_task(_startup(app))
+    background = [startup]
+    if database.DB_POOL_VALIDATION_INTERVAL > 0:
+        background.append(asyncio.create_task(database.run_pool_validation()))
+    if database.replicas:
+        background.append(asyncio.create_task(database.run_replica_health_checks()))
+    if outbox.OUTBOX_RETENTION_DAYS > 0:
+        background.append(asyncio.create_task(outbox.run_pruning()))
+    if aggregates.AGGREGATES_RECONCILE_INTERVAL > 0:
+        background.append(asyncio.create_task(aggregates.run_reconciliation()))
+    if idempotency.IDEMPOTENCY_ENABLED and idempotency.IDEMPOTENCY_PRUNE_INTERVAL > 0:
+        background.append(asyncio.create_task(idempotency.run_pruning()))
+    if roster.ROSTER_SNAPSHOT_ENABLED:
+        background.append(asyncio.create_task(roster.run()))
+    if skill_index.SKILL_INDEX_ENABLED:
+        background.append(asyncio.create_task(skill_index.run()))
+    if name_index.NAME_SEARCH_ENABLED:
+        background.append(asyncio.create_task(name_index.run()))
+    await asyncio.wait({startup}, timeout=STARTUP_INLINE_WAIT)
     yield  # Application runs here
+    for task in background:
+        task.cancel()
+    await reservation_client.aclose()
 
 app = FastAPI(
     title="Employee Service",
     description=(
         "Manages employees, availability slots and skills.\n\n"
         "Authentication & authorization are handled by the API Gateway. "
-        "This service validates optional company/location/service data via Company Service when configured."
+        "This service validates optional company/location/service data via Company Service when configured.\n\n"
+        "Each request has a time budget (`X-Request-Timeout-Ms`, default REQUEST_DEADLINE_MS) shared by its "
+        "DB statements and upstream calls; a spent budget yields 504.\n\n"
+        "Concurrency is limited per route class (reads, writes, upstream-proxy routes); when a class is "
+        "saturated, requests get 503 with `Retry-After` instead of queueing indefinitely.\n\n"
+        "JSON responses of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli or gzip when the "
+        "client sends `Accept-Encoding`; streamed responses (SSE) are not.\n\n"
+        "POST/PUT/PATCH accept an `Idempotency-Key` header: a retry with the same key and request gets the "
+        "stored response (`Idempotent-Replayed: true`) without being executed again."
     ),
     version="1.4.0",
     openapi_tags=OPENAPI_TAGS,
-    lifespan=lifespan,  # ensure DB readiness is part of app lifecycle
+    lifespan=lifespan,  # DB readiness is resolved in the background, see /ready
 )
 
 # CORS
@@ -59,10 +161,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+METRICS_ENABLED = _get_bool("METRICS_ENABLED", True)
+SQL_INSTRUMENTATION_ENABLED = _get_bool("SQL_INSTRUMENTATION_ENABLED", True)
+SERVER_TIMING_ENABLED = _get_bool("SERVER_TIMING_ENABLED", True)
+
+# Per-request query counting / slow-query log / N+1 detection + Server-Timing
+if SQL_INSTRUMENTATION_ENABLED:
+    instrumentation.install()
+    app.add_middleware(instrumentation.ServerTimingMiddleware, header=SERVER_TIMING_ENABLED)
+
+# Idempotency-Key replay for writes; added before compression so stored bodies are unencoded
+if idempotency.IDEMPOTENCY_ENABLED:
+    app.add_middleware(idempotency.IdempotencyMiddleware)
+
+# Negotiated br/gzip for large JSON bodies (big ones compressed off the event loop)
+if compression.COMPRESSION_ENABLED:
+    app.add_middleware(compression.CompressionMiddleware)
+
+# Concurrency limits per route class with fast 503s when saturated; added before the
+# deadline middleware so it runs inside it and queueing is bounded by the request budget
+if admission.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(admission.AdmissionMiddleware)
+
+# Per-request time budget honoured by DB statements and upstream calls
+deadline.install()
+app.add_middleware(deadline.DeadlineMiddleware)
+
+# Request timing; added last so it is the outermost layer and measures everything below it
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # serve everything under STORAGE_PATH as /files (kept; independent of thumbnail logic)
 app.mount(
     "/files",
-    StaticFiles(directory=os.getenv("STORAGE_PATH", "storage")),
+    StaticFiles(directory=STORAGE_PATH, check_dir=False),
     name="files",
 )
 
@@ -75,6 +207,92 @@ app.mount(
 def health():
     return {"status": "ok"}
 
+_upstream_cache: Dict[str, Any] = {"at": 0.0, "value": None}
+
+def _probe_upstreams() -> Dict[str, Dict[str, Any]]:
+    now = time.monotonic()
+    if _upstream_cache["value"] is not None and now - _upstream_cache["at"] < READY_UPSTREAM_TTL:
+        return _upstream_cache["value"]
+    company = CompanyServiceClient()
+    faas = FaaSClient()
+    value = {
+        # Company lookups only block requests when strict validation is on.
+        "company": {"enabled": company.enabled(), "ok": company.ping(),
+                    "required": company.enabled() and company.strict},
+        # FaaS is always fail-open, so it is informational only.
+        "faas": {"enabled": faas.enabled(), "ok": faas.ping(), "required": False},
+    }
+    _upstream_cache.update(at=now, value=value)
+    return value
+
+@app.get("/ready", tags=["health"], summary="Readiness check", responses={
+    200: {
+        "description": "Service can take traffic",
+        "content": {"application/json": {"example": {
+            "status": "ready",
+            "checks": {
+                "startup": True,
+                "warmup": "done",
+                "database": {"ok": True, "pool": "QueuePool", "size": 5, "checkedin": 1,
+                             "checkedout": 0, "overflow": -4},
+                "upstreams": {"company": {"enabled": True, "ok": True, "required": False},
+                              "faas": {"enabled": False, "ok": True, "required": False}},
+            },
+        }}}
+    },
+    503: {"description": "Startup, database or a required upstream is not ready"},
+})
+async def ready():
+    """
+    Readiness (as opposed to liveness on /health): startup finished (including
+    the optional Company cache warm-up), the DB answers, and every *required*
+    upstream is reachable.
+    """
+    db_ok = await asyncio.to_thread(database.ping)
+    upstreams = await asyncio.to_thread(_probe_upstreams)
+    started = bool(getattr(app.state, "started", False))
+    ok = started and db_ok and all(u["ok"] for u in upstreams.values() if u["required"])
+    body = {
+        "status": "ready" if ok else "not_ready",
+        "checks": {
+            "startup": started,
+            "warmup": getattr(app.state, "warmup", "disabled"),
+            "database": {"ok": db_ok, **database.pool_status()},
+            # replicas are optional: reads fall back to the primary
+            "replicas": database.replica_status(),
+            "upstreams": upstreams,
+        },
+    }
+    return JSONResponse(status_code=200 if ok else 503, content=body)
+
+@app.get("/health/pool", tags=["health"], summary="Database connection pool statistics", responses={
+    200: {
+        "description": "Pool configuration, live counters and cumulative timeouts",
+        "content": {"application/json": {"example": {
+            "config": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30.0, "pool_recycle": 1800,
+                       "pre_ping": True, "validation_interval": 0.0},
+            "status": {"pool": "QueuePool", "size": 5, "checkedin": 2, "checkedout": 3, "overflow": -2,
+                       "max_overflow": 10, "saturated": False},
+            "counters": {"timeouts": 0, "validation_failures": 0},
+            "replicas": [{"replica": 0, "healthy": True, "pool": "QueuePool", "size": 5, "checkedin": 1,
+                          "checkedout": 0, "overflow": -4, "max_overflow": 10, "saturated": False}],
+        }}}
+    },
+})
+def pool_stats():
+    return {
+        "config": database.pool_config(),
+        "status": database.pool_status(),
+        "counters": database.pool_counters(),
+        "replicas": database.replica_status(),
+    }
+
+@app.get("/metrics", tags=["metrics"], summary="Prometheus metrics", response_class=Response, responses={
+    200: {"description": "Prometheus text exposition format", "content": {"text/plain": {}}},
+})
+def metrics_endpoint():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # ───────────────────── Global exception mappers ─────────────────────
 
 @app.exception_handler(Exception)
@@ -87,6 +305,37 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
     )
     return JSONResponse(status_code=500, content=problem.model_dump())
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # QueuePool exhausted for DB_POOL_TIMEOUT seconds: tell the caller to back off.
+    database.record_pool_timeout()
+    problem = Problem(
+        title="Service Unavailable",
+        status=503,
+        detail="database connection pool exhausted",
+        instance=request.url.path
+    )
+    return JSONResponse(status_code=503, content=problem.model_dump(), headers={"Retry-After": "1"})
+
+def _deadline_problem(request: Request, detail: str) -> JSONResponse:
+    problem = Problem(
+        title="Gateway Timeout",
+        status=504,
+        detail=detail,
+        instance=request.url.path
+    )
+    return JSONResponse(status_code=504, content=problem.model_dump())
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return _deadline_problem(request, str(exc))
+
+@app.exception_handler(OperationalError)
+async def operational_error_handler(request: Request, exc: OperationalError):
+    if deadline.is_statement_timeout(exc):
+        return _deadline_problem(request, "request deadline exceeded during SQL statement")
+    return await unhandled_exception_handler(request, exc)
+
 from fastapi import HTTPException
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -102,3 +351,5 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 app.include_router(employees.router, prefix="/employees", tags=["employees"])
 app.include_router(availability.router, prefix="/employees/{employee_id}/availability", tags=["availability"])
 app.include_router(skills.router, prefix="/employees/{employee_id}/skills", tags=["skills"])
+app.include_router(changes.router, prefix="/changes", tags=["changes"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
@@ -0,0 +1,272 @@
+# app/metrics.py
+"""
+Tiny Prometheus text-exposition registry plus a pure-ASGI timing middleware.
+
+Kept dependency-free and allocation-light so it can stay enabled in
+production: a request costs two perf_counter() calls, one dict lookup and a
+bisect per histogram observation. Label values are passed as tuples in the
+order of the metric's `labelnames`.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.routing import Mount
+
+from app.request_context import current_stats
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: LabelValues = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        out = self._header()
+        for lv, v in list(self._values.items()):
+            out.append(f"{self.name}{_labels(self.labelnames, lv)} {_fmt(v)}")
+        return out
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: LabelValues, value: float) -> None:
+        with self._lock:
+            self._values[labels] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            s[0][i] += 1
+            s[1] += value
+
+    def count(self, labels: LabelValues) -> int:
+        s = self._series.get(labels)
+        return sum(s[0]) if s else 0
+
+    def render(self) -> List[str]:
+        out = self._header()
+        for lv, (counts, total) in list(self._series.items()):
+            acc = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le = 'le="' + _fmt(bound) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, lv, le)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, lv)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, lv)} {acc}")
+        return out
+
+
+def register_collector(fn: Callable[[], Iterable[str]]) -> None:
+    """Register a callback producing exposition lines at scrape time."""
+    _collectors.append(fn)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for m in _registry:
+        lines.extend(m.render())
+    for fn in _collectors:
+        lines.extend(fn())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method",),
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds", "Upstream call latency.",
+    ("upstream", "operation", "outcome"),
+)
+UPSTREAM_ERRORS = Counter(
+    "upstream_request_errors_total", "Failed upstream calls by exception type.",
+    ("upstream", "operation", "error"),
+)
+
+
+class track_upstream:
+    """
+    Time an upstream call (sync or async code): `with track_upstream("company", "get_company"):`.
+    An exception escaping the block counts as an error and is re-raised.
+    """
+    __slots__ = ("upstream", "operation", "_start")
+
+    def __init__(self, upstream: str, operation: str):
+        self.upstream = upstream
+        self.operation = operation
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        elapsed = time.perf_counter() - self._start
+        stats = current_stats()
+        if stats is not None:
+            stats.upstream_time += elapsed
+            stats.upstream_calls += 1
+        if exc_type is None:
+            UPSTREAM_DURATION.observe((self.upstream, self.operation, "ok"), elapsed)
+        else:
+            UPSTREAM_DURATION.observe((self.upstream, self.operation, "error"), elapsed)
+            UPSTREAM_ERRORS.inc((self.upstream, self.operation, exc_type.__name__))
+        return False
+
+
+def _db_pool_lines() -> List[str]:
+    from app import database  # late: tests swap the engine after import
+
+    status = database.pool_status()
+    out: List[str] = []
+    for key, name, doc in (
+        ("size", "db_pool_size", "Configured pool size."),
+        ("checkedin", "db_pool_checked_in", "Idle connections in the pool."),
+        ("checkedout", "db_pool_checked_out", "Connections currently checked out."),
+        ("overflow", "db_pool_overflow", "Current overflow connections (negative = spare capacity)."),
+    ):
+        if key in status:
+            out += [f"# HELP {name} {doc}", f"# TYPE {name} gauge", f"{name} {status[key]}"]
+    for key, name, doc in (
+        ("timeouts", "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT."),
+        ("validation_failures", "db_pool_validation_failures_total", "Failed background pool validations."),
+    ):
+        value = database.pool_counters()[key]
+        out += [f"# HELP {name} {doc}", f"# TYPE {name} counter", f"{name} {value}"]
+    return out
+
+
+register_collector(_db_pool_lines)
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the matched route, e.g. /employees/{employee_id}/availability/.
+
+    Routes of included routers only know their own (relative) path, so the
+    prefix is rebuilt from the concrete path by substituting the remaining
+    path params left to right. Unmatched requests share one fixed label so
+    unknown paths cannot blow up label cardinality.
+    """
+    route = scope.get("route")
+    tail = getattr(route, "path", None)
+    if tail is None:
+        return "<unmatched>"
+    if isinstance(route, Mount):
+        return tail + "/{path}"
+    params = scope.get("path_params") or {}
+    own = getattr(route, "param_convertors", None) or {}
+    tail_len = len([s for s in tail.split("/") if s])
+    segs = [s for s in scope.get("path", "").split("/") if s]
+    prefix = segs[:len(segs) - tail_len]
+    pending = [(k, str(v)) for k, v in params.items() if k not in own]
+    out = []
+    for seg in prefix:
+        if pending and seg == pending[0][1]:
+            out.append("{" + pending.pop(0)[0] + "}")
+        else:
+            out.append(seg)
+    return ("/" + "/".join(out) if out else "") + tail
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: no request/response object construction."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec((method,))
+            HTTP_REQUEST_DURATION.observe(
+                (method, route_template(scope), str(status[0])), time.perf_counter() - start
+            )
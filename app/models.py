@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Time, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Time, ForeignKey, Text, LargeBinary
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -49,3 +49,46 @@ class EmployeeSkill(Base):
     service_id = Column(Integer, primary_key=True)  # ServiceM.id from Company svc
 
     employee = relationship("Employee", back_populates="skills")
+
+class OutboxEvent(Base):
+    """Change-feed entry written in the same transaction as the change itself."""
+    __tablename__ = "outbox_events"
+
+    seq = Column(Integer, primary_key=True, autoincrement=False)  # change-feed sequence, assigned at commit
+    event_type = Column(String(64), nullable=False)               # e.g. employee.updated
+    employee_id = Column(Integer, nullable=False, index=True)
+    payload = Column(Text, nullable=False)                        # JSON
+    created_at = Column(DateTime, nullable=False, index=True)
+
+class OutboxSequence(Base):
+    """Single-row counter handing out outbox seqs in commit order (see app.outbox)."""
+    __tablename__ = "outbox_sequence"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)   # always 1
+    value = Column(Integer, nullable=False, default=0)            # last assigned seq
+
+class AggregateCounter(Base):
+    """Dashboard counter maintained by crud writes (see app.aggregates)."""
+    __tablename__ = "aggregate_counters"
+
+    dimension = Column(String(32), primary_key=True)   # company | location | service | location_minutes
+    key = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class EmployeeShard(Base):
+    """Employee-id directory on the primary when sharding is enabled (see app.sharding)."""
+    __tablename__ = "employee_shards"
+
+    employee_id = Column(Integer, primary_key=True, autoincrement=True)  # allocates global employee ids
+    shard = Column(String(64), nullable=False)
+
+class IdempotencyKey(Base):
+    """Stored response of a write sent with an Idempotency-Key (see app.idempotency)."""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)                 # sha256 of method, path, query, body
+    status_code = Column(Integer, nullable=True)                     # NULL while the first attempt runs
+    headers = Column(Text, nullable=True)                            # JSON [[name, value], ...]
+    body = Column(LargeBinary(16 * 1024 * 1024), nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
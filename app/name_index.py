@@ -0,0 +1,299 @@
+# app/name_index.py
+"""
+In-process name index for employee autocomplete (GET /employees/search).
+
+Names are normalised (case-folded, accents stripped) and split into tokens.
+Every (token, employee id) pair of an active employee sits in one sorted list,
+so the employees whose tokens start with a query word are a bisect plus a
+contiguous slice; a multi-word query intersects the per-word sets. When
+nothing matches that way and the query is long enough, a trigram map over the
+distinct tokens supplies fuzzy matches (typos, missing letters): every word
+needs a similar token, ranked by mean trigram similarity.
+
+Ranking of prefix matches: whole-token matches and matches on the first name
+score higher, then shorter names, then id.
+
+Like the skill index (app.skill_index) it is built from the tables once and then
+follows the outbox sequence: employee.* events carry the changed name / active /
+company fields, so writes reach the index without re-reading rows, and a local
+commit wakes the follower immediately. Enabled by NAME_SEARCH_ENABLED.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+
+from app import database, models, outbox
+
+logger = logging.getLogger(__name__)
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+NAME_SEARCH_ENABLED = _get_bool("NAME_SEARCH_ENABLED", False)
+NAME_SEARCH_REFRESH_INTERVAL = float(os.getenv("NAME_SEARCH_REFRESH_INTERVAL", "1.0"))
+# fuzzy matching kicks in from this query length, with at least this similarity
+NAME_SEARCH_FUZZY_MIN_LENGTH = int(os.getenv("NAME_SEARCH_FUZZY_MIN_LENGTH", "3"))
+NAME_SEARCH_MIN_SIMILARITY = float(os.getenv("NAME_SEARCH_MIN_SIMILARITY", "0.3"))
+
+_LOAD_BATCH = 50000
+# one- and two-letter queries scan long ranges; their results are cached until the next change
+_SHORT_QUERY = 2
+_SHORT_CACHE_MAX = 4096
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokens(*parts: Optional[str]) -> Tuple[str, ...]:
+    out: List[str] = []
+    for p in parts:
+        for t in normalize(p or "").replace("-", " ").split():
+            if t not in out:
+                out.append(t)
+    return tuple(out)
+
+
+def trigrams(toks) -> Set[str]:
+    out = set()
+    for t in toks:
+        padded = f"  {t} "
+        out.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+class NameIndex:
+    def __init__(self):
+        # id -> (first_name, last_name, company_id, active) for every employee seen
+        self.people: Dict[int, Tuple[str, str, Optional[int], bool]] = {}
+        self._tokens: Dict[int, Tuple[str, ...]] = {}      # indexed (active) employees only
+        self._sorted: List[Tuple[str, int]] = []
+        self._token_ids: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[str]] = {}              # trigram -> tokens containing it
+        self._version = 0
+        self._short: Dict[Tuple[str, Optional[int], int], Tuple[int, List[int]]] = {}
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def _unindex(self, eid: int) -> None:
+        toks = self._tokens.pop(eid, None)
+        if toks is None:
+            return
+        for t in toks:
+            i = bisect_left(self._sorted, (t, eid))
+            if i < len(self._sorted) and self._sorted[i] == (t, eid):
+                del self._sorted[i]
+            ids = self._token_ids[t]
+            ids.discard(eid)
+            if not ids:
+                del self._token_ids[t]
+                for g in trigrams((t,)):
+                    self._grams[g].discard(t)
+                    if not self._grams[g]:
+                        del self._grams[g]
+
+    def _index(self, eid: int, first: str, last: str, bulk: bool = False) -> None:
+        toks = tokens(first, last)
+        self._tokens[eid] = toks
+        for t in toks:
+            if bulk:
+                self._sorted.append((t, eid))
+            else:
+                insort(self._sorted, (t, eid))
+            if t not in self._token_ids:
+                self._token_ids[t] = set()
+                for g in trigrams((t,)):
+                    self._grams.setdefault(g, set()).add(t)
+            self._token_ids[t].add(eid)
+
+    def set_employee(self, eid: int, **fields: Any) -> None:
+        """Apply (a subset of) first_name / last_name / company_id / active for one employee."""
+        with self._lock:
+            first, last, company, active = self.people.get(eid, ("", "", None, False))
+            first = fields.get("first_name", first)
+            last = fields.get("last_name", last)
+            company = fields.get("company_id", company)
+            active = bool(fields.get("active", active))
+            self.people[eid] = (first, last, company, active)
+            self._version += 1
+            if "first_name" in fields or "last_name" in fields or not active:
+                self._unindex(eid)
+            if active and eid not in self._tokens:
+                self._index(eid, first, last)
+
+    def load(self, rows: Iterable[Tuple[int, str, str, Optional[int], bool]]) -> None:
+        """Bulk set_employee for new ids (id, first, last, company, active); sorts once at the end."""
+        with self._lock:
+            for eid, first, last, company, active in rows:
+                self.people[eid] = (first, last, company, bool(active))
+                if active:
+                    self._index(eid, first, last, bulk=True)
+            self._sorted.sort()
+            self._version += 1
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        if event["type"].startswith("employee."):
+            payload = event["payload"]
+            self.set_employee(event["employee_id"], **{
+                k: payload[k] for k in ("first_name", "last_name", "company_id", "active") if k in payload
+            })
+
+    def _prefixed(self, word: str) -> Dict[int, int]:
+        """Employees with a token starting with `word` -> 2 for a whole-token match, else 1."""
+        out: Dict[int, int] = {}
+        i = bisect_left(self._sorted, (word, -1))
+        while i < len(self._sorted):
+            t, eid = self._sorted[i]
+            if not t.startswith(word):
+                break
+            out[eid] = max(out.get(eid, 0), 2 if t == word else 1)
+            i += 1
+        return out
+
+    def search(self, query: str, limit: int = 10, company_id: Optional[int] = None) -> List[int]:
+        """Ids of active employees matching `query`, best first."""
+        words = tokens(query)
+        if not words:
+            return []
+        short = len(words) == 1 and len(words[0]) <= _SHORT_QUERY
+        with self._lock:
+            if short:
+                cached = self._short.get((words[0], company_id, limit))
+                if cached is not None and cached[0] == self._version:
+                    return cached[1]
+
+            def in_scope(eid: int) -> bool:
+                return company_id is None or self.people[eid][2] == company_id
+
+            scores: Optional[Dict[int, int]] = None
+            for w in sorted(words, key=len, reverse=True):  # longest word first: smallest range
+                hits = self._prefixed(w)
+                if scores is None:
+                    scores = {e: s for e, s in hits.items() if in_scope(e)}
+                else:
+                    scores = {e: s + hits[e] for e, s in scores.items() if e in hits}
+                if not scores:
+                    break
+            scores = scores or {}
+            for eid in scores:
+                if self._tokens[eid][0].startswith(words[0]):
+                    scores[eid] += 1  # first word on the first name
+            ranked = heapq.nsmallest(
+                limit, scores,
+                key=lambda e: (-scores[e], len(self.people[e][0]) + len(self.people[e][1]), e),
+            )
+            if short:
+                if len(self._short) >= _SHORT_CACHE_MAX:
+                    self._short.clear()
+                self._short[(words[0], company_id, limit)] = (self._version, ranked)
+            if ranked or sum(map(len, words)) < NAME_SEARCH_FUZZY_MIN_LENGTH:
+                return ranked
+            return self._fuzzy(words, limit, in_scope)
+
+    def _fuzzy(self, words, limit: int, in_scope) -> List[int]:
+        """Employees with a similar token for every word, by mean similarity (trigram Jaccard per token)."""
+        total: Optional[Dict[int, float]] = None
+        for w in words:
+            wg = trigrams((w,))
+            shared: Dict[str, int] = {}
+            for g in wg:
+                for t in self._grams.get(g, ()):
+                    shared[t] = shared.get(t, 0) + 1
+            best: Dict[int, float] = {}
+            for t, n in shared.items():
+                similarity = n / (len(wg) + len(trigrams((t,))) - n)
+                if similarity < NAME_SEARCH_MIN_SIMILARITY:
+                    continue
+                for eid in self._token_ids[t]:
+                    if similarity > best.get(eid, 0.0):
+                        best[eid] = similarity
+            if total is None:
+                total = {e: v for e, v in best.items() if in_scope(e)}
+            else:
+                total = {e: v + best[e] for e, v in total.items() if e in best}
+            if not total:
+                return []
+        return heapq.nsmallest(limit, total, key=lambda e: (-total[e], e))
+
+    def describe(self, ids: List[int]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"id": e, "first_name": self.people[e][0], "last_name": self.people[e][1],
+                     "company_id": self.people[e][2]} for e in ids]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"indexed": len(self._tokens), "tokens": len(self._sorted),
+                    "distinct_tokens": len(self._token_ids), "trigrams": len(self._grams), "seq": self.seq}
+
+
+# ─── Loading / following ──────────────────────────────────────────────────────
+
+def build() -> NameIndex:
+    idx = NameIndex()
+    E = models.Employee
+    db = database.SessionLocal()
+    try:
+        idx.seq = db.execute(select(func.max(models.OutboxEvent.seq))).scalar() or 0
+        after = 0
+        while True:
+            rows = db.execute(
+                select(E.id, E.first_name, E.last_name, E.company_id, E.active)
+                .where(E.id > after).order_by(E.id).limit(_LOAD_BATCH)
+            ).all()
+            if not rows:
+                break
+            idx.load(rows)
+            after = rows[-1][0]
+    finally:
+        db.close()
+    return idx
+
+
+def refresh(idx: NameIndex, limit: int = 1000) -> int:
+    """Apply outbox events past idx.seq; returns how many were consumed."""
+    events = outbox.fetch(idx.seq, limit)
+    for e in events:
+        idx.apply(e)
+        idx.seq = e["seq"]
+    return len(events)
+
+
+_index: Optional[NameIndex] = None
+
+
+def current() -> Optional[NameIndex]:
+    return _index
+
+
+async def run() -> None:
+    """Background task: initial build, then follow the change sequence."""
+    global _index
+    while True:
+        try:
+            idx = await asyncio.to_thread(build)
+            break
+        except Exception:
+            logger.exception("name index build failed; retrying")
+            await asyncio.sleep(5 * NAME_SEARCH_REFRESH_INTERVAL)
+    _index = idx
+    logger.info("name index loaded: %s", idx.stats())
+    while True:
+        await outbox.wait(NAME_SEARCH_REFRESH_INTERVAL)
+        try:
+            while await asyncio.to_thread(refresh, idx):
+                pass
+        except Exception:
+            logger.exception("name index refresh failed; retrying")
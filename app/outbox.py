@@ -0,0 +1,200 @@
+# app/outbox.py
+"""
+Transactional outbox for employee data.
+
+crud writes call `record()` before committing, so an OutboxEvent row exists
+if and only if the change itself was committed. Its `seq` is the change-feed
+cursor served by /changes (and followed by the roster snapshot, skill and
+name indexes).
+
+`seq` is assigned at commit time, not at INSERT: the events of a transaction
+are held on the session and, right before COMMIT, numbered from the
+single-row `outbox_sequence` counter read with SELECT ... FOR UPDATE. The row
+lock is held until the commit, so seqs become visible strictly in order and a
+consumer that has seen seq N can never later find a committed event below N.
+(An auto-increment id is taken mid-transaction, so a later id could commit
+first and a cursor moving past it would skip the earlier one for good.)
+
+After a commit that carried events, in-process waiters (long-poll and SSE
+consumers) are woken immediately; writes made by other workers are picked
+up by polling every CHANGES_POLL_INTERVAL seconds.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import database, models
+
+logger = logging.getLogger(__name__)
+
+CHANGES_POLL_INTERVAL = float(os.getenv("CHANGES_POLL_INTERVAL", "1.0"))
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+OUTBOX_PRUNE_INTERVAL = float(os.getenv("OUTBOX_PRUNE_INTERVAL", "3600"))
+
+_PENDING = "outbox_pending"   # events of the open transaction, not numbered yet
+_NOTIFY = "outbox_notify"
+
+
+def record(db: Session, event_type: str, employee_id: int, payload: Dict[str, Any]) -> None:
+    """Add an event to the caller's transaction (it is committed, or rolled back, with it)."""
+    db.info.setdefault(_PENDING, []).append(models.OutboxEvent(
+        event_type=event_type,
+        employee_id=employee_id,
+        payload=json.dumps(payload, default=str),
+        created_at=datetime.utcnow(),
+    ))
+
+
+def _reserve(db: Session, n: int) -> int:
+    """Take the next `n` seqs under the counter's row lock (held until commit); returns the first."""
+    S = models.OutboxSequence
+    value = db.execute(select(S.value).where(S.id == 1).with_for_update()).scalar()
+    if value is None:  # first event ever (or a schema created without the seed row)
+        value = db.execute(select(func.max(models.OutboxEvent.seq))).scalar() or 0
+        db.execute(insert(S).values(id=1, value=value + n))
+    else:
+        db.execute(update(S).where(S.id == 1).values(value=value + n))
+    return value + 1
+
+
+def ensure_sequence(session_factory=None) -> None:
+    """Create the counter row if missing (startup), so first writes never race to insert it."""
+    db = (session_factory or database.SessionLocal)()
+    try:
+        if db.get(models.OutboxSequence, 1) is None:
+            start = db.execute(select(func.max(models.OutboxEvent.seq))).scalar() or 0
+            db.add(models.OutboxSequence(id=1, value=start))
+            db.commit()
+    except IntegrityError:
+        db.rollback()  # another worker seeded it
+    finally:
+        db.close()
+
+
+def to_dict(e: models.OutboxEvent) -> Dict[str, Any]:
+    return {
+        "seq": e.seq,
+        "type": e.event_type,
+        "employee_id": e.employee_id,
+        "payload": json.loads(e.payload),
+        "created_at": e.created_at,
+    }
+
+
+def fetch(since: int, limit: int) -> List[Dict[str, Any]]:
+    """Events with seq > since, oldest first. Uses a short-lived session (never held while waiting)."""
+    db = database.SessionLocal()
+    try:
+        rows = (
+            db.query(models.OutboxEvent)
+            .filter(models.OutboxEvent.seq > since)
+            .order_by(models.OutboxEvent.seq)
+            .limit(limit)
+            .all()
+        )
+        return [to_dict(r) for r in rows]
+    finally:
+        db.close()
+
+
+def prune(older_than: timedelta) -> int:
+    db = database.SessionLocal()
+    try:
+        n = (
+            db.query(models.OutboxEvent)
+            .filter(models.OutboxEvent.created_at < datetime.utcnow() - older_than)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+async def run_pruning() -> None:
+    """Background task: drop events older than OUTBOX_RETENTION_DAYS."""
+    while True:
+        await asyncio.sleep(OUTBOX_PRUNE_INTERVAL)
+        try:
+            await asyncio.to_thread(prune, timedelta(days=OUTBOX_RETENTION_DAYS))
+        except Exception:
+            logger.exception("outbox pruning failed; retrying next round")
+
+
+# ─── Wake-ups ─────────────────────────────────────────────────────────────────
+
+_waiters = set()
+_waiters_lock = threading.Lock()
+
+
+def notify() -> None:
+    with _waiters_lock:
+        waiters = list(_waiters)
+    for loop, ev in waiters:
+        try:
+            loop.call_soon_threadsafe(ev.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+
+async def wait(timeout: float) -> bool:
+    """Sleep until the next local commit with events, or `timeout`; True if woken."""
+    entry = (asyncio.get_running_loop(), asyncio.Event())
+    with _waiters_lock:
+        _waiters.add(entry)
+    try:
+        await asyncio.wait_for(entry[1].wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        with _waiters_lock:
+            _waiters.discard(entry)
+
+
+async def wait_for_events(since: int, limit: int, timeout: float) -> List[Dict[str, Any]]:
+    """Long-poll: return as soon as events past `since` exist, or [] after `timeout` seconds."""
+    loop = asyncio.get_running_loop()
+    until = loop.time() + timeout
+    while True:
+        events = await asyncio.to_thread(fetch, since, limit)
+        left = until - loop.time()
+        if events or left <= 0:
+            return events
+        await wait(min(left, CHANGES_POLL_INTERVAL))
+
+
+def _before_commit(session: Session) -> None:
+    events = session.info.pop(_PENDING, None)
+    if not events:
+        return
+    first = _reserve(session, len(events))
+    for i, e in enumerate(events):
+        e.seq = first + i
+    session.add_all(events)  # flushed by the commit that follows
+    session.info[_NOTIFY] = True
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_NOTIFY, False):
+        notify()
+
+
+def _after_transaction_end(session: Session, transaction) -> None:
+    # rollback, close() or commit of the outermost transaction: nothing may carry over
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+        session.info.pop(_NOTIFY, None)
+
+
+event.listen(Session, "before_commit", _before_commit)
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_transaction_end", _after_transaction_end)
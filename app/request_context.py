@@ -0,0 +1,71 @@
+# app/request_context.py
+"""
+Per-request state shared by middleware, DB hooks and upstream clients.
+
+Lives in a ContextVar: sync endpoints run in a worker thread with a copy of
+the request's context, so they see (and mutate) the same objects.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class RequestStats:
+    __slots__ = ("db_time", "db_queries", "upstream_time", "upstream_calls", "shapes", "flagged")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.upstream_time = 0.0
+        self.upstream_calls = 0
+        # statement text -> executions within this request (N+1 detection)
+        self.shapes: Dict[str, int] = {}
+        self.flagged = 0
+
+
+_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _stats.get()
+
+
+def begin_stats() -> RequestStats:
+    stats = RequestStats()
+    _stats.set(stats)
+    return stats
+
+
+def detach_stats() -> None:
+    """Stop attributing further work to the request (e.g. repeated polling in a long-lived response)."""
+    _stats.set(None)
+
+
+# ─── Deadline ─────────────────────────────────────────────────────────────────
+# Absolute time.monotonic() by which the request must be answered.
+
+class DeadlineExceeded(Exception):
+    """The request's time budget is spent; mapped to 504 by the app."""
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(at: Optional[float]) -> None:
+    _deadline.set(at)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget; None when there is no deadline."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def deadline_exceeded() -> bool:
+    rem = remaining()
+    return rem is not None and rem <= 0
+
+
+def check_deadline(what: str = "operation") -> None:
+    if deadline_exceeded():
+        raise DeadlineExceeded(f"request deadline exceeded before {what}")
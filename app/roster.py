@@ -0,0 +1,362 @@
+# app/roster.py
+"""
+Optional in-process snapshot of the employee roster for matching queries
+("who has skill S", "who works at location L on Monday 09:00-12:00").
+
+Rows live in flat `array` columns indexed by position instead of ORM objects:
+
+- ids / company / location / alive: one entry per employee (-1 = NULL);
+- skills and slots in CSR layout (offsets + values); a slot is packed into
+  one int as day << 22 | from_minute << 11 | to_minute, with its location in
+  a parallel column;
+- inverted position lists (sorted) per skill, company and location.
+
+Changed employees get an overlay entry (their skills/slots) and are appended
+to the inverted lists of their new values; lookups verify every candidate
+against the columns, so stale list entries are harmless. Once more than
+ROSTER_MAX_STALE_RATIO of the rows have changed, the snapshot is rebuilt.
+
+The snapshot follows the outbox sequence (app.outbox): every refresh reloads
+just the employees named in events past `seq`. Enabled by ROSTER_SNAPSHOT_ENABLED.
+"""
+import asyncio
+import logging
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from app import database, models, outbox
+
+logger = logging.getLogger(__name__)
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+ROSTER_SNAPSHOT_ENABLED = _get_bool("ROSTER_SNAPSHOT_ENABLED", False)
+ROSTER_REFRESH_INTERVAL = float(os.getenv("ROSTER_REFRESH_INTERVAL", "1.0"))
+ROSTER_MAX_STALE_RATIO = float(os.getenv("ROSTER_MAX_STALE_RATIO", "0.05"))
+
+NONE = -1
+_LOAD_BATCH = 10000
+
+Slot = Tuple[int, int, int, int]  # (day, from_minute, to_minute, location or NONE)
+
+
+def _day(d: int) -> int:
+    # ISO 1=Monday .. 7=Sunday; 0 is accepted as Sunday
+    return int(d) % 7 or 7
+
+
+def _minutes(t) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _pack(day: int, start: int, end: int) -> int:
+    return (day << 22) | (start << 11) | end
+
+
+def _nz(v: Optional[int]) -> int:
+    return NONE if v is None else int(v)
+
+
+class RosterSnapshot:
+    def __init__(self):
+        self.ids = array("q")
+        self.company = array("q")
+        self.location = array("q")
+        self.alive = bytearray()
+        self._sorted = 0                       # ids[:_sorted] ascending; later appends via _extra
+        self._extra: Dict[int, int] = {}
+        self.skill_off = array("q", [0])
+        self.skill_val = array("q")
+        self.slot_off = array("q", [0])
+        self.slot_val = array("q")
+        self.slot_loc = array("q")
+        self._skills_overlay: Dict[int, array] = {}
+        self._slots_overlay: Dict[int, Tuple[array, array]] = {}
+        self.by_skill: Dict[int, array] = {}
+        self.by_company: Dict[int, array] = {}
+        self.by_location: Dict[int, array] = {}
+        self.seq = 0
+        self.stale = 0
+        self._lock = threading.Lock()
+
+    # ─── Column access ────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _pos(self, employee_id: int) -> Optional[int]:
+        i = bisect_left(self.ids, employee_id, 0, self._sorted)
+        if i < self._sorted and self.ids[i] == employee_id:
+            return i
+        return self._extra.get(employee_id)
+
+    def _skills(self, pos: int) -> Sequence[int]:
+        o = self._skills_overlay.get(pos)
+        if o is not None:
+            return o
+        return self.skill_val[self.skill_off[pos]:self.skill_off[pos + 1]]
+
+    def _slots(self, pos: int) -> Tuple[Sequence[int], Sequence[int]]:
+        o = self._slots_overlay.get(pos)
+        if o is not None:
+            return o
+        a, b = self.slot_off[pos], self.slot_off[pos + 1]
+        return self.slot_val[a:b], self.slot_loc[a:b]
+
+    @staticmethod
+    def _add(index: Dict[int, array], key: int, pos: int) -> None:
+        if key == NONE:
+            return
+        lst = index.get(key)
+        if lst is None:
+            index[key] = lst = array("q")
+        if not lst or lst[-1] < pos:
+            lst.append(pos)
+            return
+        # keep lists sorted and unique (an updated employee re-enters an older list)
+        i = bisect_left(lst, pos)
+        if i == len(lst) or lst[i] != pos:
+            lst.insert(i, pos)
+
+    def _index(self, pos: int, company: int, location: int, skills: Iterable[int], slot_locs: Iterable[int]) -> None:
+        self._add(self.by_company, company, pos)
+        self._add(self.by_location, location, pos)
+        for s in skills:
+            self._add(self.by_skill, s, pos)
+        for loc in set(slot_locs) - {location}:
+            self._add(self.by_location, loc, pos)
+
+    # ─── Writes ───────────────────────────────────────────────────────────────
+
+    def _append(self, employee_id: int, active: bool, company: int, location: int,
+                skills: Sequence[int], slots: Sequence[Slot]) -> None:
+        pos = len(self.ids)
+        if self._sorted == pos and (not pos or self.ids[pos - 1] < employee_id):
+            self._sorted += 1
+        else:
+            self._extra[employee_id] = pos
+        self.ids.append(employee_id)
+        self.company.append(company)
+        self.location.append(location)
+        self.alive.append(1 if active else 0)
+        self.skill_val.extend(skills)
+        self.skill_off.append(len(self.skill_val))
+        self.slot_val.extend(_pack(d, a, b) for d, a, b, _ in slots)
+        self.slot_loc.extend(loc for *_, loc in slots)
+        self.slot_off.append(len(self.slot_val))
+        self._index(pos, company, location, skills, (loc for *_, loc in slots))
+
+    def upsert(self, employee_id: int, active: bool, company: int, location: int,
+               skills: Sequence[int], slots: Sequence[Slot]) -> None:
+        with self._lock:
+            pos = self._pos(employee_id)
+            if pos is None:
+                self._append(employee_id, active, company, location, skills, slots)
+                return
+            old_company, old_location = self.company[pos], self.location[pos]
+            old_skills = set(self._skills(pos))
+            old_locs = {old_location, *self._slots(pos)[1]}
+            self.company[pos], self.location[pos] = company, location
+            self.alive[pos] = 1 if active else 0
+            self._skills_overlay[pos] = array("q", skills)
+            self._slots_overlay[pos] = (array("q", (_pack(d, a, b) for d, a, b, _ in slots)),
+                                        array("q", (loc for *_, loc in slots)))
+            # only new values need list entries; entries for old values are filtered at query time
+            self._index(pos,
+                        company if company != old_company else NONE,
+                        location if location not in old_locs else NONE,
+                        set(skills) - old_skills,
+                        (loc for *_, loc in slots if loc not in old_locs))
+            self.stale += 1
+
+    def remove(self, employee_id: int) -> None:
+        with self._lock:
+            pos = self._pos(employee_id)
+            if pos is not None:
+                self.alive[pos] = 0
+                self.stale += 1
+
+    def needs_rebuild(self) -> bool:
+        return self.stale > max(1000, ROSTER_MAX_STALE_RATIO * len(self.ids))
+
+    # ─── Reads ────────────────────────────────────────────────────────────────
+
+    def match(self, service_id: Optional[int] = None, company_id: Optional[int] = None,
+              location_id: Optional[int] = None, day: Optional[int] = None,
+              minute_from: Optional[int] = None, minute_to: Optional[int] = None,
+              limit: int = 100) -> List[int]:
+        """Active employee ids matching every given filter, ascending, at most `limit`."""
+        day = None if day is None else _day(day)
+        timed = day is not None or minute_from is not None or minute_to is not None
+        alive, company, home_loc = self.alive, self.company, self.location
+
+        def ok(pos: int) -> bool:
+            if not alive[pos]:
+                return False
+            if company_id is not None and company[pos] != company_id:
+                return False
+            if service_id is not None and service_id not in self._skills(pos):
+                return False
+            if not timed and location_id is None:
+                return True
+            home = home_loc[pos]
+            vals, locs = self._slots(pos)
+            if not timed:
+                return home == location_id or location_id in locs
+            for v, loc in zip(vals, locs):
+                if day is not None and v >> 22 != day:
+                    continue
+                if minute_from is not None and (v >> 11) & 0x7FF > minute_from:
+                    continue
+                if minute_to is not None and v & 0x7FF < minute_to:
+                    continue
+                if location_id is not None and (home if loc == NONE else loc) != location_id:
+                    continue
+                return True
+            return False
+
+        with self._lock:
+            lists = []
+            if service_id is not None:
+                lists.append(self.by_skill.get(service_id, array("q")))
+            if company_id is not None:
+                lists.append(self.by_company.get(company_id, array("q")))
+            if location_id is not None:
+                lists.append(self.by_location.get(location_id, array("q")))
+            candidates = min(lists, key=len) if lists else range(len(self.ids))
+            # positions below _sorted are in id order, so that part of the (sorted)
+            # candidate list can stop at `limit`; out-of-order appends are all checked
+            cut = bisect_left(candidates, self._sorted)
+            found = list(islice(filter(ok, candidates[:cut]), limit))
+            found.extend(filter(ok, candidates[cut:]))
+            return sorted(self.ids[p] for p in found)[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "employees": len(self.ids),
+            "active": sum(self.alive),
+            "skills": len(self.skill_val) + sum(len(v) for v in self._skills_overlay.values()),
+            "slots": len(self.slot_val) + sum(len(v[0]) for v in self._slots_overlay.values()),
+            "seq": self.seq,
+            "stale": self.stale,
+        }
+
+
+# ─── Loading / refreshing ─────────────────────────────────────────────────────
+
+def _grouped(rows) -> Dict[int, list]:
+    out: Dict[int, list] = {}
+    for r in rows:
+        out.setdefault(r[0], []).append(r)
+    return out
+
+
+def _rows_for(db, employee_ids: Optional[Sequence[int]], after_id: int = 0, batch: int = _LOAD_BATCH):
+    E, K, A = models.Employee, models.EmployeeSkill, models.AvailabilitySlot
+    q = select(E.id, E.active, E.company_id, E.location_id)
+    if employee_ids is not None:
+        q = q.where(E.id.in_(list(employee_ids)))
+    else:
+        q = q.where(E.id > after_id).order_by(E.id).limit(batch)
+    emps = db.execute(q).all()
+    ids = [e[0] for e in emps]
+    if not ids:
+        return []
+    skills = _grouped(db.execute(select(K.employee_id, K.service_id).where(K.employee_id.in_(ids))).all())
+    slots = _grouped(db.execute(
+        select(A.employee_id, A.day_of_week, A.time_from, A.time_to, A.location_id).where(A.employee_id.in_(ids))
+    ).all())
+    out = []
+    for eid, active, company, location in emps:
+        out.append((
+            eid, bool(active), _nz(company), _nz(location),
+            sorted(s for _, s in skills.get(eid, ())),
+            sorted((_day(d), _minutes(a), _minutes(b), _nz(loc)) for _, d, a, b, loc in slots.get(eid, ())),
+        ))
+    return out
+
+
+def build() -> RosterSnapshot:
+    """Full load from the primary, in id-ordered batches."""
+    snap = RosterSnapshot()
+    db = database.SessionLocal()
+    try:
+        # events committed while we load are replayed by the next refresh (upserts are idempotent)
+        snap.seq = db.execute(select(func.max(models.OutboxEvent.seq))).scalar() or 0
+        after = 0
+        while True:
+            rows = _rows_for(db, None, after_id=after)
+            if not rows:
+                break
+            for row in rows:
+                snap._append(*row)
+            after = rows[-1][0]
+    finally:
+        db.close()
+    return snap
+
+
+def refresh(snap: RosterSnapshot, limit: int = 1000) -> int:
+    """Apply outbox events past snap.seq; returns how many were consumed."""
+    events = outbox.fetch(snap.seq, limit)
+    if not events:
+        return 0
+    affected = {e["employee_id"] for e in events}
+    db = database.SessionLocal()
+    try:
+        rows = _rows_for(db, sorted(affected))
+    finally:
+        db.close()
+    for row in rows:
+        snap.upsert(*row)
+    for eid in affected - {r[0] for r in rows}:
+        snap.remove(eid)
+    snap.seq = events[-1]["seq"]
+    return len(events)
+
+
+_snapshot: Optional[RosterSnapshot] = None
+
+
+def current() -> Optional[RosterSnapshot]:
+    """The loaded snapshot, or None (disabled or still loading)."""
+    return _snapshot
+
+
+def reload() -> RosterSnapshot:
+    global _snapshot
+    _snapshot = build()
+    return _snapshot
+
+
+async def run() -> None:
+    """Background task: initial load, then follow the change sequence."""
+    while True:
+        try:
+            snap = await asyncio.to_thread(reload)
+            break
+        except Exception:
+            logger.exception("roster snapshot load failed; retrying")
+            await asyncio.sleep(5 * ROSTER_REFRESH_INTERVAL)
+    logger.info("roster snapshot loaded: %s", snap.stats())
+    while True:
+        await outbox.wait(ROSTER_REFRESH_INTERVAL)
+        try:
+            while await asyncio.to_thread(refresh, snap):
+                pass
+            if snap.needs_rebuild():
+                snap = await asyncio.to_thread(reload)
+        except Exception:
+            logger.exception("roster snapshot refresh failed; retrying")
@@ -4,9 +4,10 @@ from sqlalchemy.orm import Session
 from typing import List, Set
 
 from app import crud, schemas, models
-from app.dependencies import get_db
+from app.dependencies import get_db, get_read_db
 from app.services.company_client import CompanyServiceClient
 from app.services.faas_client import FaaSClient
+from app.services import coverage, scheduling
 
 router = APIRouter()
 
@@ -96,7 +97,7 @@ def _validate_no_overlaps(db: Session, employee_id: int, slots: List[schemas.Ava
 )
 def list_availability(
     employee_id: int = Path(..., description="Employee ID", example=1),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if not crud.get_employee(db, employee_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found")
@@ -150,9 +151,9 @@ def add_availability(
     c = CompanyServiceClient()
     if c.enabled():
         loc_ids: Set[int] = {int(s.location_id) for s in slots if s.location_id is not None}
-        for lid in loc_ids:
-            if not c.validate_location(lid):
-                raise HTTPException(status_code=400, detail=f"location_id {lid} not found")
+        missing = c.missing_locations(loc_ids)  # one batch call / concurrent lookups
+        if missing:
+            raise HTTPException(status_code=400, detail=f"location_id {missing[0]} not found")
 
     # Optional: pre-validate with FAAS (overlaps + business-hours bounds)
     faas = FaaSClient()
@@ -176,6 +177,8 @@ def add_availability(
             )
 
     created = crud.create_availability(db, employee_id, slots)
+    scheduling.invalidate(employee_id)
+    coverage.invalidate(employee_id)
 
     # Best-effort audit
     faas.audit("availability.created", entity_id=employee_id, meta={"count": len(created)})
@@ -213,5 +216,7 @@ def remove_availability(
     slot = crud.delete_availability_slot(db, slot_id)
     if not slot:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Slot not found")
+    scheduling.invalidate(employee_id)
+    coverage.invalidate(employee_id)
 
     FaaSClient().audit("availability.deleted", entity_id=employee_id, meta={"slot_id": slot_id})
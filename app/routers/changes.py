@@ -0,0 +1,104 @@
+import json
+import time
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from app import outbox, schemas
+from app.dependencies import require_unsharded
+from app.request_context import detach_stats, remaining, set_deadline
+
+router = APIRouter()
+
+CHANGES_MAX_WAIT = 30
+SSE_HEARTBEAT = 15.0
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+
+
+@router.get(
+    "/",
+    response_model=schemas.ChangesPage,
+    dependencies=[Depends(require_unsharded)],
+    summary="Change feed (long-poll)",
+    responses={
+        200: {"description": "Events after `since`, oldest first; `next` is the cursor for the next call",
+              "content": {"application/json": {"example": {
+                  "events": [
+                      {"seq": 41, "type": "employee.created", "employee_id": 7,
+                       "payload": {"first_name": "Ana", "last_name": "Kovač", "active": True},
+                       "created_at": "2025-01-01T09:00:00"},
+                      {"seq": 42, "type": "skills.replaced", "employee_id": 7,
+                       "payload": {"service_ids": [1, 3]}, "created_at": "2025-01-01T09:00:05"}
+                  ],
+                  "next": 42
+              }}}},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def list_changes(
+    since: int = Query(0, ge=0, description="Return events with seq greater than this", example=40),
+    limit: int = Query(100, ge=1, le=1000, description="Max number of events to return", example=100),
+    wait: float = Query(0, ge=0, le=CHANGES_MAX_WAIT, description="Seconds to wait for new events when none exist",
+                        example=25),
+):
+    """
+    Incremental sync: pass the previous response's `next` as `since`. With
+    `wait`, the call is held open until an event arrives (bounded by the
+    request's time budget).
+    """
+    rem = remaining()
+    if rem is not None:
+        wait = max(0.0, min(wait, rem - 0.5))
+    if wait:
+        detach_stats()  # re-polling the same query is expected, not an N+1
+    events = await outbox.wait_for_events(since, limit, wait)
+    return {"events": events, "next": events[-1]["seq"] if events else since}
+
+
+@router.get(
+    "/stream",
+    summary="Change feed (Server-Sent Events)",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_unsharded)],
+    responses={
+        200: {"description": "text/event-stream; one event per change, `id` is the sequence",
+              "content": {"text/event-stream": {"example":
+                  'id: 42\nevent: employee.updated\ndata: {"seq": 42, "type": "employee.updated", '
+                  '"employee_id": 1, "payload": {"location_id": 12}, "created_at": "2025-01-01T09:00:00"}\n\n'
+              }}},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def stream_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Start after this sequence", example=40),
+    last_event_id: Optional[int] = Header(None, description="Resume point sent by reconnecting EventSource clients"),
+):
+    """Push events as they are committed. Reconnecting clients resume from `Last-Event-ID`."""
+    # a stream is open-ended by design; each poll below is a short, bounded query
+    set_deadline(None)
+    detach_stats()
+    cursor = max(since, last_event_id or 0)
+
+    async def events():
+        nonlocal cursor
+        last_sent = time.monotonic()
+        while not await request.is_disconnected():
+            batch = await outbox.wait_for_events(cursor, 100, outbox.CHANGES_POLL_INTERVAL)
+            for e in batch:
+                yield _sse(e)
+                cursor = e["seq"]
+            if batch:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= SSE_HEARTBEAT:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
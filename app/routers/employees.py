@@ -1,16 +1,24 @@
 # app/routers/employees.py
+from datetime import date, time, timedelta
 from fastapi import APIRouter, HTTPException, Depends, status, Path, Query, Body
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app import crud, schemas
-from app.dependencies import get_db
+from app import aggregates, crud, name_index, roster, schemas, sharding, skill_index
+from app.dependencies import get_db, get_read_db, require_unsharded
+from app.request_context import DeadlineExceeded
 from app.services.reservation_client import ReservationServiceClient
+from app.services import company_client
 from app.services.company_client import CompanyServiceClient
+from app.services import coverage, scheduling
+
+RESERVATION_BATCH_MAX = 100
+FREE_SLOTS_MAX_DAYS = 31
 
 router = APIRouter()
 
-def _validate_company_and_location(payload: schemas.EmployeeBase, client: CompanyServiceClient):
+def _validate_company_and_location(payload, client: CompanyServiceClient):
     if not client.enabled():
         return
     # company -> must exist if provided
@@ -89,10 +97,346 @@ def create_employee(
 def list_employees(
     skip: int = Query(0, ge=0, description="Number of records to skip (pagination)", example=0),
     limit: int = Query(100, ge=1, le=1000, description="Max number of records to return", example=50),
-    db: Session = Depends(get_db),
+    after_id: Optional[int] = Query(None, ge=0, description="Keyset cursor: return employees with a larger id "
+                                                            "(pass the last id of the previous page)", example=100),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Paginated list of active employees, ordered by id. Prefer `after_id` over `skip`
+    for deep pages (with sharding, each shard then returns at most `limit` rows).
+    """
+    return crud.get_employees(db, skip=skip, limit=limit, after_id=after_id)
+
+@router.get(
+    "/reservations",
+    dependencies=[Depends(require_unsharded)],
+    response_model=List[schemas.EmployeeReservations],
+    summary="List reservations for several employees (via reservation service)",
+    responses={
+        200: {"description": "Reservations per employee; upstream failures are reported per entry",
+              "content": {"application/json": {"example": [{
+                  "employee_id": 1,
+                  "reservations": [{"id": 555, "employee_id": 1, "date": "2025-01-01",
+                                    "time_from": "09:00:00", "time_to": "10:00:00"}],
+                  "error": None
+              }, {
+                  "employee_id": 2, "reservations": [],
+                  "error": "Reservation service error: 503 Service Unavailable"
+              }]}}},
+        422: {"model": schemas.Problem, "description": "Too many employee ids"},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        502: {"model": schemas.Problem, "description": "Reservation service not configured"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def get_reservations_batch(
+    employee_id: List[int] = Query(..., description="Employee IDs (repeat the parameter)", example=[1, 2]),
+    date_from: Optional[date] = Query(None, alias="from", description="First day (inclusive)", example="2025-01-01"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last day (inclusive)", example="2025-01-31"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Reservations for many employees in one round trip. Upstream calls run
+    concurrently (bounded by RESERVATION_BATCH_CONCURRENCY); unknown or
+    inactive employees are skipped.
+    """
+    if len(employee_id) > RESERVATION_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {RESERVATION_BATCH_MAX} employee ids per request")
+    known = await run_in_threadpool(crud.get_active_employee_ids, db, employee_id)
+    ids = [i for i in dict.fromkeys(employee_id) if i in known]
+    try:
+        client = ReservationServiceClient()
+        results = await client.get_reservations_for_employees(ids, date_from=date_from, date_to=date_to)
+    except RuntimeError as e:  # e.g. RESERVATION_SERVICE_URL not configured
+        raise HTTPException(status_code=502, detail=f"Reservation service error: {e}")
+    out = []
+    for i in ids:
+        res = results[i]
+        if isinstance(res, DeadlineExceeded):
+            raise res
+        if isinstance(res, Exception):
+            out.append({"employee_id": i, "reservations": [], "error": f"Reservation service error: {res}"})
+        else:
+            out.append({"employee_id": i, "reservations": res, "error": None})
+    return out
+
+@router.get(
+    "/free-slots",
+    dependencies=[Depends(require_unsharded)],
+    response_model=List[schemas.EmployeeFreeSlots],
+    summary="Bookable free slots (availability minus reservations)",
+    responses={
+        200: {"description": "Free slots per employee; upstream failures are reported per entry",
+              "content": {"application/json": {"example": [{
+                  "employee_id": 1,
+                  "slots": [
+                      {"date": "2025-01-06", "time_from": "09:00:00", "time_to": "09:30:00", "location_id": 3},
+                      {"date": "2025-01-06", "time_from": "10:30:00", "time_to": "11:00:00", "location_id": 3}
+                  ],
+                  "error": None
+              }]}}},
+        422: {"model": schemas.Problem, "description": "Too many employee ids or invalid date range"},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def get_free_slots(
+    employee_id: List[int] = Query(..., description="Employee IDs (repeat the parameter)", example=[1]),
+    date_from: Optional[date] = Query(None, alias="from", description="First day (inclusive, default today)",
+                                      example="2025-01-06"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last day (inclusive, default from + 6 days)",
+                                    example="2025-01-12"),
+    duration: int = Query(30, ge=5, le=24 * 60, description="Slot length in minutes", example=30),
+    step: Optional[int] = Query(None, ge=5, le=24 * 60, description="Minutes between slot starts (default: duration)",
+                                example=15),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Expands each employee's weekly availability over the date range, subtracts
+    their reservations and cuts the remaining time into `duration`-minute slots.
+    Results are cached for FREE_SLOTS_CACHE_TTL seconds and evicted when the
+    employee's availability changes.
+    """
+    if len(employee_id) > RESERVATION_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {RESERVATION_BATCH_MAX} employee ids per request")
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=6)
+    if date_to < date_from or (date_to - date_from).days >= FREE_SLOTS_MAX_DAYS:
+        raise HTTPException(status_code=422, detail=f"Date range must be 1..{FREE_SLOTS_MAX_DAYS} days")
+
+    known = await run_in_threadpool(crud.get_active_employee_ids, db, employee_id)
+    ids = [i for i in dict.fromkeys(employee_id) if i in known]
+    keys = {i: (i, date_from, date_to, duration, step) for i in ids}
+    results, errors = {}, {}
+    for i in ids:
+        hit = scheduling.cached(keys[i])
+        if hit is not None:
+            results[i] = hit
+
+    missing = [i for i in ids if i not in results]
+    if missing:
+        availability = await run_in_threadpool(crud.get_availability_for_employees, db, missing)
+        # employees without availability have no free time; skip their upstream call
+        need = [i for i in missing if availability[i]]
+        try:
+            reservations = await ReservationServiceClient().get_reservations_for_employees(
+                need, date_from=date_from, date_to=date_to
+            ) if need else {}
+        except RuntimeError as e:
+            reservations = dict.fromkeys(need, e)
+        for i in missing:
+            res = reservations.get(i, [])
+            if isinstance(res, DeadlineExceeded):
+                raise res
+            if isinstance(res, Exception):
+                errors[i] = f"Reservation service error: {res}"
+                continue
+            results[i] = scheduling.free_slots(
+                availability[i], res, date_from, date_to,
+                timedelta(minutes=duration), timedelta(minutes=step) if step else None,
+            )
+            scheduling.store(keys[i], i, results[i])
+
+    return [{"employee_id": i, "slots": results.get(i, []), "error": errors.get(i)} for i in ids]
+
+@router.get(
+    "/match",
+    dependencies=[Depends(require_unsharded)],
+    response_model=schemas.EmployeeMatchOut,
+    summary="Match active employees by skill, company, location and weekly time window",
+    responses={
+        200: {"description": "Matching employee ids (ascending)",
+              "content": {"application/json": {"example": {"employee_ids": [1, 4, 9], "source": "snapshot"}}}},
+        422: {"model": schemas.Problem, "description": "Validation error"},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def match_employees(
+    service_id: Optional[int] = Query(None, description="Has this skill", example=7),
+    company_id: Optional[int] = Query(None, description="Belongs to this company", example=1),
+    location_id: Optional[int] = Query(None, description="Works at this location (home or any slot)", example=12),
+    day: Optional[int] = Query(None, ge=0, le=7, description="Day of week (1=Monday .. 7=Sunday, 0=Sunday)", example=1),
+    time_from: Optional[time] = Query(None, description="Window start; a slot must cover it", example="09:00:00"),
+    time_to: Optional[time] = Query(None, description="Window end; a slot must cover it", example="12:00:00"),
+    limit: int = Query(100, ge=1, le=1000, description="Max number of ids to return", example=100),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Served from the in-memory roster snapshot when ROSTER_SNAPSHOT_ENABLED (and loaded),
+    otherwise by a database query with the same semantics. With a day/time window and a
+    location, the covering slot must be at that location.
+    """
+    snap = roster.current()
+    if snap is not None:
+        ids = snap.match(
+            service_id=service_id, company_id=company_id, location_id=location_id, day=day,
+            minute_from=time_from.hour * 60 + time_from.minute if time_from else None,
+            minute_to=time_to.hour * 60 + time_to.minute if time_to else None,
+            limit=limit,
+        )
+        return {"employee_ids": ids, "source": "snapshot"}
+    ids = await run_in_threadpool(
+        crud.match_employee_ids, db, service_id=service_id, company_id=company_id, location_id=location_id,
+        day=day, time_from=time_from, time_to=time_to, limit=limit,
+    )
+    return {"employee_ids": ids, "source": "database"}
+
+@router.get(
+    "/skill-query",
+    dependencies=[Depends(require_unsharded)],
+    response_model=schemas.SkillQueryOut,
+    summary="Find active employees by skill combination (AND / OR / NOT)",
+    responses={
+        200: {"description": "Matching employee ids (ascending, up to `limit`) and the total count",
+              "content": {"application/json": {"example": {"employee_ids": [3, 8], "total": 2, "source": "index"}}}},
+        422: {"model": schemas.Problem, "description": "No skill condition given"},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def skill_query(
+    all_of: List[int] = Query([], alias="all", description="Must have every one of these services", example=[1, 3]),
+    any_of: List[int] = Query([], alias="any", description="Must have at least one of these", example=[5, 7]),
+    none_of: List[int] = Query([], alias="not", description="Must have none of these", example=[9]),
+    company_id: Optional[int] = Query(None, description="Restrict to this company", example=1),
+    location_id: Optional[int] = Query(None, description="Restrict to this home location", example=12),
+    limit: int = Query(100, ge=1, le=1000, description="Max number of ids to return", example=100),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Served from the in-memory bitmap index when SKILL_INDEX_ENABLED (and loaded),
+    otherwise by a database query with the same semantics.
+    """
+    if not (all_of or any_of or none_of):
+        raise HTTPException(status_code=422, detail="Give at least one of all/any/not")
+    idx = skill_index.current()
+    if idx is not None:
+        result = idx.query(all_of, any_of, none_of, company_id=company_id, location_id=location_id)
+        return {"employee_ids": skill_index.page(result, limit), "total": len(result), "source": "index"}
+    ids, total = await run_in_threadpool(
+        crud.skill_query, db, all_of, any_of, none_of, company_id=company_id, location_id=location_id, limit=limit,
+    )
+    return {"employee_ids": ids, "total": total, "source": "database"}
+
+@router.get(
+    "/search",
+    dependencies=[Depends(require_unsharded)],
+    response_model=schemas.EmployeeSearchOut,
+    summary="Autocomplete active employees by name",
+    responses={
+        200: {"description": "Best matches first, up to `limit`",
+              "content": {"application/json": {"example": {
+                  "results": [{"id": 7, "first_name": "Ana", "last_name": "Novak", "company_id": 1}],
+                  "source": "index"}}}},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def search_employees(
+    q: str = Query(..., min_length=1, max_length=100, description="Name prefix(es), e.g. `ana nov`", example="ana nov"),
+    company_id: Optional[int] = Query(None, description="Restrict to this company", example=1),
+    limit: int = Query(10, ge=1, le=50, description="Max number of results", example=10),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Every word must prefix a first or last name (case- and accent-insensitive).
+    Served from the in-memory name index when NAME_SEARCH_ENABLED (and loaded),
+    which also ranks whole-word and first-name matches higher and falls back to
+    fuzzy (trigram) matches when nothing matches by prefix; otherwise a database
+    prefix query ordered by name.
+    """
+    idx = name_index.current()
+    if idx is not None:
+        return {"results": idx.describe(idx.search(q, limit=limit, company_id=company_id)), "source": "index"}
+    rows = await run_in_threadpool(crud.search_employees, db, name_index.tokens(q), company_id=company_id, limit=limit)
+    return {"results": rows, "source": "database"}
+
+@router.get(
+    "/coverage",
+    dependencies=[Depends(require_unsharded)],
+    response_model=schemas.CoverageOut,
+    summary="Team coverage: employees available per time bucket of the week",
+    responses={
+        200: {"description": "Per-bucket counts (Monday first) and the windows with at least `min_count` employees",
+              "content": {"application/json": {"example": {
+                  "resolution": 60, "employees": 4,
+                  "counts": [[0, 0, 0, 0, 0, 0, 0, 0, 0, 2, 3, 3, 1, 2, 2, 2, 1, 0, 0, 0, 0, 0, 0, 0]],
+                  "windows": [{"day": 1, "minute_from": 540, "minute_to": 600, "count": 2},
+                              {"day": 1, "minute_from": 600, "minute_to": 720, "count": 3}]
+              }}}},
+        422: {"model": schemas.Problem, "description": "Invalid resolution"},
+        500: {"model": schemas.Problem, "description": "Server error"},
+        501: {"model": schemas.Problem, "description": "Not available with sharding"},
+    },
+)
+async def team_coverage(
+    company_id: Optional[int] = Query(None, description="Employees of this company", example=1),
+    location_id: Optional[int] = Query(None, description="Availability at this location", example=12),
+    service_id: Optional[int] = Query(None, description="Employees with this skill", example=7),
+    min_count: int = Query(1, ge=1, description="Only report windows with at least this many employees", example=2),
+    resolution: int = Query(coverage.BUCKET_MINUTES, ge=coverage.BUCKET_MINUTES, le=24 * 60,
+                            description="Bucket length in minutes (multiple of 5 dividing a day)", example=30),
+    db: Session = Depends(get_read_db),
 ):
-    """Paginated list of active employees."""
-    return crud.get_employees(db, skip=skip, limit=limit)
+    """
+    Counts, for every bucket of the week, the active employees (filtered by company,
+    skill and location) whose weekly availability covers the whole bucket. With a
+    location, only slots there count (a slot without location counts as the home
+    location). Per-employee week grids are cached and evicted on availability changes.
+    """
+    if resolution % coverage.BUCKET_MINUTES or (24 * 60) % resolution:
+        raise HTTPException(status_code=422,
+                            detail=f"resolution must be a multiple of {coverage.BUCKET_MINUTES} that divides 1440")
+    team = await run_in_threadpool(crud.coverage_employees, db, company_id=company_id, service_id=service_id,
+                                   location_id=location_id)
+    weeks = {eid: coverage.cached(eid) for eid, _ in team}
+    missing = [eid for eid, enc in weeks.items() if enc is None]
+    if missing:
+        availability = await run_in_threadpool(crud.get_availability_for_employees, db, missing)
+        for eid in missing:
+            weeks[eid] = coverage.encode(availability[eid])
+            coverage.store(eid, weeks[eid])
+
+    def compute():
+        grid = coverage.counts([(home, weeks[eid]) for eid, home in team], location_id, resolution)
+        return grid.tolist(), coverage.windows(grid, min_count, resolution)
+
+    counts, windows = await run_in_threadpool(compute)
+    return {"resolution": resolution, "employees": len(team), "counts": counts, "windows": windows}
+
+@router.get(
+    "/aggregates",
+    response_model=schemas.AggregatesOut,
+    summary="Dashboard aggregates (headcount, skills, weekly hours)",
+    responses={
+        200: {"description": "Active headcount per company and home location, active employees per service "
+                             "and weekly available hours per location",
+              "content": {"application/json": {"example": {
+                  "headcount_by_company": {"1": 42},
+                  "headcount_by_location": {"12": 17, "13": 25},
+                  "employees_by_service": {"3": 12, "7": 30},
+                  "weekly_hours_by_location": {"12": 612.5, "13": 880.0}
+              }}}},
+        500: {"model": schemas.Problem, "description": "Server error"},
+    },
+)
+def get_aggregates(db: Session = Depends(get_read_db)):
+    """
+    Read from counters maintained on every write (and reconciled periodically), so
+    the cost does not depend on the number of employees. Slots without a location
+    count at the employee's home location; unassigned employees are not listed.
+    """
+    if sharding.enabled():
+        c = aggregates.merge(sharding.gather(aggregates.snapshot))
+    else:
+        c = aggregates.snapshot(db)
+    return {
+        "headcount_by_company": c["company"],
+        "headcount_by_location": c["location"],
+        "employees_by_service": c["service"],
+        "weekly_hours_by_location": {k: round(v / 60, 2) for k, v in c["location_minutes"].items()},
+    }
 
 @router.get(
     "/{employee_id}",
@@ -116,7 +460,7 @@ def list_employees(
 )
 def get_employee(
     employee_id: int = Path(..., description="Employee ID", example=1),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Fetch a single employee by numeric ID."""
     emp = crud.get_employee(db, employee_id)
@@ -138,6 +482,7 @@ def get_employee(
               }}}},
         400: {"model": schemas.Problem, "description": "Validation error"},
         404: {"model": schemas.Problem, "description": "Employee not found"},
+        409: {"model": schemas.Problem, "description": "New company lives on another shard"},
         500: {"model": schemas.Problem, "description": "Server error"},
     },
 )
@@ -156,7 +501,48 @@ def update_employee(
     Update full employee record (validation against Company Service when configured).
     """
     _validate_company_and_location(payload, CompanyServiceClient())
-    emp = crud.update_employee(db, employee_id, payload)
+    try:
+        emp = crud.update_employee(db, employee_id, payload)
+    except sharding.ShardMoveError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    if not emp:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found")
+    return {**emp, "availability": crud.get_availability(db, employee_id), "skills": crud.get_skills(db, employee_id)}
+
+@router.patch(
+    "/{employee_id}",
+    response_model=schemas.EmployeeRecord,
+    summary="Partially update employee",
+    responses={
+        200: {"description": "Employee updated (columns only, without availability and skills)",
+              "content": {"application/json": {"example": {
+                  "id": 1, "first_name": "Jane", "last_name": "Novak", "gender": False,
+                  "birth_date": "1992-02-02", "active": True, "idp_id": None,
+                  "id_picture": None, "company_id": 1, "location_id": 13
+              }}}},
+        400: {"model": schemas.Problem, "description": "Validation error"},
+        404: {"model": schemas.Problem, "description": "Employee not found"},
+        409: {"model": schemas.Problem, "description": "New company lives on another shard"},
+        500: {"model": schemas.Problem, "description": "Server error"},
+    },
+)
+def patch_employee(
+    employee_id: int = Path(..., description="Employee ID", example=1),
+    payload: schemas.EmployeePatch = Body(
+        ..., description="Only the fields to change",
+        examples={"move": {"summary": "Move to another location", "value": {"location_id": 13}}}
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Update only the supplied fields with a single UPDATE (validation against Company
+    Service when configured). The change event lists the supplied fields.
+    """
+    _validate_company_and_location(payload, CompanyServiceClient())
+    try:
+        emp = crud.patch_employee(db, employee_id, payload.model_dump(exclude_unset=True))
+    except sharding.ShardMoveError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     if not emp:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found")
     return emp
@@ -176,8 +562,7 @@ def delete_employee(
     db: Session = Depends(get_db),
 ):
     """Soft-delete an employee by setting active to false."""
-    emp = crud.soft_delete_employee(db, employee_id)
-    if not emp:
+    if not crud.soft_delete_employee(db, employee_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employee not found")
 
 @router.get(
@@ -200,17 +585,22 @@ def delete_employee(
 )
 async def get_reservations(
     employee_id: int = Path(..., description="Employee ID", example=1),
-    db: Session = Depends(get_db),
+    date_from: Optional[date] = Query(None, alias="from", description="First day (inclusive)", example="2025-01-01"),
+    date_to: Optional[date] = Query(None, alias="to", description="Last day (inclusive)", example="2025-01-31"),
+    db: Session = Depends(get_read_db),
 ):
     """
     Proxy call to the Reservation service. Requires RESERVATION_SERVICE_URL in the environment.
+    Responses are cached briefly (RESERVATION_CACHE_TTL seconds).
     """
-    emp = crud.get_employee(db, employee_id)
+    emp = await run_in_threadpool(crud.get_employee, db, employee_id)
     if not emp or not emp.active:
         raise HTTPException(status_code=404, detail="Employee not found")
-    client = ReservationServiceClient()
     try:
-        return await client.get_reservations_for_employee(employee_id)
+        client = ReservationServiceClient()
+        return await client.get_reservations_for_employee(employee_id, date_from=date_from, date_to=date_to)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Reservation service error: {e}")
 
@@ -233,18 +623,27 @@ async def get_reservations(
 )
 def employee_context(
     employee_id: int = Path(..., description="Employee ID", example=1),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     emp = crud.get_employee(db, employee_id)
     if not emp or not emp.active:
         raise HTTPException(status_code=404, detail="Employee not found")
 
     c = CompanyServiceClient()
+    if not c.enabled():
+        return schemas.EmployeeContextOut(employeeId=employee_id)
+    # keyed by the employee's current company/location, so employee edits never hit a stale entry;
+    # Company Service invalidations evict it through the tags
+    key = ("context", employee_id, emp.company_id, emp.location_id)
+    cached = company_client.cache_get(key)
+    if cached is not None:
+        return cached
+
     company: Optional[schemas.CompanyRef] = None
     location: Optional[schemas.LocationRef] = None
     business_hours: Optional[List[schemas.BusinessHoursDay]] = None
 
-    if c.enabled() and emp.company_id:
+    if emp.company_id:
         comp = c.get_company(emp.company_id)
         if comp:
             company = schemas.CompanyRef(
@@ -268,7 +667,7 @@ def employee_context(
                     for x in bh
                 ]
 
-    if c.enabled() and emp.location_id:
+    if emp.location_id:
         loc = c.get_location(emp.location_id)
         if loc:
             # note: your DTO uses "name" that maps to model.street
@@ -279,9 +678,16 @@ def employee_context(
                 parentLocationId=(loc.get("parentLocation", {}) or {}).get("id"),
             )
 
-    return schemas.EmployeeContextOut(
+    out = schemas.EmployeeContextOut(
         employeeId=employee_id,
         company=company,
         location=location,
         businessHours=business_hours,
     )
+    if not c.failures:  # never cache a fail-open fallback
+        tags = [("location", emp.location_id)] if emp.location_id else []
+        if emp.company_id:
+            tags += [("company", emp.company_id), ("business_hours", emp.company_id)]
+        # stored as plain JSON so the shared (SQLite) backend can hold it too
+        company_client.cache_set(key, out.model_dump(mode="json"), tags=tags)
+    return out
@@ -0,0 +1,58 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Body, Header, HTTPException
+from typing import List, Optional, Union
+
+from app import schemas
+from app.services import company_client
+
+router = APIRouter()
+
+# Shared secret for service-to-service calls; when unset the endpoints rely on
+# the gateway not exposing /internal.
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+
+
+def _check_token(token: Optional[str]) -> None:
+    if INTERNAL_API_TOKEN and not hmac.compare_digest(token or "", INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid internal token")
+
+
+@router.post(
+    "/cache/invalidate",
+    response_model=schemas.CacheInvalidationOut,
+    summary="Evict cached Company Service data (pushed by Company Service)",
+    responses={
+        200: {"description": "Entries evicted",
+              "content": {"application/json": {"example": {"evicted": 3}}}},
+        403: {"model": schemas.Problem, "description": "Invalid internal token",
+              "content": {"application/json": {"example": {
+                  "type": "about:blank", "title": "Invalid internal token", "status": 403,
+                  "instance": "/internal/cache/invalidate"
+              }}}},
+        422: {"model": schemas.Problem, "description": "Validation error"},
+    },
+)
+def invalidate_company_cache(
+    events: Union[schemas.CompanyChangeEvent, List[schemas.CompanyChangeEvent]] = Body(
+        ...,
+        description="One change event or a list of them",
+        examples={
+            "location": {"summary": "A location changed", "value": {"kind": "location", "id": 12}},
+            "batch": {"summary": "Company and its services changed", "value": [
+                {"kind": "company", "id": 1}, {"kind": "services", "id": 1}
+            ]},
+        },
+    ),
+    x_internal_token: Optional[str] = Header(None, description="Shared secret (INTERNAL_API_TOKEN)"),
+):
+    """
+    Immediately drops cached company/location/services/business-hours lookups
+    and everything derived from them (e.g. employee context), so the cache can
+    run with long TTLs. `services` and `business_hours` events carry the company id.
+    """
+    _check_token(x_internal_token)
+    if not isinstance(events, list):
+        events = [events]
+    return {"evicted": sum(company_client.invalidate(e.kind, e.id) for e in events)}
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app import crud, schemas
-from app.dependencies import get_db
+from app.dependencies import get_db, get_read_db
 from app.services.company_client import CompanyServiceClient
 
 router = APIRouter()
@@ -21,7 +21,7 @@ router = APIRouter()
 )
 def get_skills(
     employee_id: int = Path(..., description="Employee ID", example=1),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if not crud.get_employee(db, employee_id):
         raise HTTPException(status_code=404, detail="Employee not found")
@@ -1,6 +1,6 @@
-from datetime import date, time
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, constr, ConfigDict
+from datetime import date, datetime, time
+from typing import List, Literal, Optional, Dict, Any
+from pydantic import BaseModel, constr, ConfigDict, model_validator
 
 # ───────────────────────── Common error schema ─────────────────────────
 
@@ -151,6 +151,38 @@ class EmployeeUpdate(EmployeeBase):
     })
     active: bool
 
+class EmployeePatch(BaseModel):
+    model_config = ConfigDict(extra="forbid", json_schema_extra={
+        "example": {"location_id": 13, "last_name": "Novak"}
+    })
+    idp_id: Optional[str] = None
+    first_name: Optional[constr(min_length=1)] = None
+    last_name: Optional[constr(min_length=1)] = None
+    gender: Optional[bool] = None
+    birth_date: Optional[date] = None
+    id_picture: Optional[str] = None
+    active: Optional[bool] = None
+    company_id: Optional[int] = None
+    location_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def _required_not_null(self):
+        for f in ("first_name", "last_name", "gender", "birth_date", "active"):
+            if f in self.model_fields_set and getattr(self, f) is None:
+                raise ValueError(f"{f} cannot be null")
+        return self
+
+class EmployeeRecord(EmployeeBase):
+    """Employee columns only (no availability / skills)."""
+    model_config = ConfigDict(from_attributes=True, json_schema_extra={
+        "example": {
+            "id": 1, "idp_id": None, "first_name": "Jane", "last_name": "Novak", "gender": False,
+            "birth_date": "1992-02-02", "id_picture": None, "active": True, "company_id": 1, "location_id": 13
+        }
+    })
+    id: int
+    active: bool
+
 class EmployeeOut(EmployeeBase):
     model_config = ConfigDict(from_attributes=True, json_schema_extra={
         "example": {
@@ -198,3 +230,155 @@ class Reservation(BaseModel):
     date: date
     time_from: time
     time_to: time
+
+class EmployeeReservations(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "employee_id": 1,
+            "reservations": [{"id": 555, "employee_id": 1, "date": "2025-01-01",
+                              "time_from": "09:00:00", "time_to": "10:00:00"}],
+            "error": None
+        }
+    })
+    employee_id: int
+    reservations: List[Reservation] = []
+    error: Optional[str] = None
+
+# ───────────────────────── Free slots ─────────────────────────
+
+class FreeSlot(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"date": "2025-01-06", "time_from": "09:00:00", "time_to": "09:30:00", "location_id": 3}
+    })
+    date: date
+    time_from: time
+    time_to: time
+    location_id: Optional[int] = None
+
+class EmployeeFreeSlots(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "employee_id": 1,
+            "slots": [{"date": "2025-01-06", "time_from": "09:00:00", "time_to": "09:30:00", "location_id": 3}],
+            "error": None
+        }
+    })
+    employee_id: int
+    slots: List[FreeSlot] = []
+    error: Optional[str] = None
+
+# ───────────────────────── Change feed ─────────────────────────
+
+class ChangeEvent(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "seq": 42,
+            "type": "employee.updated",
+            "employee_id": 1,
+            "payload": {"location_id": 12},
+            "created_at": "2025-01-01T09:00:00"
+        }
+    })
+    seq: int
+    type: str
+    employee_id: int
+    payload: Dict[str, Any]
+    created_at: datetime
+
+class ChangesPage(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "events": [{"seq": 42, "type": "employee.updated", "employee_id": 1,
+                        "payload": {"location_id": 12}, "created_at": "2025-01-01T09:00:00"}],
+            "next": 42
+        }
+    })
+    events: List[ChangeEvent]
+    next: int
+
+# ───────────────────────── Internal ─────────────────────────
+
+class CompanyChangeEvent(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"kind": "location", "id": 12}
+    })
+    kind: Literal["company", "location", "services", "business_hours"]
+    id: int  # company id for services / business_hours
+
+class CacheInvalidationOut(BaseModel):
+    model_config = ConfigDict(json_schema_extra={"example": {"evicted": 3}})
+    evicted: int
+
+# ───────────────────────── Matching ─────────────────────────
+
+class EmployeeMatchOut(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"employee_ids": [1, 4, 9], "source": "snapshot"}
+    })
+    employee_ids: List[int]
+    source: Literal["snapshot", "database"]
+
+class SkillQueryOut(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"employee_ids": [3, 8], "total": 2, "source": "index"}
+    })
+    employee_ids: List[int]
+    total: int
+    source: Literal["index", "database"]
+
+class EmployeeSearchHit(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"id": 7, "first_name": "Ana", "last_name": "Novak", "company_id": 1}
+    })
+    id: int
+    first_name: str
+    last_name: str
+    company_id: Optional[int] = None
+
+class EmployeeSearchOut(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"results": [{"id": 7, "first_name": "Ana", "last_name": "Novak", "company_id": 1}],
+                    "source": "index"}
+    })
+    results: List[EmployeeSearchHit]
+    source: Literal["index", "database"]
+
+class CoverageWindow(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {"day": 1, "minute_from": 540, "minute_to": 720, "count": 3}
+    })
+    day: int  # 1=Monday .. 7=Sunday
+    minute_from: int  # minutes since midnight, inclusive
+    minute_to: int  # exclusive, up to 1440
+    count: int
+
+class CoverageOut(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "resolution": 60,
+            "employees": 4,
+            "counts": [[0, 0, 0, 0, 0, 0, 0, 0, 0, 2, 3, 3, 1, 2, 2, 2, 1, 0, 0, 0, 0, 0, 0, 0]],
+            "windows": [{"day": 1, "minute_from": 540, "minute_to": 600, "count": 2},
+                        {"day": 1, "minute_from": 600, "minute_to": 720, "count": 3}]
+        }
+    })
+    resolution: int  # bucket length in minutes
+    employees: int
+    counts: List[List[int]]  # per day (Monday first): employees available for the whole bucket
+    windows: List[CoverageWindow]
+
+# ───────────────────────── Aggregates ─────────────────────────
+
+class AggregatesOut(BaseModel):
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "headcount_by_company": {"1": 42},
+            "headcount_by_location": {"12": 17, "13": 25},
+            "employees_by_service": {"3": 12, "7": 30},
+            "weekly_hours_by_location": {"12": 612.5, "13": 880.0}
+        }
+    })
+    headcount_by_company: Dict[int, int]
+    headcount_by_location: Dict[int, int]
+    employees_by_service: Dict[int, int]
+    weekly_hours_by_location: Dict[int, float]
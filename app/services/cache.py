@@ -0,0 +1,210 @@
+# app/services/cache.py
+"""
+Small in-process TTL cache (thread-safe, LRU-bounded) for upstream lookups
+and derived results. Entries may carry tags so related keys can be evicted
+together (e.g. everything computed for one employee).
+
+SQLiteCache has the same interface but keeps JSON-serialisable entries in a
+local SQLite file (WAL mode), so all worker processes on a host share one copy:
+an entry fetched by one worker serves the others, and a tag invalidation
+received by one worker evicts for all of them.
+"""
+import json
+import os
+import sqlite3
+import stat
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._key_tags: Dict[Hashable, Tuple[Hashable, ...]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                self._drop(key)
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[Hashable] = ()) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._drop(key)
+            self._data[key] = (expires, value)
+            tags = tuple(tags)
+            if tags:
+                self._key_tags[key] = tags
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def _drop(self, key: Hashable) -> bool:
+        # caller holds the lock
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+        return self._data.pop(key, None) is not None
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry stored with `tag`; returns how many were live."""
+        with self._lock:
+            return sum(self._drop(k) for k in list(self._tags.get(tag, ())))
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _dump_key(key: Hashable) -> str:
+    # keys and tags are tuples of str / int / None
+    return json.dumps(key, separators=(",", ":"))
+
+
+def _ensure_private_dir(path: str) -> None:
+    """Create `path` with mode 0700, or check an existing one is ours and not writable by others."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    st = os.stat(path)
+    if st.st_uid != os.getuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"cache directory {path} must be owned by this user and not group/world-writable")
+
+
+class SQLiteCache:
+    """
+    TTL cache in a SQLite file shared by every process that opens the same path.
+
+    Each write is one IMMEDIATE transaction (entry and its tags change together);
+    reads are a primary-key lookup. Expiry uses wall-clock time since monotonic
+    clocks are per process. Expired rows are removed lazily and, together with
+    the oldest entries beyond `maxsize`, every SQLITE_CACHE_PRUNE_EVERY writes.
+
+    Values are stored as JSON (never pickled), and the file must live in a
+    directory owned by this user and not writable by group / others; it is
+    created with mode 0700 when missing. sqlite3 errors (e.g. "database is
+    locked" after the busy timeout) propagate; callers treat them as misses.
+    """
+
+    PRUNE_EVERY = int(os.getenv("SQLITE_CACHE_PRUNE_EVERY", "256"))
+
+    def __init__(self, path: str, ttl: float, maxsize: int = 10000):
+        _ensure_private_dir(os.path.dirname(os.path.abspath(path)))
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._local = threading.local()
+        self._writes = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # never reuse a connection across fork
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries ("
+                         "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_tags ("
+                         "tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires ON cache_entries (expires)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        row = self._conn().execute(
+            "SELECT value, expires FROM cache_entries WHERE key = ?", (_dump_key(key),)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, tags: Iterable[Hashable] = ()) -> None:
+        k = _dump_key(key)
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        data = json.dumps(value, separators=(",", ":"))
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache_entries (key, value, expires) VALUES (?, ?, ?)",
+                         (k, data, expires))
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (k,))
+            conn.executemany("INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)",
+                             [(_dump_key(t), k) for t in tags])
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired entries and the soonest-expiring ones beyond maxsize."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE expires < ?", (time.time(),))
+            excess = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.maxsize
+            if excess > 0:
+                conn.execute("DELETE FROM cache_entries WHERE key IN "
+                             "(SELECT key FROM cache_entries ORDER BY expires LIMIT ?)", (excess,))
+            conn.execute("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)")
+
+    def invalidate_tag(self, tag: Hashable) -> int:
+        """Drop every entry stored with `tag`; returns how many were live."""
+        t = _dump_key(tag)
+        with self._write() as conn:
+            live = conn.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE expires >= ? AND key IN "
+                "(SELECT key FROM cache_tags WHERE tag = ?)", (time.time(), t),
+            ).fetchone()[0]
+            conn.execute("DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", (t,))
+            conn.execute("DELETE FROM cache_tags WHERE key IN (SELECT key FROM cache_tags WHERE tag = ?)", (t,))
+        return live
+
+    def delete(self, key: Hashable) -> None:
+        k = _dump_key(key)
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (k,))
+            conn.execute("DELETE FROM cache_tags WHERE key = ?", (k,))
+
+    def clear(self) -> None:
+        with self._write() as conn:
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_tags")
+
+    def __len__(self) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE expires >= ?", (time.time(),)
+        ).fetchone()[0]
@@ -1,14 +1,115 @@
 # app/services/company_client.py
+import contextvars
+import logging
 import os
-from typing import Optional, Dict, Any, List, Set
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
 import httpx
 
+from app import metrics
+from app.metrics import track_upstream
+from app.request_context import DeadlineExceeded, deadline_exceeded
+from app.services import resilience
+from app.services.cache import SQLiteCache, TTLCache
+
 def _get_bool(env: str, default: bool) -> bool:
     v = os.getenv(env)
     if v is None:
         return default
     return str(v).lower() in ("1", "true", "yes", "y", "on")
 
+# Company data changes rarely and the Company Service pushes invalidations
+# (POST /internal/cache/invalidate -> handle_event), so entries can live long.
+# "Not found" answers are kept briefly so a new company/location shows up soon.
+COMPANY_CACHE_TTL = float(os.getenv("COMPANY_CACHE_TTL", "600"))
+COMPANY_NEGATIVE_CACHE_TTL = float(os.getenv("COMPANY_NEGATIVE_CACHE_TTL", "30"))
+
+# Shared by all client instances; keys are tagged with ("company", id),
+# ("location", id), ("services", company_id) and ("business_hours", company_id).
+# Values derived from lookups (e.g. employee context) are stored with the same tags.
+# Multi-id lookups (get_companies / get_locations): with a batch path configured,
+# misses are fetched as GET {path}?ids=1,2,3 (a JSON list of objects with "id"; ids
+# missing from it do not exist), COMPANY_BATCH_SIZE ids per call. Otherwise the
+# single lookups run concurrently, at most COMPANY_FANOUT_CONCURRENCY at a time
+# across the process.
+COMPANY_BATCH_COMPANIES_PATH = os.getenv("COMPANY_BATCH_COMPANIES_PATH", "")
+COMPANY_BATCH_LOCATIONS_PATH = os.getenv("COMPANY_BATCH_LOCATIONS_PATH", "")
+COMPANY_BATCH_SIZE = int(os.getenv("COMPANY_BATCH_SIZE", "100"))
+COMPANY_FANOUT_CONCURRENCY = int(os.getenv("COMPANY_FANOUT_CONCURRENCY", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=COMPANY_FANOUT_CONCURRENCY, thread_name_prefix="company")
+
+# COMPANY_CACHE_BACKEND=sqlite keeps the entries in a SQLite file shared by all
+# workers on the host (COMPANY_CACHE_PATH), so upstream calls do not scale with
+# the worker count and pushed invalidations reach every worker. The default path
+# is in a per-user directory created with mode 0700 (never a shared temp dir).
+COMPANY_CACHE_BACKEND = os.getenv("COMPANY_CACHE_BACKEND", "memory")
+COMPANY_CACHE_PATH = os.getenv("COMPANY_CACHE_PATH", os.path.join(
+    os.path.expanduser("~"), ".cache", "employee-service", "company-cache.sqlite"))
+COMPANY_CACHE_SIZE = int(os.getenv("COMPANY_CACHE_SIZE", "10000"))
+
+if COMPANY_CACHE_BACKEND == "sqlite":
+    cache = SQLiteCache(COMPANY_CACHE_PATH, ttl=COMPANY_CACHE_TTL, maxsize=COMPANY_CACHE_SIZE)
+else:
+    cache = TTLCache(ttl=COMPANY_CACHE_TTL, maxsize=COMPANY_CACHE_SIZE)
+
+CACHE_LOOKUPS = metrics.Counter(
+    "company_cache_lookups_total", "Company Service lookups by cache result.", ("op", "result"),
+)
+CACHE_INVALIDATIONS = metrics.Counter(
+    "company_cache_invalidations_total", "Pushed Company Service invalidations.", ("kind",),
+)
+CACHE_ERRORS = metrics.Counter(
+    "company_cache_errors_total", "Shared cache reads/writes that failed (treated as misses).", ("op",),
+)
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+
+def cache_get(key: Tuple, default: Any = None) -> Any:
+    """cache.get that turns a failing shared cache (e.g. "database is locked") into a miss."""
+    try:
+        return cache.get(key, default)
+    except sqlite3.Error:
+        CACHE_ERRORS.inc(("get",))
+        logger.warning("company cache read failed; treating as a miss", exc_info=True)
+        return default
+
+def cache_set(key: Tuple, value: Any, ttl: Optional[float] = None, tags=()) -> None:
+    """cache.set that never fails the caller; the entry is simply not cached."""
+    try:
+        cache.set(key, value, ttl=ttl, tags=tags)
+    except sqlite3.Error:
+        CACHE_ERRORS.inc(("set",))
+        logger.warning("company cache write failed; value not cached", exc_info=True)
+
+_KINDS = ("company", "location", "services", "business_hours")
+
+def invalidate(kind: str, entity_id: int) -> int:
+    """
+    Evict everything cached for a company/location/services/business_hours entity
+    (a company eviction also drops its services and business hours).
+    """
+    if kind not in _KINDS:
+        raise ValueError(f"unknown entity kind: {kind}")
+    CACHE_INVALIDATIONS.inc((kind,))
+    return cache.invalidate_tag((kind, int(entity_id)))
+
+def handle_event(event: Dict[str, Any]) -> int:
+    """
+    Consumer hook for Company Service change events. Accepts
+    {"kind": "location", "id": 12} as well as {"type": "location.updated", "id": 12}
+    (service/business-hours events carry the company id). Returns evicted entries.
+    """
+    kind = event.get("kind") or str(event.get("type", "")).split(".", 1)[0]
+    kind = {"service": "services", "business-hours": "business_hours", "businessHours": "business_hours"}.get(kind, kind)
+    entity_id = event.get("id", event.get("company_id"))
+    if entity_id is None:
+        raise ValueError("event has no id")
+    return invalidate(kind, int(entity_id))
+
 class CompanyServiceClient:
     """
     Minimal client for Company Service for read-only lookups & validation.
@@ -26,6 +127,9 @@ class CompanyServiceClient:
         # Keep strict behavior only for when enabled.
         self.strict = _get_bool("COMPANY_VALIDATION_STRICT", False)
 
+        # lookups that failed open on this instance (their fallbacks are never cached)
+        self.failures = 0
+
         if not self._enabled:
             # Do not create an HTTP client when disabled.
             self._client = None
@@ -41,66 +145,136 @@ class CompanyServiceClient:
                 write=read_timeout,
                 pool=connect_timeout,
             ),
+            event_hooks=resilience.deadline_hooks(),
         )
 
     def enabled(self) -> bool:
         return self._enabled
 
-    # ─── Raw calls ────────────────────────────────────────────────────────────
+    def _fail(self) -> None:
+        """
+        Called from an `except` block: decide whether the error may fail open.
+        A spent request deadline always propagates (-> 504); strict mode re-raises.
+        """
+        self.failures += 1
+        if deadline_exceeded():
+            raise DeadlineExceeded("request deadline exceeded calling company service")
+        if self.strict:
+            raise
 
-    def get_company(self, company_id: int) -> Optional[Dict[str, Any]]:
+    def ping(self, timeout: float = 1.0) -> bool:
+        """Reachability probe for readiness: any HTTP answer counts as reachable."""
         if not self._enabled:
-            return None
+            return True
         try:
-            r = self._client.get(f"/companies/{company_id}")
-            if r.status_code == 404:
-                return None
-            r.raise_for_status()
-            return r.json()
+            self._client.get("/", timeout=timeout)
+            return True
         except Exception:
-            if self.strict:
-                raise
-            return None
+            return False
 
-    def get_location(self, location_id: int) -> Optional[Dict[str, Any]]:
+    # ─── Raw calls (cached) ───────────────────────────────────────────────────
+
+    def _get(self, op: str, family: str, path: str, key: Tuple, tags: Tuple, empty: Any,
+             not_found_ok: bool = True) -> Any:
         if not self._enabled:
-            return None
+            return empty
+        hit = cache_get(key, _MISS)
+        if hit is not _MISS:
+            CACHE_LOOKUPS.inc((op, "hit"))
+            return hit
+        CACHE_LOOKUPS.inc((op, "miss"))
         try:
-            r = self._client.get(f"/locations/{location_id}")
-            if r.status_code == 404:
-                return None
-            r.raise_for_status()
-            return r.json()
+            with track_upstream("company", op):
+                r = resilience.call("company", family, lambda: self._client.get(path))
+                if r.status_code == 404 and not_found_ok:
+                    value, ttl = empty, COMPANY_NEGATIVE_CACHE_TTL
+                else:
+                    r.raise_for_status()
+                    value, ttl = r.json(), None
         except Exception:
-            if self.strict:
-                raise
-            return None
+            self._fail()
+            return empty
+        cache_set(key, value, ttl=ttl, tags=tags)
+        return value
+
+    def get_company(self, company_id: int) -> Optional[Dict[str, Any]]:
+        return self._get("get_company", "companies", f"/companies/{company_id}",
+                         ("company", company_id), (("company", company_id),), None)
+
+    def get_location(self, location_id: int) -> Optional[Dict[str, Any]]:
+        return self._get("get_location", "locations", f"/locations/{location_id}",
+                         ("location", location_id), (("location", location_id),), None)
 
     def get_services_for_company(self, company_id: int) -> List[Dict[str, Any]]:
-        if not self._enabled:
-            return []
-        try:
-            r = self._client.get(f"/services/company/{company_id}")
-            r.raise_for_status()
-            return r.json()
-        except Exception:
-            if self.strict:
-                raise
-            return []
+        return self._get("get_services_for_company", "services", f"/services/company/{company_id}",
+                         ("services", company_id), (("company", company_id), ("services", company_id)), [],
+                         not_found_ok=False)
 
     def get_business_hours_by_company(self, company_id: int) -> List[Dict[str, Any]]:
-        if not self._enabled:
-            return []
+        return self._get("get_business_hours_by_company", "business_hours", f"/business-hours/company/{company_id}",
+                         ("business_hours", company_id), (("company", company_id), ("business_hours", company_id)), [])
+
+    # ─── Multi-id lookups ─────────────────────────────────────────────────────
+
+    def _get_many(self, op: str, family: str, kind: str, ids: Iterable[int], batch_path: str,
+                  single) -> Dict[int, Optional[Dict[str, Any]]]:
+        ids = sorted({int(i) for i in ids})
+        if not self._enabled or not ids:
+            return {i: None for i in ids}
+        out: Dict[int, Optional[Dict[str, Any]]] = {}
+        missing = []
+        for i in ids:
+            hit = cache_get((kind, i), _MISS)
+            if hit is _MISS:
+                missing.append(i)
+            else:
+                CACHE_LOOKUPS.inc((op, "hit"))
+                out[i] = hit
+        if not missing:
+            return out
+        if batch_path:
+            CACHE_LOOKUPS.inc((op, "miss"), len(missing))
+            chunks = [missing[k:k + COMPANY_BATCH_SIZE] for k in range(0, len(missing), COMPANY_BATCH_SIZE)]
+            fetch = lambda chunk: self._fetch_batch(op, family, kind, batch_path, chunk)
+        else:
+            chunks = [[i] for i in missing]
+            fetch = lambda chunk: {chunk[0]: single(chunk[0])}
+        if len(chunks) == 1:
+            out.update(fetch(chunks[0]))
+            return out
+        # copy the request context so the deadline applies in the workers too
+        futures = [_executor.submit(contextvars.copy_context().run, fetch, c) for c in chunks]
+        for f in futures:
+            out.update(f.result())
+        return out
+
+    def _fetch_batch(self, op: str, family: str, kind: str, path: str,
+                     ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
         try:
-            r = self._client.get(f"/business-hours/company/{company_id}")
-            if r.status_code == 404:
-                return []
-            r.raise_for_status()
-            return r.json()
+            with track_upstream("company", op):
+                r = resilience.call("company", family, lambda: self._client.get(
+                    path, params={"ids": ",".join(map(str, ids))}))
+                r.raise_for_status()
+                found = {int(x["id"]): x for x in r.json() if "id" in x}
         except Exception:
-            if self.strict:
-                raise
-            return []
+            self._fail()
+            return {i: None for i in ids}
+        for i in ids:
+            if i in found:
+                cache_set((kind, i), found[i], tags=((kind, i),))
+            else:
+                cache_set((kind, i), None, ttl=COMPANY_NEGATIVE_CACHE_TTL, tags=((kind, i),))
+        return {i: found.get(i) for i in ids}
+
+    def get_companies(self, company_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """{id: company or None} for every id: cached entries, then one batch call or a concurrent fan-out."""
+        return self._get_many("get_companies", "companies", "company", company_ids,
+                              COMPANY_BATCH_COMPANIES_PATH, self.get_company)
+
+    def get_locations(self, location_ids: Iterable[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """{id: location or None} for every id: cached entries, then one batch call or a concurrent fan-out."""
+        return self._get_many("get_locations", "locations", "location", location_ids,
+                              COMPANY_BATCH_LOCATIONS_PATH, self.get_location)
 
     # ─── Helpers for validation ──────────────────────────────────────────────
 
@@ -114,6 +288,12 @@ class CompanyServiceClient:
             return True
         return self.get_location(location_id) is not None
 
+    def missing_locations(self, location_ids: Iterable[int]) -> List[int]:
+        """Ids (ascending) that do not exist; empty when validation is disabled."""
+        if not self._enabled:
+            return []
+        return [i for i, loc in self.get_locations(location_ids).items() if loc is None]
+
     def services_set_for_company(self, company_id: Optional[int]) -> Set[int]:
         if company_id is None or not self._enabled:
             return set()
@@ -0,0 +1,115 @@
+# app/services/coverage.py
+"""
+Team coverage: how many employees are available in each time bucket of the week.
+
+Each employee's weekly availability is encoded as a 7 x 288 grid of 5-minute
+buckets (Monday first), one bit per bucket, packed into 252 bytes. A bucket is
+set only when a slot covers it completely. Encodings are cached per employee,
+split by slot location so a location filter needs no re-encoding, and evicted
+when the employee's availability changes.
+
+Counting stacks every (employee, location) grid into one byte matrix (a single
+frombuffer over the concatenated encodings), drops rows outside the location
+filter with a boolean mask, ORs each employee's rows with one reduceat, then
+unpacks, down-samples to coarser buckets (all sub-buckets set) and sums the
+columns.
+
+Days follow ISO numbering (1=Monday .. 7=Sunday); 0 is accepted as Sunday.
+"""
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.cache import TTLCache
+
+BUCKET_MINUTES = 5
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+WEEK_BUCKETS = 7 * BUCKETS_PER_DAY
+WEEK_BYTES = WEEK_BUCKETS // 8
+
+COVERAGE_CACHE_TTL = float(os.getenv("COVERAGE_CACHE_TTL", "300"))
+
+_cache = TTLCache(ttl=COVERAGE_CACHE_TTL, maxsize=int(os.getenv("COVERAGE_CACHE_SIZE", "100000")))
+
+# {slot location_id (None = employee's home location): packed week bits}
+Encoded = Dict[Optional[int], bytes]
+
+
+def _minutes(t: Any) -> int:
+    return t.hour * 60 + t.minute + (1 if t.second or t.microsecond else 0)
+
+
+def encode(slots: Iterable[Any]) -> Encoded:
+    """Pack weekly slots into per-location 2016-bit week grids (only fully covered buckets are set)."""
+    # NumPy is only needed here and in counts(); importing lazily keeps it off the startup path.
+    import numpy as np
+
+    grids: Dict[Optional[int], Any] = {}
+    for s in slots:
+        day = (int(s.day_of_week) % 7 or 7) - 1
+        start = -(-_minutes(s.time_from) // BUCKET_MINUTES)
+        end = (s.time_to.hour * 60 + s.time_to.minute) // BUCKET_MINUTES
+        if start >= end:
+            continue
+        grid = grids.get(s.location_id)
+        if grid is None:
+            grid = grids[s.location_id] = np.zeros(WEEK_BUCKETS, dtype=bool)
+        base = day * BUCKETS_PER_DAY
+        grid[base + start:base + end] = True
+    return {loc: np.packbits(g).tobytes() for loc, g in grids.items()}
+
+
+def counts(weeks: Sequence[Tuple[Optional[int], Encoded]], location_id: Optional[int] = None,
+           resolution: int = BUCKET_MINUTES):
+    """
+    `weeks` is [(home_location_id, encoded)] per employee. Returns a 7 x (1440 / resolution)
+    int array: employees available for the whole bucket (at `location_id` when given;
+    a slot without location counts as the home location).
+    """
+    import numpy as np
+
+    k = resolution // BUCKET_MINUTES
+    # one row per (employee, slot location) grid, in employee order, and whether
+    # it counts for `location_id` (a slot without location is at the home location)
+    owners, keep, blobs = [], [], []
+    for i, (home, enc) in enumerate(weeks):
+        for loc, packed in enc.items():
+            owners.append(i)
+            keep.append(location_id is None or loc == location_id or (loc is None and home == location_id))
+            blobs.append(packed)
+    keep = np.array(keep, dtype=bool)
+    if not keep.any():
+        return np.zeros((7, BUCKETS_PER_DAY // k), dtype=np.int64)
+    rows = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), WEEK_BYTES)[keep]
+    owners = np.array(owners)[keep]
+    # OR each employee's kept rows together (they are contiguous), then unpack once
+    starts = np.flatnonzero(np.concatenate(([True], owners[1:] != owners[:-1])))
+    merged = np.bitwise_or.reduceat(rows, starts, axis=0)
+    bits = np.unpackbits(merged, axis=1).reshape(len(merged), 7, BUCKETS_PER_DAY // k, k)
+    return bits.all(axis=3).sum(axis=0, dtype=np.int64)
+
+
+def windows(grid, min_count: int, resolution: int) -> List[Dict[str, int]]:
+    """Runs of equal count >= min_count, as {day, minute_from, minute_to, count}."""
+    import numpy as np
+
+    out = []
+    for day, row in enumerate(grid, start=1):
+        cuts = np.concatenate(([0], np.flatnonzero(np.diff(row)) + 1, [len(row)]))
+        for a, b in zip(cuts[:-1], cuts[1:]):
+            if row[a] >= min_count:
+                out.append({"day": day, "minute_from": int(a) * resolution,
+                            "minute_to": int(b) * resolution, "count": int(row[a])})
+    return out
+
+
+def cached(employee_id: int) -> Optional[Encoded]:
+    return _cache.get(employee_id)
+
+
+def store(employee_id: int, value: Encoded) -> None:
+    _cache.set(employee_id, value, tags=(("employee", employee_id),))
+
+
+def invalidate(employee_id: int) -> None:
+    """Evict the cached week grid of one employee (call after availability writes)."""
+    _cache.invalidate_tag(("employee", employee_id))
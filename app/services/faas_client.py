@@ -4,6 +4,10 @@ from typing import Any, Dict, List, Optional, Union
 import httpx
 from datetime import time as dtime
 
+from app.metrics import track_upstream
+from app.request_context import DeadlineExceeded, deadline_exceeded
+from app.services import resilience
+
 def _get_bool(env: str, default: bool) -> bool:
     v = os.getenv(env)
     if v is None:
@@ -45,6 +49,7 @@ class FaaSClient:
                 connect=connect_timeout, read=read_timeout,
                 write=read_timeout, pool=connect_timeout
             ),
+            event_hooks=resilience.deadline_hooks(),
         )
 
     # remove the auto '/api' logic completely
@@ -55,6 +60,16 @@ class FaaSClient:
     def enabled(self) -> bool:
         return self._enabled
 
+    def ping(self, timeout: float = 1.0) -> bool:
+        """Reachability probe for readiness: any HTTP answer counts as reachable."""
+        if not self._enabled:
+            return True
+        try:
+            self._client.get(self._path("/"), timeout=timeout)
+            return True
+        except Exception:
+            return False
+
     # ─── Availability validation ──────────────────────────────────────────────
     def availability_check(
         self,
@@ -91,13 +106,16 @@ class FaaSClient:
                 })
 
         try:
-            r = self._client.post(self._path("/availability-check"), json={
-                "slots": payload_slots,
-                "businessHours": bh
-            })
-            r.raise_for_status()
-            return r.json()
+            with track_upstream("faas", "availability_check"):
+                r = resilience.call("faas", "availability_check", lambda: self._client.post(
+                    self._path("/availability-check"),
+                    json={"slots": payload_slots, "businessHours": bh},
+                ))
+                r.raise_for_status()
+                return r.json()
         except Exception:
+            if deadline_exceeded():
+                raise DeadlineExceeded("request deadline exceeded calling FaaS")
             # Fail-open: don't block writes if FAAS is down.
             return {"ok": True, "overlaps": [], "outOfBounds": []}
 
@@ -111,12 +129,14 @@ class FaaSClient:
         if not (self._enabled and self._audit_enabled):
             return
         try:
-            self._client.post(self._path("/audit"), json={
-                "service": self.service_name,
-                "event": event,
-                "entityId": entity_id,
-                "meta": meta or {}
-            })
+            with track_upstream("faas", "audit"):
+                # best-effort: never retried, skipped while the circuit is open
+                resilience.call("faas", "audit", lambda: self._client.post(self._path("/audit"), json={
+                    "service": self.service_name,
+                    "event": event,
+                    "entityId": entity_id,
+                    "meta": meta or {}
+                }), retries=0)
         except Exception:
             # swallow audit errors (best-effort telemetry)
             pass
@@ -1,16 +1,117 @@
 # app/services/reservation_client.py
+import asyncio
 import os
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
 import httpx
 
+from app.metrics import track_upstream
+from app.services import resilience
+from app.services.cache import TTLCache
+
+RESERVATION_CACHE_TTL = float(os.getenv("RESERVATION_CACHE_TTL", "15"))
+RESERVATION_BATCH_CONCURRENCY = int(os.getenv("RESERVATION_BATCH_CONCURRENCY", "8"))
+
+_cache = TTLCache(ttl=RESERVATION_CACHE_TTL, maxsize=int(os.getenv("RESERVATION_CACHE_SIZE", "10000")))
+
+# One pooled AsyncClient per process (keep-alive connections are reused across
+# requests); created lazily on the running loop and closed on shutdown.
+_shared_client: Optional[httpx.AsyncClient] = None
+
+
+def _client() -> httpx.AsyncClient:
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        connect_timeout = float(os.getenv("RESERVATION_HTTP_CONNECT_TIMEOUT", "2.0"))
+        read_timeout = float(os.getenv("RESERVATION_HTTP_READ_TIMEOUT", "5.0"))
+        _shared_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=connect_timeout, read=read_timeout,
+                                  write=read_timeout, pool=connect_timeout),
+            limits=httpx.Limits(max_connections=int(os.getenv("RESERVATION_HTTP_MAX_CONNECTIONS", "50")),
+                                max_keepalive_connections=20),
+            event_hooks=resilience.async_deadline_hooks(),
+        )
+    return _shared_client
+
+
+async def aclose() -> None:
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
+def _in_range(r: Dict[str, Any], date_from: Optional[date], date_to: Optional[date]) -> bool:
+    d = str(r.get("date", ""))[:10]
+    if date_from and d < date_from.isoformat():
+        return False
+    if date_to and d > date_to.isoformat():
+        return False
+    return True
+
+
 class ReservationServiceClient:
     def __init__(self):
-        self.base_url = os.getenv("COMPANY_SERVICE_URL")
+        # Falls back to COMPANY_SERVICE_URL, which historically hosted /reservations.
+        self.base_url = (os.getenv("RESERVATION_SERVICE_URL") or os.getenv("COMPANY_SERVICE_URL") or "").rstrip("/")
         if not self.base_url:
             # If missing, raise so we document a 502 upstream error in the route
-            raise RuntimeError("COMPANY_SERVICE_URL is not configured")
+            raise RuntimeError("RESERVATION_SERVICE_URL is not configured")
+
+    async def get_reservations_for_employee(
+        self,
+        employee_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Reservations of one employee, optionally bounded to [date_from, date_to]
+        (inclusive). The bounds are sent upstream as `from`/`to` and re-applied
+        locally; results are cached for RESERVATION_CACHE_TTL seconds.
+        """
+        key = (self.base_url, employee_id, date_from, date_to)
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
 
-    async def get_reservations_for_employee(self, employee_id: int):
-        async with httpx.AsyncClient() as client:
-            r = await client.get(f"{self.base_url}/reservations", params={"employee_id": employee_id})
+        params: Dict[str, Any] = {"employee_id": employee_id}
+        if date_from:
+            params["from"] = date_from.isoformat()
+        if date_to:
+            params["to"] = date_to.isoformat()
+        client = _client()
+        with track_upstream("reservation", "get_reservations_for_employee"):
+            r = await resilience.acall("reservation", "reservations", lambda: client.get(
+                f"{self.base_url}/reservations", params=params
+            ))
             r.raise_for_status()
-            return r.json()
+            data = r.json()
+
+        if date_from or date_to:
+            data = [x for x in data if _in_range(x, date_from, date_to)]
+        _cache.set(key, data)
+        return data
+
+    async def get_reservations_for_employees(
+        self,
+        employee_ids: Iterable[int],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        concurrency: int = RESERVATION_BATCH_CONCURRENCY,
+    ) -> Dict[int, Any]:
+        """
+        Fetch many employees at once with at most `concurrency` upstream calls
+        in flight. Maps employee id -> reservations list, or -> the exception
+        raised for that employee.
+        """
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def one(eid: int):
+            async with sem:
+                try:
+                    return eid, await self.get_reservations_for_employee(eid, date_from=date_from, date_to=date_to)
+                except Exception as e:
+                    return eid, e
+
+        return dict(await asyncio.gather(*(one(eid) for eid in dict.fromkeys(employee_ids))))
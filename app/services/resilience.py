@@ -0,0 +1,287 @@
+# app/services/resilience.py
+"""
+Circuit breakers and retry budgets for upstream HTTP calls.
+
+- One breaker per (upstream, endpoint family), shared by all client
+  instances in the process. After BREAKER_FAILURE_THRESHOLD consecutive
+  failures it opens and rejects calls immediately (CircuitOpenError) for
+  BREAKER_RESET_TIMEOUT seconds, then lets BREAKER_HALF_OPEN_PROBES probe
+  calls through; a successful probe closes it, a failed one re-opens it.
+- Retries use full-jitter exponential backoff and are bounded by a per-upstream
+  retry budget (a fraction of recent calls), so retries cannot multiply load
+  on a struggling dependency.
+
+Failures are transport errors (connect/read timeouts, refused connections)
+and 5xx responses; 4xx answers mean the upstream is healthy.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app import metrics
+from app.request_context import DeadlineExceeded, check_deadline, deadline_exceeded, remaining
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "10"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "1"))
+UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.05"))
+# retries may add at most this fraction of the call volume (plus a small floor)
+UPSTREAM_RETRY_BUDGET_RATIO = float(os.getenv("UPSTREAM_RETRY_BUDGET_RATIO", "0.1"))
+UPSTREAM_RETRY_BUDGET_MIN_PER_SEC = float(os.getenv("UPSTREAM_RETRY_BUDGET_MIN_PER_SEC", "1.0"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_REJECTIONS = metrics.Counter(
+    "upstream_circuit_rejections_total", "Calls rejected by an open circuit.", ("upstream", "family"),
+)
+RETRIES = metrics.Counter("upstream_retries_total", "Upstream retry attempts.", ("upstream", "family"))
+RETRY_BUDGET_EXHAUSTED = metrics.Counter(
+    "upstream_retry_budget_exhausted_total", "Retries skipped because the budget was spent.", ("upstream",),
+)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, upstream: str, family: str):
+        super().__init__(f"circuit open for {upstream}/{family}")
+        self.upstream = upstream
+        self.family = family
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT,
+                 half_open_probes: int = BREAKER_HALF_OPEN_PROBES):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state, self._probes = HALF_OPEN, 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return False
+                self._probes += 1
+            return True
+
+    def release(self) -> None:
+        """Give back a half-open probe slot without judging the upstream."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state, self.failures = CLOSED, 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state, self._opened_at = OPEN, time.monotonic()
+
+
+class RetryBudget:
+    """Each call deposits `ratio` tokens, each retry spends one; a floor refills over time."""
+
+    def __init__(self, ratio: float = UPSTREAM_RETRY_BUDGET_RATIO,
+                 min_per_sec: float = UPSTREAM_RETRY_BUDGET_MIN_PER_SEC, cap: float = 10.0):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.cap = cap
+        self._tokens = cap
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.cap, self._tokens + self.ratio + (now - self._last) * self.min_per_sec)
+            self._last = now
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_budgets: Dict[str, RetryBudget] = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(upstream: str, family: str) -> CircuitBreaker:
+    key = (upstream, family)
+    b = _breakers.get(key)
+    if b is None:
+        with _registry_lock:
+            b = _breakers.setdefault(key, CircuitBreaker())
+    return b
+
+
+def budget(upstream: str) -> RetryBudget:
+    b = _budgets.get(upstream)
+    if b is None:
+        with _registry_lock:
+            b = _budgets.setdefault(upstream, RetryBudget())
+    return b
+
+
+def _is_failure(result: Any = None, exc: Optional[BaseException] = None) -> bool:
+    if exc is not None:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code >= 500
+        return isinstance(exc, httpx.TransportError)
+    return getattr(result, "status_code", 0) >= 500
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, UPSTREAM_RETRY_BACKOFF * (2 ** attempt))
+
+
+def _take_retry(rb: RetryBudget, upstream: str, delay: float) -> bool:
+    rem = remaining()
+    if rem is not None and rem <= delay:
+        return False  # no budget left for another attempt
+    if rb.withdraw():
+        return True
+    RETRY_BUDGET_EXHAUSTED.inc((upstream,))
+    return False
+
+
+def _apply_deadline(request: httpx.Request) -> None:
+    # httpx request hook: shrink every timeout to the request's remaining
+    # budget and forward that budget to the upstream.
+    rem = remaining()
+    if rem is None:
+        return
+    if rem <= 0:
+        raise DeadlineExceeded(f"request deadline exceeded before calling {request.url.host}")
+    timeouts = request.extensions.get("timeout") or dict.fromkeys(("connect", "read", "write", "pool"))
+    request.extensions["timeout"] = {k: rem if v is None else min(v, rem) for k, v in timeouts.items()}
+    request.headers["X-Request-Timeout-Ms"] = str(max(1, int(rem * 1000)))
+
+
+async def _apply_deadline_async(request: httpx.Request) -> None:
+    _apply_deadline(request)
+
+
+def deadline_hooks() -> Dict[str, list]:
+    """`event_hooks` for httpx.Client so every call respects the request deadline."""
+    return {"request": [_apply_deadline]}
+
+
+def async_deadline_hooks() -> Dict[str, list]:
+    return {"request": [_apply_deadline_async]}
+
+
+def call(upstream: str, family: str, fn: Callable[[], Any], retries: int = UPSTREAM_RETRIES) -> Any:
+    """
+    Run `fn` (one HTTP request) behind the breaker for (upstream, family).
+    A final 5xx response is returned as-is so callers keep their own handling.
+    """
+    b, rb = breaker(upstream, family), budget(upstream)
+    rb.deposit()
+    attempt = 0
+    while True:
+        check_deadline(f"calling {upstream}")
+        if not b.allow():
+            CIRCUIT_REJECTIONS.inc((upstream, family))
+            raise CircuitOpenError(upstream, family)
+        try:
+            result = fn()
+        except Exception as e:
+            if isinstance(e, DeadlineExceeded) or deadline_exceeded():
+                # our budget ran out, which says nothing about the upstream's health
+                b.release()
+                if isinstance(e, DeadlineExceeded):
+                    raise
+                raise DeadlineExceeded(f"request deadline exceeded calling {upstream}") from e
+            if not _is_failure(exc=e):
+                b.record_success()  # the upstream answered; release a half-open probe
+                raise
+            b.record_failure()
+            delay = _backoff(attempt)
+            if attempt >= retries or not _take_retry(rb, upstream, delay):
+                raise
+        else:
+            if not _is_failure(result):
+                b.record_success()
+                return result
+            b.record_failure()
+            delay = _backoff(attempt)
+            if attempt >= retries or not _take_retry(rb, upstream, delay):
+                return result
+        RETRIES.inc((upstream, family))
+        time.sleep(delay)
+        attempt += 1
+
+
+async def acall(upstream: str, family: str, fn: Callable[[], Awaitable[Any]],
+                retries: int = UPSTREAM_RETRIES) -> Any:
+    """Async twin of `call` for httpx.AsyncClient requests."""
+    b, rb = breaker(upstream, family), budget(upstream)
+    rb.deposit()
+    attempt = 0
+    while True:
+        check_deadline(f"calling {upstream}")
+        if not b.allow():
+            CIRCUIT_REJECTIONS.inc((upstream, family))
+            raise CircuitOpenError(upstream, family)
+        try:
+            result = await fn()
+        except Exception as e:
+            if isinstance(e, DeadlineExceeded) or deadline_exceeded():
+                # our budget ran out, which says nothing about the upstream's health
+                b.release()
+                if isinstance(e, DeadlineExceeded):
+                    raise
+                raise DeadlineExceeded(f"request deadline exceeded calling {upstream}") from e
+            if not _is_failure(exc=e):
+                b.record_success()  # the upstream answered; release a half-open probe
+                raise
+            b.record_failure()
+            delay = _backoff(attempt)
+            if attempt >= retries or not _take_retry(rb, upstream, delay):
+                raise
+        else:
+            if not _is_failure(result):
+                b.record_success()
+                return result
+            b.record_failure()
+            delay = _backoff(attempt)
+            if attempt >= retries or not _take_retry(rb, upstream, delay):
+                return result
+        RETRIES.inc((upstream, family))
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def _breaker_lines() -> List[str]:
+    out = [
+        "# HELP upstream_circuit_state Circuit breaker state (0=closed, 1=half-open, 2=open).",
+        "# TYPE upstream_circuit_state gauge",
+    ]
+    for (upstream, family), b in list(_breakers.items()):
+        out.append(f'upstream_circuit_state{{upstream="{upstream}",family="{family}"}} {_STATE_VALUE[b.state]}')
+    return out
+
+
+metrics.register_collector(_breaker_lines)
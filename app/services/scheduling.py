@@ -0,0 +1,125 @@
+# app/services/scheduling.py
+"""
+Free-slot computation: weekly availability minus reservations.
+
+Weekly slots are expanded into concrete [start, end) datetimes for a date
+range, reservations are merged into disjoint busy intervals, and a single
+sweep over both sorted lists yields the free intervals (O(n + m) after
+sorting). Free intervals are then cut into bookable slots of a given length.
+
+Days follow ISO numbering (1=Monday .. 7=Sunday); 0 is accepted as Sunday.
+"""
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.cache import TTLCache
+
+FREE_SLOTS_CACHE_TTL = float(os.getenv("FREE_SLOTS_CACHE_TTL", "10"))
+
+_cache = TTLCache(ttl=FREE_SLOTS_CACHE_TTL, maxsize=int(os.getenv("FREE_SLOTS_CACHE_SIZE", "10000")))
+
+Interval = Tuple[datetime, datetime]
+
+
+def _as_time(v: Any) -> time:
+    return v if isinstance(v, time) else time.fromisoformat(str(v))
+
+
+def _as_date(v: Any) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+
+def expand_weekly(slots: Iterable[Any], date_from: date, date_to: date) -> List[Tuple[datetime, datetime, Optional[int]]]:
+    """Concrete (start, end, location_id) intervals for every day in [date_from, date_to], sorted."""
+    by_day: Dict[int, List[Any]] = {}
+    for s in slots:
+        by_day.setdefault(int(s.day_of_week) % 7 or 7, []).append(s)
+    out = []
+    d = date_from
+    while d <= date_to:
+        for s in by_day.get(d.isoweekday(), ()):
+            start, end = datetime.combine(d, _as_time(s.time_from)), datetime.combine(d, _as_time(s.time_to))
+            if start < end:
+                out.append((start, end, s.location_id))
+        d += timedelta(days=1)
+    out.sort(key=lambda x: (x[0], x[1]))
+    return out
+
+
+def merge(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort and coalesce overlapping or touching intervals."""
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def reservation_intervals(reservations: Iterable[Dict[str, Any]]) -> List[Interval]:
+    out = []
+    for r in reservations:
+        d = _as_date(r["date"])
+        out.append((datetime.combine(d, _as_time(r["time_from"])), datetime.combine(d, _as_time(r["time_to"]))))
+    return merge(out)
+
+
+def subtract(available: Sequence[Tuple[datetime, datetime, Optional[int]]],
+             busy: Sequence[Interval]) -> List[Tuple[datetime, datetime, Optional[int]]]:
+    """
+    `available` sorted by start, `busy` merged (disjoint, sorted). Both are
+    walked once; the busy pointer only moves forward.
+    """
+    out = []
+    j = 0
+    for start, end, loc in available:
+        while j < len(busy) and busy[j][1] <= start:
+            j += 1
+        cur, k = start, j
+        while k < len(busy) and busy[k][0] < end:
+            if busy[k][0] > cur:
+                out.append((cur, busy[k][0], loc))
+            cur = max(cur, busy[k][1])
+            k += 1
+        if cur < end:
+            out.append((cur, end, loc))
+    return out
+
+
+def bookable(free: Iterable[Tuple[datetime, datetime, Optional[int]]],
+             duration: timedelta, step: Optional[timedelta] = None) -> List[Tuple[datetime, datetime, Optional[int]]]:
+    """Cut free intervals into `duration`-long slots starting every `step` (default: duration)."""
+    step = step or duration
+    out = []
+    for start, end, loc in free:
+        t = start
+        while t + duration <= end:
+            out.append((t, t + duration, loc))
+            t += step
+    return out
+
+
+def free_slots(slots: Iterable[Any], reservations: Iterable[Dict[str, Any]], date_from: date, date_to: date,
+               duration: timedelta, step: Optional[timedelta] = None) -> List[Dict[str, Any]]:
+    available = expand_weekly(slots, date_from, date_to)
+    free = subtract(available, reservation_intervals(reservations))
+    return [
+        {"date": s.date(), "time_from": s.time(), "time_to": e.time(), "location_id": loc}
+        for s, e, loc in bookable(free, duration, step)
+    ]
+
+
+def cached(key: Tuple) -> Optional[List[Dict[str, Any]]]:
+    return _cache.get(key)
+
+
+def store(key: Tuple, employee_id: int, value: List[Dict[str, Any]]) -> None:
+    _cache.set(key, value, tags=(("employee", employee_id),))
+
+
+def invalidate(employee_id: int) -> None:
+    """Evict cached free slots of one employee (call after availability writes)."""
+    _cache.invalidate_tag(("employee", employee_id))
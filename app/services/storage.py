@@ -1,18 +1,23 @@
 # app/services/storage.py
 import os, io
-from PIL import Image
 from fastapi import UploadFile
 
 ROOT      = os.getenv("STORAGE_PATH", "storage")
 ORIG_DIR  = os.path.join(ROOT, "originals")
 THUMB_DIR = os.path.join(ROOT, "thumbnails")
 
-for d in (ORIG_DIR, THUMB_DIR):
-    os.makedirs(d, exist_ok=True)
+def _ensure_dirs() -> None:
+    # created on first upload rather than at import time
+    for d in (ORIG_DIR, THUMB_DIR):
+        os.makedirs(d, exist_ok=True)
 
 class LocalStorage:
     @staticmethod
     async def save_and_thumbnail(file: UploadFile, employee_id: int) -> str:
+        # Pillow is only needed here; importing it lazily keeps it off the startup path.
+        from PIL import Image
+
+        _ensure_dirs()
         data = await file.read()
         ext = file.content_type.split("/")[-1]
         orig_path = os.path.join(ORIG_DIR, f"{employee_id}.{ext}")
@@ -0,0 +1,71 @@
+# app/services/warmup.py
+"""
+Company cache warm-up at startup.
+
+Collects the company and home-location ids referenced by active employees
+(primary and every shard, most referenced first, at most CACHE_WARMUP_LIMIT
+of each) and prefetches companies and locations through the multi-id lookups,
+then services and business hours per company on CACHE_WARMUP_CONCURRENCY
+threads. The lifespan holds readiness until this finishes or
+CACHE_WARMUP_TIMEOUT passes, so a fresh deploy does not take traffic with a
+cold cache. Enabled by CACHE_WARMUP_ENABLED (and only does anything when
+Company validation is enabled).
+"""
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app import database, models
+from app.services.company_client import CompanyServiceClient
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+CACHE_WARMUP_ENABLED = _get_bool("CACHE_WARMUP_ENABLED", False)
+CACHE_WARMUP_TIMEOUT = float(os.getenv("CACHE_WARMUP_TIMEOUT", "20"))
+CACHE_WARMUP_CONCURRENCY = int(os.getenv("CACHE_WARMUP_CONCURRENCY", "8"))
+CACHE_WARMUP_LIMIT = int(os.getenv("CACHE_WARMUP_LIMIT", "1000"))
+
+
+def referenced_ids(limit: int = CACHE_WARMUP_LIMIT) -> Tuple[List[int], List[int]]:
+    """(company ids, location ids) of active employees, most referenced first."""
+    E = models.Employee
+    companies, locations = Counter(), Counter()
+    for factory in [database.SessionLocal] + [s.SessionLocal for s in database.shards.values()]:
+        db = factory()
+        try:
+            for column, into in ((E.company_id, companies), (E.location_id, locations)):
+                rows = db.execute(
+                    select(column, func.count()).where(E.active == True, column.isnot(None)).group_by(column)
+                )
+                for value, n in rows:
+                    into[value] += n
+        finally:
+            db.close()
+    return [i for i, _ in companies.most_common(limit)], [i for i, _ in locations.most_common(limit)]
+
+
+def warm(client: Optional[CompanyServiceClient] = None) -> Dict[str, int]:
+    """Prefetch everything the referenced companies / locations need; returns what was covered."""
+    c = client or CompanyServiceClient()
+    if not c.enabled():
+        return {"companies": 0, "locations": 0}
+    company_ids, location_ids = referenced_ids()
+    c.get_companies(company_ids)
+    c.get_locations(location_ids)
+
+    def per_company(company_id: int) -> None:
+        c.get_services_for_company(company_id)
+        c.get_business_hours_by_company(company_id)
+
+    with ThreadPoolExecutor(max_workers=CACHE_WARMUP_CONCURRENCY, thread_name_prefix="warmup") as pool:
+        list(pool.map(per_company, company_ids))
+    return {"companies": len(company_ids), "locations": len(location_ids)}
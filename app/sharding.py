@@ -0,0 +1,117 @@
+# app/sharding.py
+"""
+Company-based horizontal sharding (optional, see database.configure_shards).
+
+An employee lives, with its availability and skills, on the shard owning its
+company. Employee ids stay globally unique: they are allocated from the
+`employee_shards` directory on the primary, which also records the shard, so
+any request carrying an employee id can be routed with one (cached) lookup.
+
+Per-employee routes get a session on the owning shard (app.dependencies);
+cross-company listing scatters one keyset query per shard in parallel and
+merges the sorted pages. Moving an employee to a company on another shard is
+rejected (ShardMoveError).
+
+Routes that read across all employees from the primary (match, coverage,
+search, batch reservations / free slots, the change feed) answer 501 while
+sharding is on, and the in-process indexes refuse to start with it.
+"""
+import contextvars
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, List, Optional
+
+from app import database, models
+from app.services.cache import TTLCache
+
+SHARD_SCATTER_WORKERS = int(os.getenv("SHARD_SCATTER_WORKERS", "8"))
+
+# directory entries never change (moves are rejected), so only size bounds them
+_directory = TTLCache(ttl=float(os.getenv("SHARD_DIRECTORY_CACHE_TTL", "86400")),
+                      maxsize=int(os.getenv("SHARD_DIRECTORY_CACHE_SIZE", "100000")))
+_executor = ThreadPoolExecutor(max_workers=SHARD_SCATTER_WORKERS, thread_name_prefix="shard")
+
+
+class ShardMoveError(Exception):
+    """The requested company lives on another shard than the employee."""
+
+
+def enabled() -> bool:
+    return bool(database.shards)
+
+
+def shard_for_company(company_id: Optional[int]) -> str:
+    """
+    SHARD_MAP entry, else crc32 % number of shards. The hash depends on the
+    shard count: pin existing companies in SHARD_MAP before adding a shard.
+    """
+    if company_id is None:
+        return database.default_shard
+    name = database.shard_map.get(company_id)
+    if name is not None:
+        return name
+    names = sorted(database.shards)
+    return names[zlib.crc32(str(company_id).encode()) % len(names)]
+
+
+def shard_for_employee(employee_id: int) -> Optional[str]:
+    name = _directory.get(employee_id)
+    if name is None:
+        db = database.SessionLocal()
+        try:
+            row = db.query(models.EmployeeShard.shard).filter(models.EmployeeShard.employee_id == employee_id).first()
+        finally:
+            db.close()
+        if row is None:
+            return None  # unknown ids are not cached: they may be allocated later
+        name = row[0]
+        _directory.set(employee_id, name)
+    return name
+
+
+def allocate_employee_id(shard: str) -> int:
+    """Reserve a global employee id on the primary for a row about to be inserted on `shard`."""
+    db = database.SessionLocal()
+    try:
+        entry = models.EmployeeShard(shard=shard)
+        db.add(entry)
+        db.commit()
+        _directory.set(entry.employee_id, shard)
+        return entry.employee_id
+    finally:
+        db.close()
+
+
+def check_move(employee_id: int, company_id: Optional[int]) -> None:
+    current = shard_for_employee(employee_id)
+    if current is not None and shard_for_company(company_id) != current:
+        raise ShardMoveError(f"company {company_id} is on another shard than employee {employee_id}")
+
+
+def session_for_employee(employee_id: int):
+    """A session on the employee's shard (the default shard for unknown ids, which then 404)."""
+    name = shard_for_employee(employee_id) or database.default_shard
+    return database.shards[name].SessionLocal()
+
+
+def gather(fn: Callable[[Any], Any]) -> List[Any]:
+    """Run fn(session) on every shard in parallel; results in shard-name order."""
+    def run(shard: database.Shard):
+        db = shard.SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    # copy the request context so deadlines and statistics apply in the workers too
+    futures = [_executor.submit(contextvars.copy_context().run, run, database.shards[name])
+               for name in sorted(database.shards)]
+    return [f.result() for f in futures]
+
+
+def merge_pages(pages: Iterable[List[Any]], skip: int, limit: int, key: Callable[[Any], Any]) -> List[Any]:
+    """Merge per-shard pages sorted by `key` and cut the global page."""
+    return list(islice(heapq.merge(*pages, key=key), skip, skip + limit))
@@ -0,0 +1,278 @@
+# app/skill_index.py
+"""
+Optional bitmap index for skill queries ("who can do all of {a, b}, any of
+{c, d}, none of {e}", optionally within a company / home location).
+
+Every service, company and location maps to a Bitmap of employee ids, plus one
+bitmap of active employees; a query is a handful of AND / OR / AND-NOT passes
+over those. Bitmaps are chunked: ids are split into 2**14-bit blocks held as
+Python ints and empty blocks are not stored, so sparse sets stay small and
+set operations run in C over whole blocks.
+
+The index is built from the tables once and then follows the outbox sequence
+(app.outbox), applying event payloads directly: skills.replaced carries the
+new service ids and employee.* events the changed company/location/active
+fields, so no row is re-read. A local commit wakes the follower immediately.
+Enabled by SKILL_INDEX_ENABLED.
+"""
+import asyncio
+import logging
+import os
+import threading
+from array import array
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+
+from app import database, models, outbox
+
+logger = logging.getLogger(__name__)
+
+
+def _get_bool(env: str, default: bool) -> bool:
+    v = os.getenv(env)
+    if v is None:
+        return default
+    return str(v).lower() in ("1", "true", "yes", "y", "on")
+
+
+SKILL_INDEX_ENABLED = _get_bool("SKILL_INDEX_ENABLED", False)
+SKILL_INDEX_REFRESH_INTERVAL = float(os.getenv("SKILL_INDEX_REFRESH_INTERVAL", "1.0"))
+
+CHUNK_BITS = 14
+_MASK = (1 << CHUNK_BITS) - 1
+_LOAD_BATCH = 50000
+NONE = -1
+
+
+class Bitmap:
+    """Set of non-negative ints stored as {block: int} with empty blocks omitted."""
+    __slots__ = ("chunks",)
+
+    def __init__(self, chunks: Optional[Dict[int, int]] = None):
+        self.chunks = chunks if chunks is not None else {}
+
+    @classmethod
+    def of(cls, ids: Iterable[int]) -> "Bitmap":
+        b = cls()
+        for i in ids:
+            b.add(i)
+        return b
+
+    def add(self, i: int) -> None:
+        k = i >> CHUNK_BITS
+        self.chunks[k] = self.chunks.get(k, 0) | (1 << (i & _MASK))
+
+    def discard(self, i: int) -> None:
+        k = i >> CHUNK_BITS
+        c = self.chunks.get(k)
+        if c:
+            c &= ~(1 << (i & _MASK))
+            if c:
+                self.chunks[k] = c
+            else:
+                del self.chunks[k]
+
+    def __contains__(self, i: int) -> bool:
+        return (self.chunks.get(i >> CHUNK_BITS, 0) >> (i & _MASK)) & 1 == 1
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        a, b = self.chunks, other.chunks
+        if len(a) > len(b):
+            a, b = b, a
+        out = {}
+        for k, v in a.items():
+            w = b.get(k)
+            if w:
+                x = v & w
+                if x:
+                    out[k] = x
+        return Bitmap(out)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        out = dict(self.chunks)
+        for k, v in other.chunks.items():
+            out[k] = out.get(k, 0) | v
+        return Bitmap(out)
+
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        out = {}
+        for k, v in self.chunks.items():
+            w = other.chunks.get(k)
+            x = v & ~w if w else v
+            if x:
+                out[k] = x
+        return Bitmap(out)
+
+    def __len__(self) -> int:
+        return sum(v.bit_count() for v in self.chunks.values())
+
+    def __iter__(self) -> Iterator[int]:
+        for k in sorted(self.chunks):
+            v, base = self.chunks[k], k << CHUNK_BITS
+            while v:
+                low = v & -v
+                yield base + low.bit_length() - 1
+                v ^= low
+
+    def nbytes(self) -> int:
+        return sum((v.bit_length() + 7) // 8 for v in self.chunks.values())
+
+
+_EMPTY = Bitmap()
+
+
+class SkillIndex:
+    def __init__(self):
+        self.by_service: Dict[int, Bitmap] = {}
+        self.by_company: Dict[int, Bitmap] = {}
+        self.by_location: Dict[int, Bitmap] = {}
+        self.active = Bitmap()
+        # current company / home location per employee id, to move bits on change
+        self._company = array("q")
+        self._location = array("q")
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _set(column: array, eid: int, value: int) -> int:
+        if eid >= len(column):
+            column.extend([NONE] * (eid + 1 - len(column)))
+        old, column[eid] = column[eid], value
+        return old
+
+    def _move(self, index: Dict[int, Bitmap], column: array, eid: int, value: Optional[int]) -> None:
+        value = NONE if value is None else int(value)
+        old = self._set(column, eid, value)
+        if old == value:
+            return
+        if old != NONE and old in index:
+            index[old].discard(eid)
+        if value != NONE:
+            index.setdefault(value, Bitmap()).add(eid)
+
+    def set_employee(self, eid: int, **fields: Any) -> None:
+        """Apply (a subset of) active / company_id / location_id for one employee."""
+        with self._lock:
+            if "active" in fields:
+                (self.active.add if fields["active"] else self.active.discard)(eid)
+            if "company_id" in fields:
+                self._move(self.by_company, self._company, eid, fields["company_id"])
+            if "location_id" in fields:
+                self._move(self.by_location, self._location, eid, fields["location_id"])
+
+    def set_skills(self, eid: int, service_ids: Iterable[int]) -> None:
+        new = set(service_ids)
+        with self._lock:
+            for sid, bm in self.by_service.items():
+                if sid not in new:
+                    bm.discard(eid)
+            for sid in new:
+                self.by_service.setdefault(sid, Bitmap()).add(eid)
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        etype, eid, payload = event["type"], event["employee_id"], event["payload"]
+        if etype == "skills.replaced":
+            self.set_skills(eid, payload.get("service_ids", ()))
+        elif etype.startswith("employee."):
+            self.set_employee(eid, **{k: payload[k] for k in ("active", "company_id", "location_id") if k in payload})
+
+    def query(self, all_of: Sequence[int] = (), any_of: Sequence[int] = (), none_of: Sequence[int] = (),
+              company_id: Optional[int] = None, location_id: Optional[int] = None) -> Bitmap:
+        """Active employees with every skill in all_of, at least one in any_of and none in none_of."""
+        with self._lock:
+            # narrowest sets first keeps intermediate results small
+            musts = [self.by_service.get(s, _EMPTY) for s in all_of]
+            if company_id is not None:
+                musts.append(self.by_company.get(company_id, _EMPTY))
+            if location_id is not None:
+                musts.append(self.by_location.get(location_id, _EMPTY))
+            musts.sort(key=lambda b: len(b.chunks))
+            result = self.active
+            for b in musts:
+                result = result & b
+            if any_of:
+                union = Bitmap()
+                for s in any_of:
+                    union = union | self.by_service.get(s, _EMPTY)
+                result = result & union
+            for s in none_of:
+                result = result - self.by_service.get(s, _EMPTY)
+            return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "active": len(self.active),
+                "services": len(self.by_service),
+                "bytes": sum(b.nbytes() for b in self.by_service.values()),
+                "seq": self.seq,
+            }
+
+
+def page(bitmap: Bitmap, limit: int) -> List[int]:
+    return list(islice(iter(bitmap), limit))
+
+
+# ─── Loading / following ──────────────────────────────────────────────────────
+
+def build() -> SkillIndex:
+    idx = SkillIndex()
+    E, K = models.Employee, models.EmployeeSkill
+    db = database.SessionLocal()
+    try:
+        idx.seq = db.execute(select(func.max(models.OutboxEvent.seq))).scalar() or 0
+        after = 0
+        while True:
+            rows = db.execute(
+                select(E.id, E.active, E.company_id, E.location_id).where(E.id > after).order_by(E.id).limit(_LOAD_BATCH)
+            ).all()
+            if not rows:
+                break
+            for eid, active, company, location in rows:
+                idx.set_employee(eid, active=active, company_id=company, location_id=location)
+            after = rows[-1][0]
+        skills: Dict[int, Bitmap] = idx.by_service
+        for eid, sid in db.execute(select(K.employee_id, K.service_id)).yield_per(_LOAD_BATCH):
+            skills.setdefault(sid, Bitmap()).add(eid)
+    finally:
+        db.close()
+    return idx
+
+
+def refresh(idx: SkillIndex, limit: int = 1000) -> int:
+    """Apply outbox events past idx.seq; returns how many were consumed."""
+    events = outbox.fetch(idx.seq, limit)
+    for e in events:
+        idx.apply(e)
+        idx.seq = e["seq"]
+    return len(events)
+
+
+_index: Optional[SkillIndex] = None
+
+
+def current() -> Optional[SkillIndex]:
+    return _index
+
+
+async def run() -> None:
+    """Background task: initial build, then follow the change sequence."""
+    global _index
+    while True:
+        try:
+            idx = await asyncio.to_thread(build)
+            break
+        except Exception:
+            logger.exception("skill index build failed; retrying")
+            await asyncio.sleep(5 * SKILL_INDEX_REFRESH_INTERVAL)
+    _index = idx
+    logger.info("skill index loaded: %s", idx.stats())
+    while True:
+        await outbox.wait(SKILL_INDEX_REFRESH_INTERVAL)
+        try:
+            while await asyncio.to_thread(refresh, idx):
+                pass
+        except Exception:
+            logger.exception("skill index refresh failed; retrying")
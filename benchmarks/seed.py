@@ -0,0 +1,99 @@
+# benchmarks/seed.py
+"""
+Deterministic bulk seeding for the benchmark suite.
+
+Rows are inserted with Core executemany batches (no ORM objects), so 100k
+employees with 10 slots and 5 skills each take seconds, not minutes.
+"""
+import random
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.database import Base
+from app import models
+
+
+def _slot_times(rng: random.Random, block: int):
+    # Each weekday has 3h blocks starting at 06:00; a slot lives inside its block,
+    # so seeded slots never overlap and the evening (>= 21:00) stays free.
+    start = 6 * 60 + block * 180 + rng.randrange(0, 30)
+    end = start + rng.randrange(60, 150)
+    return dtime(start // 60, start % 60), dtime(end // 60, end % 60)
+
+
+def seed(
+    engine: Engine,
+    employees: int,
+    slots_per_employee: int = 10,
+    skills_per_employee: int = 5,
+    companies: int = 50,
+    locations_per_company: int = 4,
+    services_per_company: int = 20,
+    seed: int = 42,
+    batch: int = 5000,
+    reset: bool = True,
+) -> Dict[str, Any]:
+    """Create the schema and fill it; returns the parameters used (stored with results)."""
+    if slots_per_employee > 35:
+        raise ValueError("at most 35 slots per employee (5 blocks x 7 days)")
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(seed)
+    epoch = datetime(1970, 1, 1)
+    emp_rows: List[Dict[str, Any]] = []
+    slot_rows: List[Dict[str, Any]] = []
+    skill_rows: List[Dict[str, Any]] = []
+
+    def flush(conn):
+        if emp_rows:
+            conn.execute(insert(models.Employee), emp_rows)
+        if slot_rows:
+            conn.execute(insert(models.AvailabilitySlot), slot_rows)
+        if skill_rows:
+            conn.execute(insert(models.EmployeeSkill), skill_rows)
+        emp_rows.clear()
+        slot_rows.clear()
+        skill_rows.clear()
+
+    with engine.begin() as conn:
+        for emp_id in range(1, employees + 1):
+            company_id = rng.randrange(1, companies + 1)
+            location_id = (company_id - 1) * locations_per_company + rng.randrange(1, locations_per_company + 1)
+            emp_rows.append({
+                "id": emp_id,
+                "first_name": f"First{emp_id}",
+                "last_name": f"Last{rng.randrange(0, 10000)}",
+                "gender": bool(emp_id % 2),
+                "birth_date": epoch + timedelta(days=rng.randrange(7000, 15000)),
+                "active": True,
+                "company_id": company_id,
+                "location_id": location_id,
+            })
+            for i in range(slots_per_employee):
+                t_from, t_to = _slot_times(rng, i // 7)
+                slot_rows.append({
+                    "employee_id": emp_id, "day_of_week": i % 7 + 1,
+                    "time_from": t_from, "time_to": t_to, "location_id": location_id,
+                })
+            first_service = (company_id - 1) * services_per_company + 1
+            for sid in rng.sample(range(first_service, first_service + services_per_company),
+                                  min(skills_per_employee, services_per_company)):
+                skill_rows.append({"employee_id": emp_id, "service_id": sid})
+            if len(emp_rows) >= batch:
+                flush(conn)
+        flush(conn)
+
+    return {
+        "employees": employees,
+        "slots_per_employee": slots_per_employee,
+        "skills_per_employee": skills_per_employee,
+        "companies": companies,
+        "locations_per_company": locations_per_company,
+        "services_per_company": services_per_company,
+        "seed": seed,
+    }
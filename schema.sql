@@ -33,6 +33,52 @@ CREATE TABLE IF NOT EXISTS employee_skills (
   FOREIGN KEY (employee_id) REFERENCES employee(id)
 );
 
+-- Transactional outbox / change feed (GET /changes). seq is the feed cursor.
+CREATE TABLE IF NOT EXISTS outbox_events (
+  seq BIGINT PRIMARY KEY,                -- assigned at commit from outbox_sequence
+  event_type VARCHAR(64) NOT NULL,
+  employee_id BIGINT NOT NULL,
+  payload TEXT NOT NULL,
+  created_at DATETIME NOT NULL,
+  INDEX ix_outbox_events_employee_id (employee_id),
+  INDEX ix_outbox_events_created_at (created_at)
+);
+
+-- Hands out outbox seqs in commit order (one row, locked by each committing writer).
+CREATE TABLE IF NOT EXISTS outbox_sequence (
+  id INT PRIMARY KEY,
+  value BIGINT NOT NULL
+);
+INSERT IGNORE INTO outbox_sequence (id, value) VALUES (1, 0);
+
+-- Dashboard counters maintained by every write (GET /employees/aggregates).
+-- dimension: company | location | service | location_minutes
+CREATE TABLE IF NOT EXISTS aggregate_counters (
+  dimension VARCHAR(32) NOT NULL,
+  `key` BIGINT NOT NULL,
+  value BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (dimension, `key`)
+);
+
+-- Employee-id directory (primary database only, used when DATABASE_SHARDS is set).
+-- Allocates global employee ids and records the shard holding each employee.
+CREATE TABLE IF NOT EXISTS employee_shards (
+  employee_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+  shard VARCHAR(64) NOT NULL
+);
+
+-- Stored responses of writes sent with an Idempotency-Key (primary database only).
+-- status_code is NULL while the first attempt is still running.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  `key` VARCHAR(255) NOT NULL PRIMARY KEY,
+  fingerprint CHAR(64) NOT NULL,
+  status_code INT NULL,
+  headers TEXT NULL,
+  body MEDIUMBLOB NULL,
+  created_at DATETIME NOT NULL,
+  INDEX ix_idempotency_keys_created_at (created_at)
+);
+
 -- If you already had the old table, and need to migrate, run once:
 -- ALTER TABLE employee ADD COLUMN company_id BIGINT NULL;
 -- ALTER TABLE employee ADD COLUMN location_id BIGINT NULL;
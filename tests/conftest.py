@@ -8,7 +8,7 @@ import tempfile
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, select
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -60,3 +60,22 @@ app.dependency_overrides[get_db] = override_get_db
 def client():
     with TestClient(app) as c:
         yield c
+
+@pytest.fixture
+def employee_payload():
+    """employee_payload(**fields): a valid create/update body, `fields` overriding the defaults."""
+    def make(**fields):
+        data = {"first_name": "Test", "last_name": "Employee", "gender": True, "birth_date": "1990-01-01"}
+        data.update(fields)
+        return data
+    return make
+
+@pytest.fixture
+def row_count():
+    """row_count(table, bind=None, **where): rows of `table` matching `where` (test DB unless `bind`)."""
+    def count(table, bind=None, **where):
+        t = Base.metadata.tables[table]
+        stmt = select(func.count()).select_from(t).where(*(t.c[k] == v for k, v in where.items()))
+        with (bind or engine).connect() as conn:
+            return conn.execute(stmt).scalar()
+    return count
@@ -0,0 +1,75 @@
+# tests/test_admission.py
+import asyncio
+
+from app import admission, database
+from app.admission import AdmissionMiddleware, Limiter
+
+
+def test_route_classes():
+    assert admission.route_class("GET", "/employees/") == "read"
+    assert admission.route_class("PATCH", "/employees/1") == "write"
+    assert admission.route_class("GET", "/employees/1/reservations") == "upstream"
+    assert admission.route_class("GET", "/employees/1/context") == "upstream"
+    assert admission.route_class("GET", "/employees/free-slots") == "upstream"
+    assert admission.route_class("GET", "/changes/stream") is None
+    assert admission.route_class("GET", "/health") is None
+
+
+def test_limiter_queues_then_sheds():
+    async def scenario():
+        lim = Limiter("test", limit=1, queue=1)
+        assert await lim.acquire(1.0) is None
+        waiter = asyncio.create_task(lim.acquire(1.0))
+        await asyncio.sleep(0)
+        assert await lim.acquire(1.0) == "queue_full"
+        lim.release()  # hands the slot to the waiter
+        assert await waiter is None and lim.active == 1
+        assert await lim.acquire(0.01) == "queue_timeout"
+        lim.release()
+        assert lim.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_middleware_sheds_with_retry_after():
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await gate.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        mw = AdmissionMiddleware(app, {c: Limiter(c, 1, 0) for c in ("read", "write", "upstream")})
+        scope = {"type": "http", "method": "GET", "path": "/employees/"}
+        first, second = [], []
+
+        async def call(out):
+            async def send(message):
+                out.append(message)
+            await mw(scope, None, send)
+
+        running = asyncio.create_task(call(first))
+        await asyncio.sleep(0)
+        await call(second)
+        gate.set()
+        await running
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first[0]["status"] == 200
+    assert second[0]["status"] == 503
+    assert (b"retry-after", b"1") in second[0]["headers"]
+    assert admission.SHED.value(("read", "queue_full")) >= 1
+
+
+def test_default_limits_fit_the_db_pool(monkeypatch):
+    monkeypatch.setattr(database, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 10)
+    for name in ("READ", "WRITE", "UPSTREAM"):
+        monkeypatch.delenv(f"ADMISSION_{name}_LIMIT", raising=False)
+    assert admission.default_limits() == {"read": 9, "write": 3, "upstream": 3}
+    assert sum(lim.limit for lim in admission._limiters().values()) == 15
+
+    monkeypatch.setenv("ADMISSION_READ_LIMIT", "100")
+    assert admission._limiters()["read"].limit == 15  # never more than the pool can serve
@@ -0,0 +1,56 @@
+# tests/test_aggregates.py
+from app import aggregates
+
+
+def test_counters_follow_writes_and_match_reconciliation(client, employee_payload):
+    aggregates.reconcile()  # start from a consistent table whatever earlier tests did
+    a = client.post("/employees/", json=employee_payload(company_id=60, location_id=6001)).json()["id"]
+    b = client.post("/employees/", json=employee_payload(company_id=60, location_id=6002)).json()["id"]
+    client.put(f"/employees/{a}/skills/", json=[601, 602])
+    client.put(f"/employees/{b}/skills/", json=[601])
+    slot = client.post(f"/employees/{a}/availability/", json=[
+        {"day_of_week": 1, "time_from": "09:00:00", "time_to": "12:00:00"},
+        {"day_of_week": 2, "time_from": "09:00:00", "time_to": "10:30:00", "location_id": 6002},
+    ]).json()[1]["id"]
+
+    body = client.get("/employees/aggregates").json()
+    assert body["headcount_by_company"]["60"] == 2
+    assert body["headcount_by_location"]["6001"] == 1
+    assert body["employees_by_service"]["601"] == 2
+    assert body["weekly_hours_by_location"]["6001"] == 3.0
+    assert body["weekly_hours_by_location"]["6002"] == 1.5
+
+    # a moves home: its location-less slot moves with it; b leaves; skills change
+    client.put(f"/employees/{a}", json=employee_payload(company_id=60, location_id=6003, active=True))
+    client.delete(f"/employees/{b}")
+    client.put(f"/employees/{a}/skills/", json=[602])
+    client.delete(f"/employees/{a}/availability/{slot}")
+
+    body = client.get("/employees/aggregates").json()
+    assert body["headcount_by_company"]["60"] == 1
+    assert "6001" not in body["headcount_by_location"]
+    assert "601" not in body["employees_by_service"]
+    assert body["weekly_hours_by_location"]["6003"] == 3.0
+    assert "6002" not in body["weekly_hours_by_location"]
+
+    assert aggregates.reconcile() == 0
+
+
+def test_apply_upserts_counter_rows():
+    from sqlalchemy.dialects import mysql
+
+    from app import database, models
+
+    db = database.SessionLocal()
+    try:
+        aggregates.apply(db, {("company", 6900): 1})
+        aggregates.apply(db, {("company", 6900): 2})  # row exists: added, not re-inserted
+        db.commit()
+        assert db.get(models.AggregateCounter, ("company", 6900)).value == 3
+        db.query(models.AggregateCounter).filter_by(dimension="company", key=6900).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    sql = str(aggregates.upsert_statement("mysql", "company", 1, 1).compile(dialect=mysql.dialect()))
+    assert "ON DUPLICATE KEY UPDATE value = (aggregate_counters.value + VALUES(value))" in sql
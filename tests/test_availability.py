@@ -1,14 +1,8 @@
 # tests/test_availability.py
 
-def test_availability_crud(client):
+def test_availability_crud(client, employee_payload):
     # Create employee
-    emp = {
-        "first_name": "Cal",
-        "last_name": "Slots",
-        "gender": True,
-        "birth_date": "1990-05-05"
-    }
-    emp_id = client.post("/employees/", json=emp).json()["id"]
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
 
     # GET availability (empty)
     r = client.get(f"/employees/{emp_id}/availability/")
@@ -0,0 +1,90 @@
+# tests/test_changes.py
+import threading
+import time
+
+from app import crud, database, schemas
+from app.routers.changes import _sse
+
+
+def test_change_feed_returns_deltas(client, employee_payload):
+    start = client.get("/changes/").json()
+    cursor = start["next"]
+    while start["events"]:
+        start = client.get("/changes/", params={"since": cursor}).json()
+        cursor = start["next"]
+
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
+    client.put(f"/employees/{emp_id}", json=employee_payload(last_name="Changed", active=True))
+    client.put(f"/employees/{emp_id}/skills/", json=[3, 5])
+
+    r = client.get("/changes/", params={"since": cursor})
+    assert r.status_code == 200
+    body = r.json()
+    assert [(e["type"], e["employee_id"]) for e in body["events"]] == [
+        ("employee.created", emp_id), ("employee.updated", emp_id), ("skills.replaced", emp_id),
+    ]
+    assert body["events"][1]["payload"] == {"last_name": "Changed"}
+    assert body["next"] == body["events"][-1]["seq"]
+
+    r = client.get("/changes/", params={"since": body["next"]})
+    assert r.json() == {"events": [], "next": body["next"]}
+
+
+def test_long_poll_wakes_on_commit(client, employee_payload):
+    cursor = client.get("/changes/", params={"since": 0, "limit": 1000}).json()["next"]
+
+    def write_later():
+        time.sleep(0.2)
+        db = database.SessionLocal()
+        try:
+            crud.create_employee(db, schemas.EmployeeCreate(**employee_payload(first_name="Late")))
+        finally:
+            db.close()
+
+    t = threading.Thread(target=write_later)
+    t.start()
+    started = time.monotonic()
+    r = client.get("/changes/", params={"since": cursor, "wait": 5})
+    t.join()
+    assert time.monotonic() - started < 4
+    assert [e["type"] for e in r.json()["events"]] == ["employee.created"]
+
+
+def test_sse_frame():
+    frame = _sse({"seq": 7, "type": "employee.updated", "employee_id": 1, "payload": {}, "created_at": "x"})
+    assert frame.startswith("id: 7\nevent: employee.updated\ndata: {") and frame.endswith("\n\n")
+
+
+def test_events_committed_out_of_order_are_all_delivered(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    from app import models, outbox
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'feed.db'}", poolclass=NullPool)
+    database.Base.metadata.create_all(engine, tables=[models.OutboxEvent.__table__,
+                                                      models.OutboxSequence.__table__])
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+
+    a, b = Session(), Session()
+    try:
+        a.execute(text("SELECT 1"))                    # A's transaction starts first ...
+        outbox.record(a, "employee.updated", 1, {"last_name": "A"})
+        a.flush()                                      # crud's later statements autoflush like this
+        outbox.record(b, "employee.updated", 2, {"last_name": "B"})
+        b.commit()                                     # ... but B commits first
+
+        seen = outbox.fetch(0, 100)
+        assert [e["employee_id"] for e in seen] == [2]
+        cursor = seen[-1]["seq"]
+
+        a.commit()
+        later = outbox.fetch(cursor, 100)              # the consumer's cursor does not skip A
+        assert [e["employee_id"] for e in later] == [1]
+        assert later[0]["seq"] > cursor
+    finally:
+        a.close()
+        b.close()
+        engine.dispose()
@@ -0,0 +1,197 @@
+# tests/test_company_cache.py
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import company_client
+
+
+@pytest.fixture
+def company_upstream(monkeypatch):
+    """Enable the Company Service client against an in-process fake; returns the request log."""
+    calls = []
+
+    def handler(request):
+        path = request.url.path.removeprefix("/api")
+        calls.append(path)
+        if path.startswith("/companies/"):
+            return httpx.Response(200, json={"id": 1, "companyName": f"Shop v{len(calls)}"})
+        if path.startswith("/locations/"):
+            return httpx.Response(200, json={"id": 12, "street": "Trg Leona", "number": "3"})
+        return httpx.Response(200, json=[])
+
+    def make_client(**kw):
+        kw.pop("event_hooks", None)
+        return httpx.Client(transport=httpx.MockTransport(handler), **kw)
+
+    monkeypatch.setenv("COMPANY_SERVICE_URL", "http://company.local/api")
+    monkeypatch.setenv("COMPANY_VALIDATION_ENABLED", "true")
+    monkeypatch.setattr(company_client, "httpx", SimpleNamespace(Client=make_client, Timeout=httpx.Timeout))
+    company_client.cache.clear()
+    yield calls
+    company_client.cache.clear()
+
+
+def test_lookups_are_cached_until_invalidated(client, company_upstream):
+    c = company_client.CompanyServiceClient()
+    assert c.get_company(1)["companyName"] == "Shop v1"
+    assert c.get_company(1)["companyName"] == "Shop v1"
+    assert company_upstream == ["/companies/1"]
+
+    r = client.post("/internal/cache/invalidate", json={"kind": "company", "id": 1})
+    assert r.status_code == 200 and r.json() == {"evicted": 1}
+    assert c.get_company(1)["companyName"] == "Shop v2"
+
+
+def test_context_is_evicted_with_its_company(client, company_upstream, employee_payload):
+    emp_id = client.post("/employees/", json=employee_payload(company_id=1, location_id=12)).json()["id"]
+
+    first = client.get(f"/employees/{emp_id}/context").json()
+    again = client.get(f"/employees/{emp_id}/context").json()
+    assert again == first
+    assert company_upstream.count("/companies/1") == 1
+
+    r = client.post("/internal/cache/invalidate", json=[{"kind": "location", "id": 12}, {"kind": "company", "id": 1}])
+    assert r.json()["evicted"] >= 3  # company, location and the derived context
+    fresh = client.get(f"/employees/{emp_id}/context").json()
+    assert fresh["company"]["name"] != first["company"]["name"]
+
+
+def test_internal_token(client, monkeypatch):
+    from app.routers import internal
+    monkeypatch.setattr(internal, "INTERNAL_API_TOKEN", "s3cret")
+    assert client.post("/internal/cache/invalidate", json={"kind": "location", "id": 1}).status_code == 403
+    r = client.post("/internal/cache/invalidate", json={"kind": "location", "id": 1},
+                    headers={"X-Internal-Token": "s3cret"})
+    assert r.status_code == 200
+
+
+def test_handle_event_formats():
+    company_client.cache.set(("business_hours", 4), [], tags=[("company", 4), ("business_hours", 4)])
+    assert company_client.handle_event({"type": "business-hours.updated", "company_id": 4}) == 1
+    with pytest.raises(ValueError):
+        company_client.handle_event({"type": "unknown.updated", "id": 1})
+
+
+def test_multi_get_fans_out_concurrently(company_upstream, monkeypatch):
+    import threading
+    import time
+
+    inflight, peak = [0], [0]
+    lock = threading.Lock()
+
+    def handler(request):
+        with lock:
+            inflight[0] += 1
+            peak[0] = max(peak[0], inflight[0])
+        time.sleep(0.05)
+        with lock:
+            inflight[0] -= 1
+        lid = int(request.url.path.rsplit("/", 1)[1])
+        return httpx.Response(404) if lid == 13 else httpx.Response(200, json={"id": lid})
+
+    monkeypatch.setattr(company_client, "httpx", SimpleNamespace(
+        Client=lambda **kw: httpx.Client(transport=httpx.MockTransport(handler),
+                                         **{k: v for k, v in kw.items() if k != "event_hooks"}),
+        Timeout=httpx.Timeout))
+    c = company_client.CompanyServiceClient()
+    started = time.monotonic()
+    found = c.get_locations([10, 11, 12, 13, 14, 15])
+    assert time.monotonic() - started < 0.25  # not six sequential round trips
+    assert 1 < peak[0] <= company_client.COMPANY_FANOUT_CONCURRENCY
+    assert found[13] is None and found[12] == {"id": 12}
+    assert c.missing_locations([12, 13]) == [13]  # from the cache
+
+
+def test_multi_get_uses_batch_endpoint(company_upstream, monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.url.params.get("ids")))
+        return httpx.Response(200, json=[{"id": 1, "companyName": "A"}, {"id": 3, "companyName": "C"}])
+
+    monkeypatch.setattr(company_client, "COMPANY_BATCH_COMPANIES_PATH", "/companies/batch")
+    monkeypatch.setattr(company_client, "httpx", SimpleNamespace(
+        Client=lambda **kw: httpx.Client(transport=httpx.MockTransport(handler),
+                                         **{k: v for k, v in kw.items() if k != "event_hooks"}),
+        Timeout=httpx.Timeout))
+    c = company_client.CompanyServiceClient()
+    out = c.get_companies([3, 1, 2, 3])
+    assert out == {1: {"id": 1, "companyName": "A"}, 2: None, 3: {"id": 3, "companyName": "C"}}
+    assert seen == [("/api/companies/batch", "1,2,3")]
+    assert c.get_company(2) is None and len(seen) == 1  # negative entry cached
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    from app.services.cache import SQLiteCache
+
+    path = str(tmp_path / "cache" / "company-cache.sqlite")
+    a, b = SQLiteCache(path, ttl=60), SQLiteCache(path, ttl=60)  # as two workers would open it
+    assert (tmp_path / "cache").stat().st_mode & 0o777 == 0o700
+    a.set(("company", 1), {"id": 1}, tags=[("company", 1)])
+    a.set(("context", 7, 1, 12), {"employeeId": 7}, tags=[("company", 1), ("location", 12)])
+    a.set(("location", 12), None, ttl=-1)  # already expired
+    assert b.get(("company", 1)) == {"id": 1}
+    assert b.get(("context", 7, 1, 12)) == {"employeeId": 7}
+    with pytest.raises(TypeError):
+        a.set(("company", 2), object())  # JSON only, nothing is pickled
+    assert b.get(("location", 12), "miss") == "miss"
+    assert len(b) == 2
+
+    assert b.invalidate_tag(("company", 1)) == 2
+    assert a.get(("company", 1)) is None and len(a) == 0
+
+    small = SQLiteCache(path, ttl=60, maxsize=2)
+    for i in range(5):
+        small.set(("company", i), i, ttl=60 + i)
+    small.prune()
+    assert [small.get(("company", i)) for i in range(5)] == [None, None, None, 3, 4]
+
+
+def test_warmup_prefetches_referenced_company_data(client, company_upstream, employee_payload):
+    from app.services import warmup
+
+    for company_id, location_id in ((94, 9401), (94, 9402), (95, None)):
+        client.post("/employees/", json=employee_payload(company_id=company_id, location_id=location_id))
+    companies, locations = warmup.referenced_ids()
+    assert companies.index(94) < companies.index(95) and {9401, 9402} <= set(locations)
+
+    covered = warmup.warm()
+    assert covered == {"companies": len(companies), "locations": len(locations)}
+    for path in ("/companies/94", "/locations/9401", "/services/company/95", "/business-hours/company/94"):
+        assert path in company_upstream
+    before = len(company_upstream)
+    c = company_client.CompanyServiceClient()
+    c.get_company(95), c.get_location(9402), c.get_services_for_company(94)
+    assert len(company_upstream) == before  # all served from the cache
+
+
+def test_sqlite_cache_refuses_shared_directory(tmp_path):
+    import os
+    from app.services.cache import SQLiteCache
+
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    with pytest.raises(PermissionError):
+        SQLiteCache(str(shared / "company-cache.sqlite"), ttl=60)
+
+
+def test_failing_shared_cache_falls_through_to_upstream(company_upstream, monkeypatch):
+    import sqlite3
+
+    class LockedCache:
+        def get(self, *a, **kw):
+            raise sqlite3.OperationalError("database is locked")
+        set = get
+
+        def clear(self):
+            pass
+
+    monkeypatch.setattr(company_client, "cache", LockedCache())
+    c = company_client.CompanyServiceClient()
+    assert c.get_location(12)["street"] == "Trg Leona"
+    assert c.get_locations([12, 13]) == {12: {"id": 12, "street": "Trg Leona", "number": "3"},
+                                         13: {"id": 12, "street": "Trg Leona", "number": "3"}}
+    assert company_client.CACHE_ERRORS.value(("get",)) >= 3
@@ -0,0 +1,76 @@
+# tests/test_compression.py
+import asyncio
+import gzip
+
+import pytest
+
+from app import compression
+from app.main import app
+
+
+def test_choose_encoding():
+    assert compression.choose_encoding("gzip") == "gzip"
+    assert compression.choose_encoding("gzip;q=0, identity") is None
+    assert compression.choose_encoding("deflate") is None
+    if compression.brotli is not None:
+        assert compression.choose_encoding("gzip, br") == "br"
+        assert compression.choose_encoding("br;q=0.5, gzip") == "gzip"
+
+
+def test_large_listing_is_gzipped(client, employee_payload):
+    for i in range(30):
+        client.post("/employees/", json=employee_payload(first_name=f"Zip{i}"))
+    r = client.get("/employees/", params={"limit": 1000}, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in r.headers["vary"].lower()
+    assert len(r.json()) >= 30  # httpx decodes transparently
+
+    small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_offered(client):
+    r = client.get("/employees/", params={"limit": 1000}, headers={"Accept-Encoding": "br, gzip"})
+    assert r.headers["content-encoding"] == "br"
+
+
+def test_compress_round_trip():
+    body = b'{"x": 1}' * 1000
+    assert gzip.decompress(compression.compress(body, "gzip")) == body
+
+
+def test_event_stream_headers_are_sent_at_once_and_not_encoded():
+    async def scenario():
+        requested = False
+        started = asyncio.Event()
+        messages = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Event().wait()  # the client stays connected
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.start":
+                started.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/changes/stream", "raw_path": b"/changes/stream", "root_path": "",
+            "query_string": b"since=999999999", "headers": [(b"host", b"test"), (b"accept-encoding", b"gzip")],
+            "client": ("test", 1), "server": ("test", 80),
+        }
+        task = asyncio.create_task(app(scope, receive, send))
+        try:
+            await asyncio.wait_for(started.wait(), 2.0)  # no event or heartbeat is due yet
+        finally:
+            task.cancel()
+        return dict(messages[0]["headers"])
+
+    headers = asyncio.run(scenario())
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    assert b"content-encoding" not in headers
@@ -0,0 +1,96 @@
+# tests/test_coverage.py
+from datetime import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import coverage  # noqa: E402
+
+
+def _slot(day, start, end, location_id=None):
+    return SimpleNamespace(day_of_week=day, time_from=start, time_to=end, location_id=location_id)
+
+
+def test_encode_sets_only_fully_covered_buckets():
+    enc = coverage.encode([_slot(1, time(9, 2), time(9, 20)), _slot(0, time(23, 0), time(23, 59), 4)])
+    assert set(enc) == {None, 4}
+    grid = coverage.counts([(None, enc)])
+    assert grid.shape == (7, coverage.BUCKETS_PER_DAY)
+    assert np.flatnonzero(grid[0]).tolist() == [109, 110, 111]  # 09:05 .. 09:20
+    assert np.flatnonzero(grid[6]).tolist() == list(range(276, 287))  # Sunday 23:00 .. 23:55
+
+
+def test_counts_filters_by_location_and_downsamples():
+    weeks = [
+        (7, coverage.encode([_slot(1, time(9), time(12))])),  # home location 7
+        (8, coverage.encode([_slot(1, time(10), time(11), 7), _slot(1, time(11), time(12))])),
+    ]
+    hourly = coverage.counts(weeks, location_id=7, resolution=60)
+    assert hourly[0, 9:12].tolist() == [1, 2, 1]
+    assert coverage.windows(hourly, 2, 60) == [{"day": 1, "minute_from": 600, "minute_to": 660, "count": 2}]
+    assert coverage.counts(weeks, resolution=60)[0, 9:12].tolist() == [1, 2, 2]
+    assert coverage.counts([], resolution=60).sum() == 0
+
+
+def _scalar_counts(team, location_id, resolution):
+    """Reference: per bucket, employees with one (location-matching) slot covering all of it."""
+    out = [[0] * (24 * 60 // resolution) for _ in range(7)]
+    for home, slots in team:
+        for day in range(7):
+            for b in range(24 * 60 // resolution):
+                def covered(m):
+                    return any(
+                        (s.day_of_week % 7 or 7) - 1 == day
+                        and s.time_from.hour * 60 + s.time_from.minute <= m
+                        and s.time_to.hour * 60 + s.time_to.minute >= m + coverage.BUCKET_MINUTES
+                        and (location_id is None or s.location_id == location_id
+                             or (s.location_id is None and home == location_id))
+                        for s in slots
+                    )
+                minutes = range(b * resolution, (b + 1) * resolution, coverage.BUCKET_MINUTES)
+                out[day][b] += all(covered(m) for m in minutes)
+    return out
+
+
+def test_counts_match_scalar_computation_on_overlapping_slots():
+    rng = np.random.default_rng(40)
+    team = []
+    for _ in range(12):
+        slots = []
+        for _ in range(rng.integers(1, 6)):
+            start = int(rng.integers(0, 24 * 12 - 1)) * 5
+            end = min(start + int(rng.integers(1, 48)) * 5, 23 * 60 + 55)
+            slots.append(_slot(int(rng.integers(0, 8)), time(start // 60, start % 60), time(end // 60, end % 60),
+                               [None, 1, 2][int(rng.integers(0, 3))]))
+        # overlapping slot at another location on the same day
+        s = slots[0]
+        slots.append(_slot(s.day_of_week, s.time_from, time(min(s.time_to.hour + 1, 23), 30), 2))
+        team.append((int(rng.integers(1, 3)), slots))
+    weeks = [(home, coverage.encode(slots)) for home, slots in team]
+    for location_id in (None, 1, 2, 3):
+        for resolution in (5, 30, 60):
+            assert coverage.counts(weeks, location_id, resolution).tolist() == \
+                _scalar_counts(team, location_id, resolution), (location_id, resolution)
+
+
+def test_coverage_endpoint_and_invalidation(client, employee_payload):
+    a = client.post("/employees/", json=employee_payload(company_id=90, location_id=9001)).json()["id"]
+    b = client.post("/employees/", json=employee_payload(company_id=90, location_id=9002)).json()["id"]
+    client.post(f"/employees/{a}/availability/", json=[
+        {"day_of_week": 2, "time_from": "09:00:00", "time_to": "12:00:00"}])
+    created = client.post(f"/employees/{b}/availability/", json=[
+        {"day_of_week": 2, "time_from": "10:00:00", "time_to": "13:00:00", "location_id": 9001}]).json()
+
+    params = {"company_id": 90, "location_id": 9001, "min_count": 2, "resolution": 60}
+    body = client.get("/employees/coverage", params=params).json()
+    assert body["employees"] == 2
+    assert body["counts"][1][9:13] == [1, 2, 2, 1]
+    assert body["windows"] == [{"day": 2, "minute_from": 600, "minute_to": 720, "count": 2}]
+
+    client.delete(f"/employees/{b}/availability/{created[0]['id']}")
+    body = client.get("/employees/coverage", params=params).json()
+    assert body["windows"] == []
+
+    assert client.get("/employees/coverage", params={"resolution": 7}).status_code == 422
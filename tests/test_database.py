@@ -0,0 +1,86 @@
+# tests/test_database.py
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import crud, database, models
+from app.database import Base
+
+
+def test_pool_stats(client):
+    r = client.get("/health/pool")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["config"]["pool_size"] == database.DB_POOL_SIZE
+    assert body["status"]["pool"]
+    assert set(body["counters"]) == {"timeouts", "validation_failures"}
+
+
+def test_engine_kwargs_only_size_queue_pools():
+    assert "pool_size" not in database._engine_kwargs("sqlite:///:memory:")
+    kw = database._engine_kwargs("mysql+pymysql://u:p@db/x")
+    assert kw["pool_size"] == database.DB_POOL_SIZE
+    assert kw["pool_recycle"] == database.DB_POOL_RECYCLE
+
+
+def test_pool_timeout_maps_to_503(client, monkeypatch):
+    def exhausted(db, employee_id):
+        raise PoolTimeoutError("QueuePool limit of size 5 overflow 10 reached")
+    monkeypatch.setattr(crud, "get_employee", exhausted)
+
+    before = database.pool_counters()["timeouts"]
+    r = client.get("/employees/1")
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    assert database.pool_counters()["timeouts"] == before + 1
+
+
+def test_validate_pool_disposes_on_failure(monkeypatch):
+    disposed = []
+
+    class DeadEngine:
+        def connect(self):
+            raise OSError("connection refused")
+
+        def dispose(self):
+            disposed.append(True)
+
+    before = database.pool_counters()["validation_failures"]
+    assert database.validate_pool(DeadEngine()) is False
+    assert disposed == [True]
+    assert database.pool_counters()["validation_failures"] == before + 1
+
+
+@pytest.fixture
+def replica(monkeypatch, tmp_path):
+    r = database.Replica(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=r.engine)
+    with r.SessionLocal() as s:
+        s.add(models.Employee(id=9001, first_name="Rita", last_name="Replica", gender=False,
+                              birth_date=datetime(1990, 1, 1), active=True))
+        s.commit()
+    monkeypatch.setattr(database, "replicas", [r])
+    yield r
+    r.engine.dispose()
+
+
+def test_reads_go_to_replica(client, replica):
+    # only the replica knows employee 9001
+    assert client.get("/employees/9001").status_code == 200
+    assert client.get("/employees/9001/skills/").status_code == 200
+
+
+def test_strong_consistency_and_recent_writes_use_primary(client, replica):
+    assert client.get("/employees/9001", headers={"X-Consistency": "strong"}).status_code == 404
+    marker = str(int(time.time() * 1000))
+    assert client.get("/employees/9001", headers={"X-Last-Write": marker}).status_code == 404
+    stale = str(int((time.time() - 60) * 1000))
+    assert client.get("/employees/9001", headers={"X-Last-Write": stale}).status_code == 200
+
+
+def test_unhealthy_replica_is_skipped(client, replica):
+    database.mark_replica_down(replica)
+    assert database.pick_replica() is None
+    assert client.get("/employees/9001").status_code == 404
@@ -0,0 +1,56 @@
+# tests/test_deadline.py
+import time
+
+import httpx
+import pytest
+
+from app import crud
+from app.request_context import DeadlineExceeded, remaining, set_deadline
+from app.services import resilience
+
+
+@pytest.fixture
+def no_deadline():
+    yield
+    set_deadline(None)
+
+
+def test_exhausted_budget_returns_504_before_sql(client, monkeypatch, employee_payload):
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
+
+    original = crud.get_employee
+
+    def slow_get_employee(db, employee_id):
+        emp = original(db, employee_id)
+        time.sleep(0.05)  # burn the whole budget
+        return emp
+
+    monkeypatch.setattr(crud, "get_employee", slow_get_employee)
+    # the availability listing runs a second statement after the slow lookup
+    r = client.get(f"/employees/{emp_id}/availability/", headers={"X-Request-Timeout-Ms": "20"})
+    assert r.status_code == 504
+    assert r.json()["status"] == 504
+
+    r = client.get(f"/employees/{emp_id}/availability/")
+    assert r.status_code == 200
+
+
+def test_upstream_timeouts_shrink_to_remaining_budget(no_deadline):
+    seen = {}
+
+    def handler(request):
+        seen["timeout"] = request.extensions["timeout"]
+        seen["header"] = request.headers.get("X-Request-Timeout-Ms")
+        return httpx.Response(200, json={})
+
+    client = httpx.Client(transport=httpx.MockTransport(handler), timeout=2.0,
+                          event_hooks=resilience.deadline_hooks())
+    set_deadline(time.monotonic() + 0.5)
+    client.get("http://upstream.test/x")
+    assert all(v <= 0.5 for v in seen["timeout"].values())
+    assert 0 < int(seen["header"]) <= 500
+
+    set_deadline(time.monotonic() - 1)
+    assert remaining() < 0
+    with pytest.raises(DeadlineExceeded):
+        resilience.call("deadline-test", "x", lambda: client.get("http://upstream.test/x"))
@@ -6,15 +6,16 @@ def test_health(client):
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
 
-def test_create_read_update_delete_employee(client):
+def test_ready(client):
+    r = client.get("/ready")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["status"] == "ready"
+    assert body["checks"]["database"]["ok"] is True
+
+def test_create_read_update_delete_employee(client, employee_payload):
     # CREATE
-    payload = {
-        "first_name": "John",
-        "last_name": "Doe",
-        "gender": True,
-        "birth_date": "1990-01-01"
-    }
-    r = client.post("/employees/", json=payload)
+    r = client.post("/employees/", json=employee_payload(first_name="John", last_name="Doe"))
     assert r.status_code == 201
     emp = r.json()
     assert emp["first_name"] == "John"
@@ -30,15 +31,8 @@ def test_create_read_update_delete_employee(client):
     assert r.status_code == 200 and r.json()["id"] == emp_id
 
     # UPDATE
-    upd = {
-        "first_name": "Jane",
-        "last_name": "Doe",
-        "gender": False,
-        "birth_date": "1992-02-02",
-        "idp_id": None,
-        "id_picture": None,
-        "active": True
-    }
+    upd = employee_payload(first_name="Jane", last_name="Doe", gender=False, birth_date="1992-02-02",
+                           idp_id=None, id_picture=None, active=True)
     r = client.put(f"/employees/{emp_id}", json=upd)
     assert r.status_code == 200
     assert r.json()["first_name"] == "Jane"
@@ -55,22 +49,79 @@ def test_create_read_update_delete_employee(client):
 # stub out the inter-service call
 @pytest.fixture(autouse=True)
 def fake_reservation(monkeypatch):
-    async def fake_get(self, employee_id):
+    async def fake_get(self, employee_id, date_from=None, date_to=None):
         return [{"id": 1, "employee_id": employee_id, "date": "2025-01-01", "time_from": "09:00:00", "time_to": "10:00:00"}]
     from app.services.reservation_client import ReservationServiceClient
     monkeypatch.setattr(ReservationServiceClient, "get_reservations_for_employee", fake_get)
 
-def test_get_reservations(client):
+def test_get_reservations(client, employee_payload):
     # create an employee
-    payload = {
-        "first_name": "Tom",
-        "last_name": "Thumb",
-        "gender": True,
-        "birth_date": "1991-01-01"
-    }
-    emp_id = client.post("/employees/", json=payload).json()["id"]
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
 
     r = client.get(f"/employees/{emp_id}/reservations")
     assert r.status_code == 200
     data = r.json()
     assert data and data[0]["employee_id"] == emp_id
+
+def test_get_reservations_batch(client, employee_payload):
+    a = client.post("/employees/", json=employee_payload()).json()["id"]
+    b = client.post("/employees/", json=employee_payload()).json()["id"]
+
+    r = client.get("/employees/reservations", params=[("employee_id", a), ("employee_id", b), ("employee_id", 999999)])
+    assert r.status_code == 200
+    data = r.json()
+    assert [d["employee_id"] for d in data] == [a, b]
+    assert all(d["reservations"][0]["employee_id"] == d["employee_id"] and d["error"] is None for d in data)
+
+def test_reservations_batch_without_reservation_service(client, monkeypatch, employee_payload):
+    monkeypatch.delenv("RESERVATION_SERVICE_URL", raising=False)
+    monkeypatch.delenv("COMPANY_SERVICE_URL", raising=False)
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
+
+    r = client.get("/employees/reservations", params={"employee_id": emp_id})
+    assert r.status_code == 502
+    assert r.json()["status"] == 502 and "not configured" in r.json()["title"]
+
+def test_free_slots(client, employee_payload):
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
+    # 2025-01-01 is a Wednesday; the fake reservation blocks 09:00-10:00
+    client.post(f"/employees/{emp_id}/availability/",
+                json=[{"day_of_week": 3, "time_from": "09:00:00", "time_to": "12:00:00", "location_id": 3}])
+    params = {"employee_id": emp_id, "from": "2025-01-01", "to": "2025-01-07", "duration": 60}
+
+    r = client.get("/employees/free-slots", params=params)
+    assert r.status_code == 200
+    [entry] = r.json()
+    assert [(s["date"], s["time_from"]) for s in entry["slots"]] == [("2025-01-01", "10:00:00"), ("2025-01-01", "11:00:00")]
+
+    # availability writes evict the cached result
+    client.post(f"/employees/{emp_id}/availability/",
+                json=[{"day_of_week": 3, "time_from": "13:00:00", "time_to": "14:00:00", "location_id": 3}])
+    r = client.get("/employees/free-slots", params=params)
+    assert len(r.json()[0]["slots"]) == 3
+
+    r = client.get("/employees/free-slots", params={"employee_id": emp_id, "from": "2025-01-01", "to": "2025-03-01"})
+    assert r.status_code == 422
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_patch_employee(client, monkeypatch, employee_payload, returning):
+    from app import database
+    dialect = database.engine.dialect
+    monkeypatch.setattr(dialect, "insert_returning", returning and dialect.insert_returning)
+    monkeypatch.setattr(dialect, "update_returning", returning and dialect.update_returning)
+
+    created = client.post("/employees/", json=employee_payload(first_name="Pat", location_id=1)).json()
+    assert created["active"] is True and created["skills"] == []
+    emp_id = created["id"]
+
+    r = client.patch(f"/employees/{emp_id}", json={"last_name": "Patched", "location_id": 2})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["first_name"], body["last_name"], body["location_id"]) == ("Pat", "Patched", 2)
+    assert client.get(f"/employees/{emp_id}").json()["last_name"] == "Patched"
+
+    assert client.patch(f"/employees/{emp_id}", json={"first_name": None}).status_code == 422
+    assert client.patch("/employees/999999", json={"last_name": "X"}).status_code == 404
+    assert client.delete(f"/employees/{emp_id}").status_code == 204
+    assert client.delete(f"/employees/{emp_id}").status_code == 204  # already inactive
+    assert client.delete("/employees/999999").status_code == 404
@@ -0,0 +1,59 @@
+# tests/test_idempotency.py
+from datetime import timedelta
+
+from app import idempotency, models
+from app.database import SessionLocal
+
+
+def test_retry_replays_stored_response(client, employee_payload, row_count):
+    headers = {"Idempotency-Key": "create-once-1"}
+    first = client.post("/employees/", json=employee_payload(first_name="Once"), headers=headers)
+    assert first.status_code == 201
+    assert "idempotent-replayed" not in first.headers
+
+    retry = client.post("/employees/", json=employee_payload(first_name="Once"), headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert row_count("employee", first_name="Once") == 1
+
+    # writes without a key are unaffected
+    client.post("/employees/", json=employee_payload(first_name="Once"))
+    assert row_count("employee", first_name="Once") == 2
+
+
+def test_key_reused_for_other_request_is_rejected(client, employee_payload, row_count):
+    headers = {"Idempotency-Key": "create-once-2"}
+    assert client.post("/employees/", json=employee_payload(first_name="Twice"), headers=headers).status_code == 201
+    r = client.post("/employees/", json=employee_payload(first_name="Other"), headers=headers)
+    assert r.status_code == 422
+    assert row_count("employee", first_name="Other") == 0
+
+
+def test_running_attempt_conflicts_and_4xx_is_replayed(client, employee_payload):
+    h = {"Idempotency-Key": "busy-key"}
+    client.post("/employees/", json=employee_payload(), headers=h)
+    db = SessionLocal()
+    try:  # pretend the first attempt is still running
+        db.get(models.IdempotencyKey, "busy-key").status_code = None
+        db.commit()
+    finally:
+        db.close()
+    r = client.post("/employees/", json=employee_payload(), headers=h)
+    assert r.status_code == 409 and r.headers["retry-after"] == "1"
+    idempotency.release("busy-key")
+
+    h = {"Idempotency-Key": "missing-emp"}
+    assert client.put("/employees/999999", json=employee_payload(active=True), headers=h).status_code == 404
+    assert client.put("/employees/999999", json=employee_payload(active=True), headers=h).headers["idempotent-replayed"] == "true"
+
+
+def test_prune_drops_expired_keys(client, employee_payload):
+    client.post("/employees/", json=employee_payload(), headers={"Idempotency-Key": "old-key"})
+    assert idempotency.prune(timedelta(hours=1)) == 0
+    assert idempotency.prune(timedelta(seconds=-1)) >= 1
+    db = SessionLocal()
+    try:
+        assert db.get(models.IdempotencyKey, "old-key") is None
+    finally:
+        db.close()
@@ -0,0 +1,48 @@
+# tests/test_metrics.py
+import pytest
+
+from app import instrumentation, metrics
+
+
+def test_metrics_exposes_route_templates(client, employee_payload):
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
+    assert client.get(f"/employees/{emp_id}").status_code == 200
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    # path template, not the concrete id
+    assert 'route="/employees/{employee_id}"' in body
+    assert f'route="/employees/{emp_id}"' not in body
+    assert "http_requests_in_flight" in body
+
+
+def test_track_upstream_counts_errors():
+    labels = ("test-upstream", "boom", "error")
+    before = metrics.UPSTREAM_DURATION.count(labels)
+    with pytest.raises(ValueError):
+        with metrics.track_upstream("test-upstream", "boom"):
+            raise ValueError("upstream failed")
+    assert metrics.UPSTREAM_DURATION.count(labels) == before + 1
+    assert metrics.UPSTREAM_ERRORS.value(("test-upstream", "boom", "ValueError")) >= 1
+
+
+def test_server_timing_header_counts_queries(client, employee_payload):
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
+    r = client.get(f"/employees/{emp_id}")
+    assert r.status_code == 200
+    timing = r.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert "upstream;dur=" in timing and "total;dur=" in timing
+    queries = int(timing.split('desc="')[1].split(" ")[0])
+    assert queries >= 1
+
+
+def test_n_plus_one_is_flagged(client, employee_payload):
+    ids = [client.post("/employees/", json=employee_payload(first_name=f"N{i}")).json()["id"] for i in range(6)]
+    assert ids
+    before = instrumentation.N_PLUS_ONE.value(("/employees/",))
+    # list serialization lazy-loads availability/skills per row
+    assert client.get("/employees/?limit=1000").status_code == 200
+    assert instrumentation.N_PLUS_ONE.value(("/employees/",)) == before + 1
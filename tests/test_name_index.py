@@ -0,0 +1,48 @@
+# tests/test_name_index.py
+from app import name_index
+
+
+def test_prefix_ranking_fuzzy_and_scope():
+    idx = name_index.NameIndex()
+    idx.set_employee(1, first_name="Ana", last_name="Novak", company_id=1, active=True)
+    idx.set_employee(2, first_name="Anamarija", last_name="Horvat", company_id=1, active=True)
+    idx.set_employee(3, first_name="Marko", last_name="Anić", company_id=2, active=True)
+    idx.set_employee(4, first_name="Ana", last_name="Kos", company_id=2, active=False)
+
+    assert idx.search("an") == [1, 2, 3]         # first-name prefixes (shorter name first), last name
+    assert idx.search("ana") == [1, 2]           # whole first name before prefix
+    assert idx.search("ANA nov") == [1]
+    assert idx.search("anic") == [3]             # accent-insensitive
+    assert idx.search("an", company_id=2) == [3]
+    assert idx.search("ana", limit=1) == [1]
+    assert idx.search("novka") == [1]            # fuzzy: typo
+    assert idx.search("zz") == []
+
+    idx.set_employee(1, last_name="Zupan")
+    assert idx.search("nov") == [] and idx.search("zup") == [1]
+    idx.set_employee(2, active=False)
+    idx.set_employee(4, active=True)
+    assert idx.search("ana") == [4, 1]
+
+
+def test_search_endpoint_and_index_follows_writes(client, monkeypatch, employee_payload):
+    a = client.post("/employees/", json=employee_payload(first_name="Autocomplete", last_name="Šimić", company_id=70)).json()["id"]
+    b = client.post("/employees/", json=employee_payload(first_name="Autocompleta", last_name="Petek", company_id=71)).json()["id"]
+
+    r = client.get("/employees/search", params={"q": "autocomplet"})
+    assert r.json()["source"] == "database"
+    assert [h["id"] for h in r.json()["results"]] == [b, a]  # ordered by last name
+
+    idx = name_index.build()
+    monkeypatch.setattr(name_index, "_index", idx)
+    r = client.get("/employees/search", params={"q": "autocomplete simic"})
+    assert r.json() == {"results": [{"id": a, "first_name": "Autocomplete", "last_name": "Šimić",
+                                     "company_id": 70}], "source": "index"}
+
+    client.patch(f"/employees/{a}", json={"last_name": "Kranjc"})
+    client.delete(f"/employees/{b}")
+    assert name_index.refresh(idx) > 0
+    ids = [h["id"] for h in client.get("/employees/search", params={"q": "autocomplet kra"}).json()["results"]]
+    assert ids == [a]
+    assert client.get("/employees/search", params={"q": "autocompleta petek"}).json()["results"] == []
+    assert client.get("/employees/search").status_code == 422
@@ -0,0 +1,30 @@
+import asyncio
+from datetime import date
+
+import httpx
+
+from app.services import reservation_client
+
+def test_reservation_client_filters_and_caches(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(dict(request.url.params))
+        return httpx.Response(200, json=[
+            {"id": 1, "employee_id": 5, "date": "2025-01-01", "time_from": "09:00:00", "time_to": "10:00:00"},
+            {"id": 2, "employee_id": 5, "date": "2025-02-01", "time_from": "09:00:00", "time_to": "10:00:00"},
+        ])
+
+    async def run():
+        http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(reservation_client, "_client", lambda: http)
+        c = reservation_client.ReservationServiceClient()
+        first = await c.get_reservations_for_employee(5, date_from=date(2025, 1, 15), date_to=date(2025, 2, 28))
+        second = await c.get_reservations_for_employee(5, date_from=date(2025, 1, 15), date_to=date(2025, 2, 28))
+        await http.aclose()
+        return first, second
+
+    monkeypatch.setattr(reservation_client, "_cache", reservation_client.TTLCache(ttl=60))
+    first, second = asyncio.run(run())
+    assert [x["id"] for x in first] == [2] and second == first
+    assert seen == [{"employee_id": "5", "from": "2025-01-15", "to": "2025-02-28"}]
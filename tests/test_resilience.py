@@ -0,0 +1,75 @@
+# tests/test_resilience.py
+import httpx
+import pytest
+
+from app.services import resilience
+from app.services.company_client import CompanyServiceClient
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_budgets", {})
+    monkeypatch.setattr(resilience, "UPSTREAM_RETRY_BACKOFF", 0.0)
+
+
+def _company_client(monkeypatch, handler) -> CompanyServiceClient:
+    monkeypatch.setenv("COMPANY_SERVICE_URL", "http://company.test/api")
+    monkeypatch.setenv("COMPANY_VALIDATION_ENABLED", "true")
+    c = CompanyServiceClient()
+    c._client = httpx.Client(base_url=c.base_url, transport=httpx.MockTransport(handler))
+    return c
+
+
+def test_breaker_opens_and_fails_fast(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+
+    c = _company_client(monkeypatch, handler)
+    for _ in range(resilience.BREAKER_FAILURE_THRESHOLD):
+        assert c.get_company(1) is None
+    assert resilience.breaker("company", "companies").state == resilience.OPEN
+
+    seen = len(calls)
+    assert c.get_company(1) is None  # fail-open without touching the upstream
+    assert len(calls) == seen
+    # other endpoint families keep their own breaker
+    assert resilience.breaker("company", "locations").state == resilience.CLOSED
+
+
+def test_half_open_probe_closes_breaker(monkeypatch):
+    b = resilience.CircuitBreaker(failure_threshold=1, reset_timeout=0.0, half_open_probes=1)
+    b.record_failure()
+    assert b.state == resilience.OPEN
+    assert b.allow() is True          # the single probe
+    assert b.state == resilience.HALF_OPEN
+    assert b.allow() is False         # further calls wait for the probe
+    b.record_success()
+    assert b.state == resilience.CLOSED
+
+
+def test_retries_are_bounded_by_budget():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        raise httpx.ConnectError("refused")
+
+    rb = resilience.budget("flaky")
+    rb._tokens = 1.0
+    rb.min_per_sec = 0.0
+    rb.ratio = 0.0
+    with pytest.raises(httpx.ConnectError):
+        resilience.call("flaky", "x", flaky, retries=3)
+    # one original attempt + the single retry the budget allowed
+    assert len(attempts) == 2
+
+
+def test_4xx_is_not_a_failure(monkeypatch):
+    c = _company_client(monkeypatch, lambda request: httpx.Response(404))
+    for _ in range(resilience.BREAKER_FAILURE_THRESHOLD + 1):
+        assert c.get_location(5) is None
+    assert resilience.breaker("company", "locations").state == resilience.CLOSED
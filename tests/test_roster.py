@@ -0,0 +1,82 @@
+# tests/test_roster.py
+from datetime import time
+
+import pytest
+
+from app import crud, database, roster
+
+
+QUERIES = [
+    {"service_id": 701},
+    {"service_id": 702, "company_id": 70},
+    {"location_id": 7001},
+    {"location_id": 7002},
+    {"day": 1, "time_from": time(9), "time_to": time(12)},
+    {"day": 1, "time_from": time(9), "time_to": time(12), "location_id": 7001},
+    {"day": 7, "location_id": 7002},
+    {"company_id": 70, "day": 3},
+]
+
+
+def _agree(snap):
+    db = database.SessionLocal()
+    try:
+        for q in QUERIES:
+            minutes = {k.replace("time", "minute"): v.hour * 60 + v.minute for k, v in q.items() if "time" in k}
+            plain = {k: v for k, v in q.items() if "time" not in k}
+            assert snap.match(**plain, **minutes, limit=1000) == crud.match_employee_ids(db, **q, limit=1000), q
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def roster_data(client, employee_payload):
+    a = client.post("/employees/", json=employee_payload(company_id=70, location_id=7001)).json()["id"]
+    b = client.post("/employees/", json=employee_payload(company_id=70, location_id=7002)).json()["id"]
+    c = client.post("/employees/", json=employee_payload(company_id=71)).json()["id"]
+    client.put(f"/employees/{a}/skills/", json=[701, 702])
+    client.put(f"/employees/{b}/skills/", json=[702])
+    client.put(f"/employees/{c}/skills/", json=[701])
+    client.post(f"/employees/{a}/availability/", json=[
+        {"day_of_week": 1, "time_from": "08:00:00", "time_to": "13:00:00"},
+        {"day_of_week": 3, "time_from": "08:00:00", "time_to": "13:00:00", "location_id": 7002},
+    ])
+    client.post(f"/employees/{c}/availability/", json=[
+        {"day_of_week": 1, "time_from": "09:00:00", "time_to": "12:00:00", "location_id": 7001},
+        {"day_of_week": 0, "time_from": "10:00:00", "time_to": "11:00:00", "location_id": 7002},
+    ])
+    return a, b, c
+
+
+def test_snapshot_matches_database(client, roster_data):
+    a, b, c = roster_data
+    snap = roster.build()
+    _agree(snap)
+    assert snap.match(service_id=701, limit=1000)[-2:] == [a, c]
+    assert snap.match(day=1, minute_from=540, minute_to=720, location_id=7001, limit=1000)[-2:] == [a, c]
+
+
+def test_snapshot_follows_the_change_sequence(client, roster_data, employee_payload):
+    a, b, c = roster_data
+    snap = roster.build()
+    client.put(f"/employees/{b}", json=employee_payload(company_id=70, location_id=7001, active=True))
+    client.put(f"/employees/{a}/skills/", json=[703])
+    client.delete(f"/employees/{c}")
+    d = client.post("/employees/", json=employee_payload(company_id=70, location_id=7002)).json()["id"]
+    client.put(f"/employees/{d}/skills/", json=[701])
+
+    assert roster.refresh(snap) > 0
+    _agree(snap)
+    assert d in snap.match(service_id=701, limit=1000)
+    assert a not in snap.match(service_id=701, limit=1000)
+    assert c not in snap.match(company_id=71, limit=1000)
+
+
+def test_match_endpoint_uses_snapshot_when_loaded(client, roster_data, monkeypatch):
+    a, _, _ = roster_data
+    r = client.get("/employees/match", params={"service_id": 702, "company_id": 70})
+    assert r.json()["source"] == "database" and a in r.json()["employee_ids"]
+
+    monkeypatch.setattr(roster, "_snapshot", roster.build())
+    r = client.get("/employees/match", params={"service_id": 702, "company_id": 70})
+    assert r.json()["source"] == "snapshot" and a in r.json()["employee_ids"]
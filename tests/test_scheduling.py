@@ -0,0 +1,37 @@
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+from app.services import scheduling
+
+
+def _dt(h, m=0, day=6):
+    return datetime(2025, 1, day, h, m)
+
+
+def test_merge_coalesces_overlapping_and_touching():
+    merged = scheduling.merge([(_dt(10), _dt(11)), (_dt(9), _dt(10)), (_dt(10, 30), _dt(12)), (_dt(14), _dt(15))])
+    assert merged == [(_dt(9), _dt(12)), (_dt(14), _dt(15))]
+
+
+def test_subtract_sweeps_busy_intervals():
+    available = [(_dt(9), _dt(12), 1), (_dt(13), _dt(17), 2)]
+    busy = [(_dt(8), _dt(9, 30)), (_dt(11), _dt(13, 30)), (_dt(15), _dt(16))]
+    assert scheduling.subtract(available, busy) == [
+        (_dt(9, 30), _dt(11), 1), (_dt(13, 30), _dt(15), 2), (_dt(16), _dt(17), 2),
+    ]
+
+
+def test_free_slots_expands_weekdays_and_cuts_by_duration():
+    # day 1 = Monday (2025-01-06), day 0 is accepted as Sunday (2025-01-12)
+    slots = [
+        SimpleNamespace(day_of_week=1, time_from=time(9), time_to=time(11), location_id=3),
+        SimpleNamespace(day_of_week=0, time_from=time(10), time_to=time(11), location_id=None),
+    ]
+    reservations = [{"date": "2025-01-06", "time_from": "09:30:00", "time_to": "10:00:00"}]
+    out = scheduling.free_slots(slots, reservations, date(2025, 1, 6), date(2025, 1, 12),
+                                timedelta(minutes=30), timedelta(minutes=15))
+    assert [(str(s["date"]), str(s["time_from"])) for s in out] == [
+        ("2025-01-06", "09:00:00"), ("2025-01-06", "10:00:00"), ("2025-01-06", "10:15:00"),
+        ("2025-01-06", "10:30:00"), ("2025-01-12", "10:00:00"), ("2025-01-12", "10:15:00"),
+        ("2025-01-12", "10:30:00"),
+    ]
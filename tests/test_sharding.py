@@ -0,0 +1,73 @@
+# tests/test_sharding.py
+import os
+import tempfile
+
+import pytest
+
+from app import database, main, name_index, sharding
+from app.database import Base
+from app.dependencies import get_db
+from app.main import app
+
+
+@pytest.fixture
+def shards(client, monkeypatch):
+    tmp = tempfile.mkdtemp(prefix="shards_")
+    urls = {name: f"sqlite:///{os.path.join(tmp, name + '.db')}" for name in ("a", "b")}
+    database.configure_shards(urls, {501: "a", 502: "b"}, default="a")
+    for shard in database.shards.values():
+        Base.metadata.create_all(bind=shard.engine)
+    # route through the real dependency instead of the single-session test override
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    yield database.shards
+    database.configure_shards({})
+
+
+def test_rows_live_on_the_company_shard(client, shards, employee_payload, row_count):
+    a = client.post("/employees/", json=employee_payload(company_id=501)).json()["id"]
+    b = client.post("/employees/", json=employee_payload(company_id=502)).json()["id"]
+    assert sharding.shard_for_employee(a) == "a" and sharding.shard_for_employee(b) == "b"
+    assert row_count("employee", shards["a"].engine) == 1 and row_count("employee", shards["b"].engine) == 1
+
+    client.post(f"/employees/{b}/availability/", json=[
+        {"day_of_week": 1, "time_from": "09:00:00", "time_to": "12:00:00"}])
+    client.put(f"/employees/{b}/skills/", json=[5])
+    assert row_count("availability_slots", shards["b"].engine) == 1 and row_count("employee_skills", shards["b"].engine) == 1
+    body = client.get(f"/employees/{b}").json()
+    assert body["id"] == b and body["skills"] == [{"service_id": 5}]
+
+    assert client.patch(f"/employees/{b}", json={"last_name": "Moved"}).status_code == 200
+    assert client.patch(f"/employees/{b}", json={"company_id": 501}).status_code == 409
+    assert client.get("/employees/999999").status_code == 404
+
+
+def test_listing_merges_shards_with_keyset_pages(client, shards, employee_payload):
+    ids = [client.post("/employees/", json=employee_payload(company_id=501 + i % 2)).json()["id"] for i in range(5)]
+    first = client.get("/employees/", params={"limit": 3}).json()
+    assert [e["id"] for e in first] == ids[:3]
+    rest = client.get("/employees/", params={"limit": 3, "after_id": first[-1]["id"]}).json()
+    assert [e["id"] for e in rest] == ids[3:]
+    assert client.get("/employees/aggregates").json()["headcount_by_company"] == {"501": 3, "502": 2}
+
+
+def test_unsharded_routes_answer_501(client, shards):
+    for path, params in (
+        ("/employees/reservations", {"employee_id": 1}),
+        ("/employees/free-slots", {"employee_id": 1}),
+        ("/employees/match", {}),
+        ("/employees/skill-query", {"all": 1}),
+        ("/employees/search", {"q": "sha"}),
+        ("/employees/coverage", {}),
+        ("/changes/", {}),
+        ("/changes/stream", {}),
+    ):
+        r = client.get(path, params=params)
+        assert r.status_code == 501, path
+        assert r.json()["status"] == 501
+
+
+def test_indexes_refuse_to_start_with_shards(shards, monkeypatch):
+    main.check_sharding_config()
+    monkeypatch.setattr(name_index, "NAME_SEARCH_ENABLED", True)
+    with pytest.raises(RuntimeError, match="NAME_SEARCH_ENABLED"):
+        main.check_sharding_config()
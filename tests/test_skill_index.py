@@ -0,0 +1,77 @@
+# tests/test_skill_index.py
+import pytest
+
+from app import crud, database, skill_index
+from app.skill_index import Bitmap
+
+
+def test_bitmap_set_operations():
+    a = Bitmap.of([1, 5, 20000, 40000])
+    b = Bitmap.of([5, 40000, 70000])
+    assert list(a & b) == [5, 40000]
+    assert list(a | b) == [1, 5, 20000, 40000, 70000]
+    assert list(a - b) == [1, 20000]
+    a.discard(20000)
+    assert 20000 not in a and len(a) == 3
+    assert len(a.chunks) == 2  # the emptied block is dropped
+
+
+QUERIES = [
+    {"all_of": [801, 802]},
+    {"any_of": [802, 803]},
+    {"all_of": [801], "none_of": [803]},
+    {"any_of": [801, 803], "company_id": 80},
+    {"all_of": [801], "location_id": 8001},
+]
+
+
+def _agree(idx):
+    db = database.SessionLocal()
+    try:
+        for q in QUERIES:
+            ids, total = crud.skill_query(db, q.get("all_of", ()), q.get("any_of", ()), q.get("none_of", ()),
+                                          company_id=q.get("company_id"), location_id=q.get("location_id"),
+                                          limit=1000)
+            result = idx.query(q.get("all_of", ()), q.get("any_of", ()), q.get("none_of", ()),
+                               company_id=q.get("company_id"), location_id=q.get("location_id"))
+            assert (list(result), len(result)) == (ids, total), q
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def skilled(client, employee_payload):
+    a = client.post("/employees/", json=employee_payload(company_id=80, location_id=8001)).json()["id"]
+    b = client.post("/employees/", json=employee_payload(company_id=80, location_id=8002)).json()["id"]
+    c = client.post("/employees/", json=employee_payload(company_id=81, location_id=8001)).json()["id"]
+    client.put(f"/employees/{a}/skills/", json=[801, 802])
+    client.put(f"/employees/{b}/skills/", json=[801, 803])
+    client.put(f"/employees/{c}/skills/", json=[802])
+    return a, b, c
+
+
+def test_index_agrees_with_database_and_follows_changes(client, skilled, employee_payload):
+    a, b, c = skilled
+    idx = skill_index.build()
+    _agree(idx)
+    assert list(idx.query(all_of=[801, 802])) == [a]
+
+    client.put(f"/employees/{c}/skills/", json=[801, 802])
+    client.put(f"/employees/{a}", json=employee_payload(company_id=81, location_id=8002, active=True))
+    client.delete(f"/employees/{b}")
+    assert skill_index.refresh(idx) > 0
+    _agree(idx)
+    assert list(idx.query(all_of=[801, 802])) == [a, c]
+
+
+def test_skill_query_endpoint(client, skilled, monkeypatch):
+    a, b, c = skilled
+    params = [("all", 801), ("not", 803), ("company_id", 80)]
+    r = client.get("/employees/skill-query", params=params)
+    assert r.json() == {"employee_ids": [a], "total": 1, "source": "database"}
+
+    monkeypatch.setattr(skill_index, "_index", skill_index.build())
+    r = client.get("/employees/skill-query", params=params)
+    assert r.json() == {"employee_ids": [a], "total": 1, "source": "index"}
+
+    assert client.get("/employees/skill-query").status_code == 422
@@ -1,14 +1,8 @@
 # tests/test_skills.py
 
-def test_skills_replace_and_get(client):
+def test_skills_replace_and_get(client, employee_payload):
     # Create employee
-    emp = {
-        "first_name": "Sam",
-        "last_name": "Skills",
-        "gender": True,
-        "birth_date": "1994-04-04"
-    }
-    emp_id = client.post("/employees/", json=emp).json()["id"]
+    emp_id = client.post("/employees/", json=employee_payload()).json()["id"]
 
     # GET skills (empty)
     r = client.get(f"/employees/{emp_id}/skills/")